@@ -1,25 +1,41 @@
+import asyncio
 import json
-from typing import Any, Optional
+from typing import Any, AsyncIterator, Optional
+
+from marshmallow import ValidationError
 
 from app.commands.base import BaseCommand
 from app.engine_specifics import get_engine_specific
 from app.daos.dbs import DbsDAO
+from app.errors import DataVizError, DataVizErrorType, ErrorLevel
+from app.schemas.dbs import DBS, DBSValidateParametersSchema
+from app.settings import VALIDATION_CONCURRENCY
 
 BYPASS_VALIDATION = []
 
 
 class ValidateDatabaseParametersCommand(BaseCommand):
-    def __init__(self, properties: dict[str, Any], db_context: Optional[Any] = None):
+    def __init__(
+        self,
+        properties: dict[str, Any],
+        db_context: Optional[Any] = None,
+        model: Optional[DBS] = None,
+        resolved: bool = False,
+    ):
         self._properties = properties.copy()
-        self._model = None
+        self._model = model
         self._db_context = db_context
+        # the caller already looked the database up, ``model`` is final
+        self._resolved = resolved
 
-    def validate(self) -> None:
+    async def validate(self) -> None:
+        if self._model is not None or self._resolved:
+            return
         if (database_id := self._properties.get("id")) is not None:
-            self._model = DbsDAO.find_by_id(database_id, self._db_context)
+            self._model = await DbsDAO.find_by_id(database_id, self._db_context)
 
-    def run(self) -> None:
-        self.validate()
+    async def run(self) -> None:
+        await self.validate()
 
         engine = self._properties.get('engine')
         driver = self._properties.get('driver')
@@ -34,7 +50,7 @@ class ValidateDatabaseParametersCommand(BaseCommand):
                 f"Engine {engine} does not have a parameters schema"
             )
 
-        errors = engine_specific.validate_parameters(self._properties)
+        errors = await self._validate_parameters(engine_specific)
         if errors:
             raise ValueError(errors)
 
@@ -70,3 +86,106 @@ class ValidateDatabaseParametersCommand(BaseCommand):
 
         database.set_sqlalchemy_uri(sqlalchemy_uri)
         database.db_engine_specific.mutate_db_for_connection_test(database)
+
+    async def _validate_parameters(self, engine_specific) -> list[DataVizError]:
+        if hasattr(engine_specific, "validate_parameters_async"):
+            return await engine_specific.validate_parameters_async(self._properties)
+        return await asyncio.to_thread(
+            engine_specific.validate_parameters, self._properties
+        )
+
+
+class BulkValidateDatabaseParametersCommand(BaseCommand):
+    """
+    Runs ``ValidateDatabaseParametersCommand`` for many payloads with at most
+    ``concurrency`` checks in flight, yielding ``(index, errors)`` pairs in
+    completion order.
+    """
+
+    def __init__(
+        self,
+        items: list[dict[str, Any]],
+        db_context: Optional[Any] = None,
+        concurrency: int = VALIDATION_CONCURRENCY,
+    ):
+        self._items = items
+        self._db_context = db_context
+        self._concurrency = concurrency
+
+    async def validate(self) -> None:
+        if self._concurrency < 1:
+            raise ValueError("Concurrency must be a positive integer")
+
+    async def run(self) -> AsyncIterator[tuple[int, list[DataVizError]]]:
+        await self.validate()
+
+        # The session can't be shared by concurrent checks, so the databases
+        # being edited are loaded upfront in a single query.
+        models = {
+            model.id: model
+            for model in await DbsDAO.find_by_ids(
+                [item["id"] for item in self._items if item.get("id") is not None],
+                self._db_context,
+            )
+        }
+        semaphore = asyncio.Semaphore(self._concurrency)
+
+        async def check(index: int, item: dict[str, Any]) -> tuple[int, list[DataVizError]]:
+            database_id = item.get("id")
+            if database_id is not None and database_id not in models:
+                return index, [self._get_not_found_error(database_id)]
+            async with semaphore:
+                return index, await self._check(item, models.get(database_id))
+
+        tasks = [
+            asyncio.create_task(check(index, item))
+            for index, item in enumerate(self._items)
+        ]
+        try:
+            for task in asyncio.as_completed(tasks):
+                yield await task
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _check(
+        self, item: dict[str, Any], model: Optional[DBS] = None
+    ) -> list[DataVizError]:
+        try:
+            payload = DBSValidateParametersSchema().load(item)
+            # never touches the session, which the concurrent checks share
+            await ValidateDatabaseParametersCommand(
+                payload, self._db_context, model, resolved=True
+            ).run()
+        except ValidationError as ex:
+            return [
+                DataVizError(
+                    message="Invalid connection payload.",
+                    error_type=DataVizErrorType.CONNECTION_MISSING_PARAMETERS_ERROR,
+                    level=ErrorLevel.ERROR,
+                    extra={"messages": ex.messages},
+                )
+            ]
+        except ValueError as ex:
+            if ex.args and isinstance(ex.args[0], list):
+                return ex.args[0]
+            return [self._get_generic_error(ex)]
+        except Exception as ex:
+            return [self._get_generic_error(ex)]
+        return []
+
+    @staticmethod
+    def _get_not_found_error(database_id: Any) -> DataVizError:
+        return DataVizError(
+            message=f"Database {database_id} not found.",
+            error_type=DataVizErrorType.OBJECT_DOES_NOT_EXIST_ERROR,
+            level=ErrorLevel.ERROR,
+        )
+
+    @staticmethod
+    def _get_generic_error(ex: Exception) -> DataVizError:
+        return DataVizError(
+            message=str(ex),
+            error_type=DataVizErrorType.GENERIC_DB_ENGINE_ERROR,
+            level=ErrorLevel.ERROR,
+        )
@@ -1,9 +1,10 @@
-from typing import Generic, TypeVar, get_args
+from typing import Generic, Sequence, TypeVar, get_args
 
 from fastapi import Depends
 from pydantic import BaseModel
+from sqlalchemy import select
 from sqlalchemy.exc import StatementError
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 T = TypeVar("T")
 
@@ -22,14 +23,38 @@ class BaseDAO(Generic[T]):
         return cls.model_cls
 
     @classmethod
-    def find_by_id(
+    async def find_by_id(
         cls,
         model_id: str | int,
-        session: Session
+        session: AsyncSession
     ) -> T | None:
-        query = session.query(cls.model_cls)
         column_id = getattr(cls.model_cls, cls.id_column_name)
         try:
-            return query.filter(column_id == model_id).one_or_none()
+            result = await session.execute(
+                select(cls.model_cls).where(column_id == model_id)
+            )
+            return result.scalar_one_or_none()
         except StatementError:
             return None
+
+    @classmethod
+    async def find_by_ids(
+        cls,
+        model_ids: Sequence[str | int],
+        session: AsyncSession
+    ) -> list[T]:
+        if not model_ids:
+            return []
+        column_id = getattr(cls.model_cls, cls.id_column_name)
+        try:
+            result = await session.execute(
+                select(cls.model_cls).where(column_id.in_(model_ids))
+            )
+            return list(result.scalars())
+        except StatementError:
+            return []
+
+    @classmethod
+    async def find_all(cls, session: AsyncSession) -> list[T]:
+        result = await session.execute(select(cls.model_cls))
+        return list(result.scalars())
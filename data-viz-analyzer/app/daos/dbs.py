@@ -1,7 +1,25 @@
+from typing import Any, Sequence
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
 from app.daos.base import BaseDAO
 
 from app.schemas.dbs import DBS
 
+# Columns that can be projected when listing databases, secrets are left out
+LISTABLE_COLUMNS = (
+    "id",
+    "uuid",
+    "name",
+    "sqlalchemy_uri",
+    "server_cert",
+    "impersonate_user",
+    "extra",
+    "created_at",
+    "updated_at",
+)
+
 
 class DbsDAO(BaseDAO[DBS]):
     @staticmethod
@@ -17,3 +35,38 @@ class DbsDAO(BaseDAO[DBS]):
             impersonate_user=impersonate_user,
             encrypted_extra=encrypted_extra,
         )
+
+    @staticmethod
+    def _filter_by_name_prefix(query, name_prefix: str | None):
+        if name_prefix:
+            return query.where(DBS.name.startswith(name_prefix, autoescape=True))
+        return query
+
+    @classmethod
+    async def find_page(
+        cls,
+        session: AsyncSession,
+        after_id: int | None = None,
+        limit: int = 100,
+        columns: Sequence[str] = LISTABLE_COLUMNS,
+        name_prefix: str | None = None,
+    ) -> list[dict[str, Any]]:
+        """
+        Keyset pagination on ``id``: only the requested columns of the rows
+        following ``after_id`` are loaded.
+        """
+        columns = ["id", *(column for column in columns if column != "id")]
+        query = select(*(getattr(DBS, column) for column in columns))
+        if after_id is not None:
+            query = query.where(DBS.id > after_id)
+        query = cls._filter_by_name_prefix(query, name_prefix)
+        result = await session.execute(query.order_by(DBS.id).limit(limit))
+        return [dict(row._mapping) for row in result]
+
+    @classmethod
+    async def get_listing_version(
+        cls, session: AsyncSession, name_prefix: str | None = None
+    ) -> tuple[Any, ...]:
+        query = select(func.count(DBS.id), func.max(DBS.id), func.max(DBS.updated_at))
+        result = await session.execute(cls._filter_by_name_prefix(query, name_prefix))
+        return tuple(result.one())
@@ -1,21 +1,25 @@
 from sqlalchemy import create_engine, MetaData
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
-from app.settings import SQLALCHEMY_DATABASE_URL
+from app.settings import SQLALCHEMY_ASYNC_DATABASE_URL, SQLALCHEMY_DATABASE_URL
 
 
-def get_db_context():
-    db = SessionLocal()
-    try:
+async def get_db_context():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL
 )
+async_engine = create_async_engine(
+    SQLALCHEMY_ASYNC_DATABASE_URL
+)
 
 MetaData().create_all(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, autoflush=False, expire_on_commit=False
+)
 Base = declarative_base()
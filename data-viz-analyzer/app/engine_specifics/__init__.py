@@ -1,11 +1,22 @@
 import inspect
 import pkgutil
+import threading
+import time
 from importlib import import_module
 from importlib.metadata import entry_points
 from pathlib import Path
 from typing import Any, Optional
 
 from app.engine_specifics.base import BaseSpecificEngine
+from app.utils.metrics import ENGINE_SPECIFIC_LOOKUP_DURATION
+
+_registry_lock = threading.RLock()
+_engine_specifics: list[type[BaseSpecificEngine]] | None = None
+_backend_index: dict[str, list[type[BaseSpecificEngine]]] = {}
+_lookup_index: dict[tuple[str, str | None], type[BaseSpecificEngine]] = {}
+# Backends and drivers come from user supplied URIs, past this many keys
+# lookups are resolved without being indexed
+_LOOKUP_INDEX_MAX_SIZE = 1024
 
 
 def is_engine_specific(obj: Any) -> bool:
@@ -39,16 +50,76 @@ def load_engine_specifics() -> list[type[BaseSpecificEngine]]:
     return engine_specs
 
 
-def get_engine_specific(backend: str, driver: Optional[str] = None) -> type[BaseSpecificEngine]:
+def _build_backend_index(
+    engine_specifics: list[type[BaseSpecificEngine]],
+) -> dict[str, list[type[BaseSpecificEngine]]]:
+    index: dict[str, list[type[BaseSpecificEngine]]] = {}
+    for engine_specific in dict.fromkeys(engine_specifics):
+        for backend in {engine_specific.engine, *engine_specific.engine_aliases}:
+            index.setdefault(backend, []).append(engine_specific)
+    return index
+
+
+def _populate_registry() -> list[type[BaseSpecificEngine]]:
+    global _engine_specifics, _backend_index, _lookup_index
+
     engine_specifics = load_engine_specifics()
+    _backend_index = _build_backend_index(engine_specifics)
+    _lookup_index = {}
+    _engine_specifics = engine_specifics
+    return engine_specifics
+
+
+def reload_engine_specifics() -> list[type[BaseSpecificEngine]]:
+    """
+    Rebuild the process-wide registry, e.g. after installing a plugin that
+    registers new engines through the ``superset.db_engine_specs`` entry point.
+    """
+    with _registry_lock:
+        return _populate_registry()
+
+
+def get_engine_specifics() -> list[type[BaseSpecificEngine]]:
+    if (engine_specifics := _engine_specifics) is not None:
+        return engine_specifics
+
+    with _registry_lock:
+        if _engine_specifics is not None:
+            return _engine_specifics
+        return _populate_registry()
+
+
+def _resolve_engine_specific(
+    backend: str, driver: Optional[str] = None
+) -> type[BaseSpecificEngine]:
+    # Engines overriding ``supports_backend`` may not be reachable through the
+    # index, so unknown backends still get a full scan before falling back.
+    candidates = _backend_index.get(backend) or get_engine_specifics()
 
     if driver is not None:
-        for engine_specific in engine_specifics:
+        for engine_specific in candidates:
             if engine_specific.supports_backend(backend, driver):
                 return engine_specific
 
-    for engine_specific in engine_specifics:
+    for engine_specific in candidates:
         if engine_specific.supports_backend(backend):
             return engine_specific
 
     return BaseSpecificEngine
+
+
+def get_engine_specific(backend: str, driver: Optional[str] = None) -> type[BaseSpecificEngine]:
+    started = time.perf_counter()
+    key = (backend, driver)
+    if (engine_specific := _lookup_index.get(key)) is None:
+        get_engine_specifics()
+        lookup_index = _lookup_index
+        engine_specific = _resolve_engine_specific(backend, driver)
+        # unknown backends fall back to the base spec, they aren't worth a key
+        if (
+            engine_specific is not BaseSpecificEngine
+            and len(lookup_index) < _LOOKUP_INDEX_MAX_SIZE
+        ):
+            lookup_index[key] = engine_specific
+    ENGINE_SPECIFIC_LOOKUP_DURATION.observe(time.perf_counter() - started)
+    return engine_specific
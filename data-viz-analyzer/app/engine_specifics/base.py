@@ -1,16 +1,29 @@
+import asyncio
+import time
 from datetime import datetime
 from re import Pattern, Match
-from typing import Union, Callable, Any, TypedDict
+from typing import Union, Callable, Any, Iterable, Iterator, Sequence, TypedDict
 import re
+from collections import OrderedDict
 
 from marshmallow import Schema, fields
 from marshmallow.validate import Range
 from sqlalchemy import types, URL
+from sqlalchemy.engine.reflection import Inspector
 from sqlalchemy.sql.type_api import TypeEngine
 
 from app.utils.core import GenericDataType, ColumnTypeSource, ColumnSpec, make_url_safe
 from app.errors import DataVizError, DataVizErrorType, ErrorLevel
-from app.utils.network import is_hostname_valid, is_port_open
+from app.result_set import ColumnarResultSet, ColumnarResultSetBuilder
+from app.settings import VALIDATION_TIMEOUT
+from app.utils.metrics import FETCH_BYTES, FETCH_DURATION, FETCH_ROWS, VALIDATION_STEP_DURATION
+from app.utils.sql_parse import ParsedQuery
+from app.utils.network import (
+    is_hostname_valid,
+    is_hostname_valid_async,
+    is_port_open,
+    is_port_open_async,
+)
 
 ColumnTypeMapping = tuple[
     Pattern[str],
@@ -18,6 +31,102 @@ ColumnTypeMapping = tuple[
     GenericDataType,
 ]
 
+# (column index, mutator, whether the mutator takes the whole column)
+ColumnMutator = tuple[int, Callable[[Any], Any], bool]
+
+_SCOPED_REGEX_FLAGS = (
+    (re.IGNORECASE, "i"),
+    (re.MULTILINE, "m"),
+    (re.DOTALL, "s"),
+    (re.VERBOSE, "x"),
+)
+
+
+class ColumnTypeClassifier:
+    """
+    Matches native type strings against an ordered tuple of column type
+    mappings with a single alternation regex, keeping first-match semantics,
+    and keeps a bounded LRU memo of native type -> ``ColumnSpec``.
+    """
+
+    def __init__(
+        self,
+        *sources: tuple[ColumnTypeMapping, ...],
+        max_size: int = 1024,
+    ) -> None:
+        self.sources = sources
+        self.mappings: tuple[ColumnTypeMapping, ...] = sum(sources, ())
+        self.max_size = max_size
+        self._pattern = self._compile(self.mappings)
+        self._specs: OrderedDict[str, ColumnSpec | None] = OrderedDict()
+
+    @staticmethod
+    def _compile(mappings: tuple[ColumnTypeMapping, ...]) -> Pattern[str] | None:
+        alternatives = []
+        for idx, (regex, _, _) in enumerate(mappings):
+            flags = "".join(
+                flag for value, flag in _SCOPED_REGEX_FLAGS if regex.flags & value
+            )
+            scoped = f"(?{flags}:{regex.pattern})" if flags else regex.pattern
+            alternatives.append(f"(?P<_m{idx}>{scoped})")
+        try:
+            return re.compile("|".join(alternatives))
+        except re.error:
+            # Patterns using numbered backreferences or conflicting group names
+            # can't be merged, those fall back to the sequential scan.
+            return None
+
+    def is_compiled_from(self, *sources: tuple[ColumnTypeMapping, ...]) -> bool:
+        return len(sources) == len(self.sources) and all(
+            new is old for new, old in zip(sources, self.sources)
+        )
+
+    def match(self, column_type: str) -> tuple[TypeEngine, GenericDataType] | None:
+        candidates = self.mappings
+        if self._pattern is not None:
+            if not (merged := self._pattern.match(column_type)):
+                return None
+            candidates = candidates[int(merged.lastgroup[2:]):]
+
+        for regex, sqla_type, generic_type in candidates:
+            match = regex.match(column_type)
+            if not match:
+                continue
+            if callable(sqla_type):
+                return sqla_type(match), generic_type
+            return sqla_type, generic_type
+        return None
+
+    def get_column_spec(
+        self,
+        column_type: str,
+        resolve: Callable[[str], tuple[TypeEngine, GenericDataType] | None],
+    ) -> ColumnSpec | None:
+        try:
+            column_spec = self._specs[column_type]
+            self._specs.move_to_end(column_type)
+            return column_spec
+        except KeyError:
+            # missing, or evicted by another thread in between
+            pass
+
+        column_spec = None
+        if col_types := resolve(column_type):
+            sqla_type, generic_type = col_types
+            column_spec = ColumnSpec(
+                sqla_type=sqla_type,
+                generic_type=generic_type,
+                is_dttm=generic_type == GenericDataType.TEMPORAL,
+            )
+
+        self._specs[column_type] = column_spec
+        while len(self._specs) > self.max_size:
+            try:
+                self._specs.popitem(last=False)
+            except KeyError:
+                break
+        return column_spec
+
 
 class LimitMethod:
     FETCH_MANY = "fetch_many"
@@ -124,43 +233,45 @@ class BasicParametersMixin:
             "encryption": encryption,
         }
 
-    @classmethod
-    def validate_parameters(
-            cls, properties: BasicPropertiesType
+    @staticmethod
+    def _get_missing_parameters_errors(
+        parameters: BasicParametersType,
     ) -> list[DataVizError]:
-        errors: list[DataVizError] = []
-
         required = {"host", "port", "username", "database"}
-        parameters = properties.get("parameters", {})
         present = {key for key in parameters if parameters.get(key, ())}
 
         if missing := sorted(required - present):
-            errors.append(
+            return [
                 DataVizError(
                     message=f'One or more parameters are missing: {", ".join(missing)}',
                     error_type=DataVizErrorType.CONNECTION_MISSING_PARAMETERS_ERROR,
                     level=ErrorLevel.WARNING,
                     extra={"missing": missing},
                 ),
-            )
+            ]
+        return []
 
-        host = parameters.get("host", None)
-        if not host:
-            return errors
-        if not is_hostname_valid(host):
-            errors.append(
-                DataVizError(
-                    message="The hostname provided can't be resolved.",
-                    error_type=DataVizErrorType.CONNECTION_INVALID_HOSTNAME_ERROR,
-                    level=ErrorLevel.ERROR,
-                    extra={"invalid": ["host"]},
-                ),
-            )
-            return errors
+    @staticmethod
+    def _get_invalid_hostname_error() -> DataVizError:
+        return DataVizError(
+            message="The hostname provided can't be resolved.",
+            error_type=DataVizErrorType.CONNECTION_INVALID_HOSTNAME_ERROR,
+            level=ErrorLevel.ERROR,
+            extra={"invalid": ["host"]},
+        )
 
-        port = parameters.get("port", None)
-        if not port:
-            return errors
+    @staticmethod
+    def _get_port_closed_error() -> DataVizError:
+        return DataVizError(
+            message="The port is closed.",
+            error_type=DataVizErrorType.CONNECTION_PORT_CLOSED_ERROR,
+            level=ErrorLevel.ERROR,
+            extra={"invalid": ["port"]},
+        )
+
+    @staticmethod
+    def _parse_port(port: Any) -> tuple[int | None, list[DataVizError]]:
+        errors: list[DataVizError] = []
         try:
             port = int(port)
         except (ValueError, TypeError):
@@ -184,15 +295,108 @@ class BasicParametersMixin:
                     extra={"invalid": ["port"]},
                 ),
             )
-        elif not is_port_open(host, port):
-            errors.append(
-                DataVizError(
-                    message="The port is closed.",
-                    error_type=DataVizErrorType.CONNECTION_PORT_CLOSED_ERROR,
-                    level=ErrorLevel.ERROR,
-                    extra={"invalid": ["port"]},
-                ),
+            return None, errors
+        return port, errors
+
+    @classmethod
+    def validate_parameters(
+            cls, properties: BasicPropertiesType, force: bool = False
+    ) -> list[DataVizError]:
+        parameters = properties.get("parameters", {})
+        errors = cls._get_missing_parameters_errors(parameters)
+
+        host = parameters.get("host", None)
+        if not host:
+            return errors
+        started = time.perf_counter()
+        is_valid_hostname = is_hostname_valid(host, force=force)
+        VALIDATION_STEP_DURATION.observe(time.perf_counter() - started, "dns")
+        if not is_valid_hostname:
+            errors.append(cls._get_invalid_hostname_error())
+            return errors
+
+        port = parameters.get("port", None)
+        if not port:
+            return errors
+        port, port_errors = cls._parse_port(port)
+        errors.extend(port_errors)
+        if port is not None:
+            started = time.perf_counter()
+            is_open = is_port_open(host, port, force=force)
+            VALIDATION_STEP_DURATION.observe(time.perf_counter() - started, "port")
+            if not is_open:
+                errors.append(cls._get_port_closed_error())
+
+        return errors
+
+    @classmethod
+    async def validate_parameters_async(
+            cls,
+            properties: BasicPropertiesType,
+            timeout: float | None = None,
+            force: bool = False,
+    ) -> list[DataVizError]:
+        """
+        Same checks as ``validate_parameters`` without blocking the event loop.
+        Hostname resolution and the port probe run concurrently and both are
+        bounded by a single deadline (``VALIDATION_TIMEOUT`` by default).
+        ``force`` skips the cached results of previous probes.
+        """
+        parameters = properties.get("parameters", {})
+        errors = cls._get_missing_parameters_errors(parameters)
+
+        host = parameters.get("host", None)
+        if not host:
+            return errors
+
+        timeout = VALIDATION_TIMEOUT if timeout is None else timeout
+        deadline = asyncio.get_running_loop().time() + timeout
+
+        port, port_errors = None, []
+        if raw_port := parameters.get("port", None):
+            port, port_errors = cls._parse_port(raw_port)
+
+        def observe_step(step: str) -> Callable[[asyncio.Task], None]:
+            # both checks run concurrently, each is timed until it completes
+            def done(task: asyncio.Task) -> None:
+                if not task.cancelled():
+                    VALIDATION_STEP_DURATION.observe(time.perf_counter() - started, step)
+
+            return done
+
+        started = time.perf_counter()
+        hostname_check = asyncio.create_task(is_hostname_valid_async(host, force=force))
+        hostname_check.add_done_callback(observe_step("dns"))
+        port_check = (
+            asyncio.create_task(
+                is_port_open_async(host, port, timeout, force=force)
             )
+            if port is not None
+            else None
+        )
+        if port_check is not None:
+            port_check.add_done_callback(observe_step("port"))
+        try:
+            async with asyncio.timeout_at(deadline):
+                is_valid_hostname = await hostname_check
+        except TimeoutError:
+            is_valid_hostname = False
+
+        if not is_valid_hostname:
+            if port_check is not None:
+                port_check.cancel()
+            errors.append(cls._get_invalid_hostname_error())
+            return errors
+
+        errors.extend(port_errors)
+        if port_check is not None:
+            try:
+                async with asyncio.timeout_at(deadline):
+                    is_open = await port_check
+            except TimeoutError:
+                is_open = False
+            if not is_open:
+                errors.append(cls._get_port_closed_error())
 
         return errors
 
@@ -211,6 +415,13 @@ class BaseSpecificEngine:
     disable_ssh_tunneling = False
     _date_trunc_functions: dict[str, str] = {}
     _time_grain_expressions: dict[str | None, str] = {}
+    _time_grain_intervals: dict[str, str] = {}
+    # Set-returning expression yielding every ``interval`` from ``start`` to
+    # ``end``, engines without one can't fill gaps in time series
+    _time_series_expression: str | None = None
+    # Statement locking ``{table}`` against concurrent writers until the end of
+    # the transaction, while still letting readers in
+    _lock_table_statement: str | None = None
     _default_column_type_mappings: tuple[ColumnTypeMapping, ...] = (
         (
             re.compile(r"^string", re.IGNORECASE),
@@ -330,13 +541,24 @@ class BaseSpecificEngine:
     )
 
     column_type_mappings: tuple[ColumnTypeMapping, ...] = ()
+    column_type_cache_size = 1024
     column_type_mutators: dict[TypeEngine, Callable[[Any], Any]] = {}
+    # Mutators receiving a whole column as a list, which they may change in
+    # place, and returning the mutated column (a sequence or NumPy array),
+    # these take precedence over the row-wise ones above.
+    columnar_type_mutators: dict[
+        TypeEngine, Callable[[Sequence[Any]], Sequence[Any]]
+    ] = {}
 
     time_groupby_inline = False
     limit_method = LimitMethod.FORCE_LIMIT
     allows_alias_in_select = True
 
     arraysize = 0
+    # Rows pulled per batch when streaming and ``arraysize`` isn't set
+    stream_batch_size = 10000
+    # Whether ``execute_prepared`` keeps prepared statements on connections
+    supports_prepared_statements = False
 
     custom_errors: dict = {}
 
@@ -368,6 +590,17 @@ class BaseSpecificEngine:
     ) -> str | None:
         return None
 
+    @classmethod
+    def get_column_type_classifier(cls) -> ColumnTypeClassifier:
+        sources = (cls.column_type_mappings, cls._default_column_type_mappings)
+        classifier = cls.__dict__.get("_column_type_classifier")
+        if classifier is None or not classifier.is_compiled_from(*sources):
+            classifier = ColumnTypeClassifier(
+                *sources, max_size=cls.column_type_cache_size
+            )
+            cls._column_type_classifier = classifier
+        return classifier
+
     @classmethod
     def get_column_types(
         cls,
@@ -375,17 +608,7 @@ class BaseSpecificEngine:
     ) -> tuple[TypeEngine, GenericDataType] | None:
         if not column_type:
             return None
-
-        for regex, sqla_type, generic_type in (
-                cls.column_type_mappings + cls._default_column_type_mappings
-        ):
-            match = regex.match(column_type)
-            if not match:
-                continue
-            if callable(sqla_type):
-                return sqla_type(match), generic_type
-            return sqla_type, generic_type
-        return None
+        return cls.get_column_type_classifier().match(column_type)
 
     @classmethod
     def get_column_spec(
@@ -394,13 +617,11 @@ class BaseSpecificEngine:
         db_extra: dict[str, Any] | None = None,
         source: ColumnTypeSource = ColumnTypeSource.GET_TABLE,
     ) -> ColumnSpec | None:
-        if col_types := cls.get_column_types(native_type):
-            column_type, generic_type = col_types
-            is_dttm = generic_type == GenericDataType.TEMPORAL
-            return ColumnSpec(
-                sqla_type=column_type, generic_type=generic_type, is_dttm=is_dttm
-            )
-        return None
+        if not native_type:
+            return None
+        return cls.get_column_type_classifier().get_column_spec(
+            native_type, cls.get_column_types
+        )
 
     @classmethod
     def get_sqla_column_type(
@@ -437,6 +658,46 @@ class BaseSpecificEngine:
             return cls.parse_error_exception(exception)
         return new_exception(str(exception))
 
+    @classmethod
+    def get_time_grains(cls) -> list[str]:
+        return [grain for grain in cls._time_grain_expressions if grain is not None]
+
+    @classmethod
+    def get_timestamp_expr(cls, col: str, time_grain: str | None) -> str:
+        """
+        SQL expression truncating the ``col`` expression to ``time_grain``.
+        """
+        try:
+            template = cls._time_grain_expressions[time_grain]
+        except KeyError:
+            if time_grain is None:
+                return col
+            raise ValueError(
+                f"No grain spec for {time_grain} for database {cls.engine}"
+            ) from None
+        return template.format(col=col)
+
+    @classmethod
+    def get_time_series_expr(
+        cls, start: str, end: str, time_grain: str | None
+    ) -> str | None:
+        """
+        Set-returning expression of every bucket of ``time_grain`` from
+        ``start`` to ``end``, ``None`` when the engine can't generate one.
+        """
+        interval = cls._time_grain_intervals.get(time_grain)
+        if cls._time_series_expression is None or interval is None:
+            return None
+        return cls._time_series_expression.format(
+            start=start, end=end, interval=interval
+        )
+
+    @classmethod
+    def get_lock_table_sql(cls, table: str) -> str | None:
+        if cls._lock_table_statement is None:
+            return None
+        return cls._lock_table_statement.format(table=table)
+
     @classmethod
     def epoch_to_dttm(cls) -> str:
         raise NotImplementedError()
@@ -455,37 +716,387 @@ class BaseSpecificEngine:
     def unmask_encrypted_extra(cls, old: str | None, new: str | None) -> str | None:
         return new
 
+    @classmethod
+    def get_column_mutators(cls, description: Sequence[Any]) -> list[ColumnMutator]:
+        mutators: list[ColumnMutator] = []
+        if not (cls.columnar_type_mutators or cls.column_type_mutators):
+            return mutators
+
+        for idx, row in enumerate(description):
+            sqla_type = type(cls.get_sqla_column_type(cls.get_datatype(row[1])))
+            if func := cls.columnar_type_mutators.get(sqla_type):
+                mutators.append((idx, func, True))
+            elif func := cls.column_type_mutators.get(sqla_type):
+                mutators.append((idx, func, False))
+        return mutators
+
+    @staticmethod
+    def mutate_columns(
+        columns: list[Sequence[Any]], mutators: list[ColumnMutator]
+    ) -> list[Sequence[Any]]:
+        for idx, func, columnar in mutators:
+            column = columns[idx]
+            if columnar:
+                columns[idx] = func(column if isinstance(column, list) else list(column))
+            else:
+                columns[idx] = list(map(func, column))
+        return columns
+
+    @staticmethod
+    def rows_to_columns(rows: Sequence[tuple[Any, ...]], width: int) -> list[Sequence[Any]]:
+        if not rows:
+            return [[] for _ in range(width)]
+        return list(zip(*rows))
+
+    @staticmethod
+    def columns_to_rows(columns: Sequence[Sequence[Any]]) -> list[tuple[Any, ...]]:
+        return list(
+            zip(
+                *(
+                    column.tolist() if hasattr(column, "tolist") else column
+                    for column in columns
+                )
+            )
+        )
+
+    @classmethod
+    def mutate_rows(
+        cls, rows: list[tuple[Any, ...]], mutators: list[ColumnMutator]
+    ) -> list[tuple[Any, ...]]:
+        """
+        Pull the columns ``mutators`` target out of ``rows`` and mutate them as
+        a whole. When they're a small part of the rows, the rows are rebuilt
+        with them swapped in and the other columns are never transposed.
+        """
+        if not mutators or not rows:
+            return rows
+        width = len(rows[0])
+        if len(mutators) * 4 >= width:
+            # most of the row changes anyway, transposing it is cheaper
+            columns = cls.rows_to_columns(rows, width)
+            return cls.columns_to_rows(cls.mutate_columns(columns, mutators))
+
+        mutated_columns: dict[int, Sequence[Any]] = {}
+        for idx, func, columnar in mutators:
+            column = [row[idx] for row in rows]
+            column = func(column) if columnar else list(map(func, column))
+            mutated_columns[idx] = column.tolist() if hasattr(column, "tolist") else column
+
+        mutated = []
+        append = mutated.append
+        if len(mutated_columns) == 1:
+            ((idx, column),) = mutated_columns.items()
+            for row, value in zip(rows, column):
+                row = list(row)
+                row[idx] = value
+                append(tuple(row))
+            return mutated
+        indexes = list(mutated_columns)
+        for row, *values in zip(rows, *mutated_columns.values()):
+            row = list(row)
+            for idx, value in zip(indexes, values):
+                row[idx] = value
+            append(tuple(row))
+        return mutated
+
+    @classmethod
+    def apply_limit_to_sql(cls, sql: str, limit: int) -> str:
+        """
+        Make the database itself stop after ``limit`` rows according to the
+        engine's ``limit_method``. Existing smaller limits are kept and
+        statements other than queries are never rewritten.
+        """
+        if cls.limit_method == LimitMethod.WRAP_SQL:
+            return ParsedQuery(sql).wrap_with_limit(limit)
+        if cls.limit_method == LimitMethod.FORCE_LIMIT:
+            return ParsedQuery(sql).set_or_update_limit(limit)
+        return sql
+
     @classmethod
     def fetch_data(cls, cursor: Any, limit: int | None = None) -> list[tuple[Any, ...]]:
         if cls.arraysize:
             cursor.arraysize = cls.arraysize
+        started = time.perf_counter()
         try:
             if cls.limit_method == LimitMethod.FETCH_MANY and limit:
-                return cursor.fetchmany(limit)
-            data = cursor.fetchall()
+                data = cursor.fetchmany(limit)
+            else:
+                data = cursor.fetchall()
+                mutators = cls.get_column_mutators(cursor.description or [])
+                data = cls.mutate_rows(data, mutators)
+        except Exception as ex:
+            raise cls.get_dbapi_mapped_exception(ex) from ex
+        FETCH_DURATION.observe(time.perf_counter() - started, cls.engine)
+        FETCH_ROWS.inc(len(data), cls.engine)
+        return data
+
+    @classmethod
+    def fetch_data_columns(
+        cls, cursor: Any, limit: int | None = None
+    ) -> list[Sequence[Any]]:
+        """
+        Like ``fetch_data`` but returns one sequence per column and never
+        materializes mutated rows.
+        """
+        if cls.arraysize:
+            cursor.arraysize = cls.arraysize
+        try:
             description = cursor.description or []
-            column_mutators = {
-                row[0]: func
-                for row in description
-                if (
-                    func := cls.column_type_mutators.get(
-                        type(cls.get_sqla_column_type(cls.get_datatype(row[1])))
-                    )
-                )
-            }
-            if column_mutators:
-                indexes = {row[0]: idx for idx, row in enumerate(description)}
-                for row_idx, row in enumerate(data):
-                    new_row = list(row)
-                    for col, func in column_mutators.items():
-                        col_idx = indexes[col]
-                        new_row[col_idx] = func(row[col_idx])
-                    data[row_idx] = tuple(new_row)
-
-            return data
+            if cls.limit_method == LimitMethod.FETCH_MANY and limit:
+                data = cursor.fetchmany(limit)
+            else:
+                data = cursor.fetchall()
+            columns = cls.rows_to_columns(data, len(description))
+            return cls.mutate_columns(columns, cls.get_column_mutators(description))
         except Exception as ex:
             raise cls.get_dbapi_mapped_exception(ex) from ex
 
+    @classmethod
+    def get_stream_batch_size(cls) -> int:
+        return cls.arraysize or cls.stream_batch_size
+
+    @classmethod
+    def create_stream_cursor(cls, connection: Any) -> Any:
+        """
+        Return a DB-API cursor suited for ``iter_data`` from a raw DB-API
+        connection. Engines supporting server-side cursors override this.
+        """
+        return connection.cursor()
+
+    @classmethod
+    def fetch_batches(
+        cls,
+        cursor: Any,
+        limit: int | None = None,
+        deadline: float | None = None,
+    ) -> Iterator[list[tuple[Any, ...]]]:
+        """
+        Fetch ``cursor`` in batches, raising ``TimeoutError`` once the
+        ``time.monotonic()`` ``deadline`` passes in between two of them.
+        """
+        batch_size = cls.get_stream_batch_size()
+        cursor.arraysize = batch_size
+        remaining = limit
+        while remaining is None or remaining > 0:
+            if deadline is not None and time.monotonic() > deadline:
+                raise TimeoutError("The query deadline passed while fetching rows")
+            size = batch_size if remaining is None else min(batch_size, remaining)
+            try:
+                batch = cursor.fetchmany(size)
+            except Exception as ex:
+                raise cls.get_dbapi_mapped_exception(ex) from ex
+            if not batch:
+                return
+            if remaining is not None:
+                remaining -= len(batch)
+            yield batch
+
+    @classmethod
+    def iter_data(
+        cls, cursor: Any, limit: int | None = None
+    ) -> Iterator[list[tuple[Any, ...]]]:
+        """
+        Stream the result of an executed cursor in batches of
+        ``get_stream_batch_size()`` rows with ``column_type_mutators`` applied,
+        so memory is bounded by the batch size rather than the result size.
+        """
+        mutators = None
+        for batch in cls.fetch_batches(cursor, limit):
+            # server-side cursors only expose a description after the first fetch
+            if mutators is None:
+                mutators = cls.get_column_mutators(cursor.description or [])
+            yield cls.mutate_rows(batch, mutators)
+
+    @classmethod
+    def fetch_result_set(
+        cls,
+        cursor: Any,
+        limit: int | None = None,
+        deadline: float | None = None,
+    ) -> ColumnarResultSet:
+        """
+        Build a ``ColumnarResultSet`` straight from cursor batches, mutators are
+        applied per column and rows are never materialized.
+        """
+        started = time.perf_counter()
+        builder = None
+        mutators: list[ColumnMutator] = []
+        width = 0
+        for batch in cls.fetch_batches(cursor, limit, deadline):
+            if builder is None:
+                description = cursor.description or []
+                width = len(description)
+                mutators = cls.get_column_mutators(description)
+                builder = ColumnarResultSetBuilder(description, cls)
+            builder.append(
+                cls.mutate_columns(cls.rows_to_columns(batch, width), mutators)
+            )
+        if builder is None:
+            builder = ColumnarResultSetBuilder(cursor.description or [], cls)
+        result_set = builder.build()
+        FETCH_DURATION.observe(time.perf_counter() - started, cls.engine)
+        FETCH_ROWS.inc(len(result_set), cls.engine)
+        FETCH_BYTES.inc(result_set.nbytes, cls.engine)
+        return result_set
+
+    @classmethod
+    def get_schema_names(cls, inspector: Inspector) -> list[str]:
+        return sorted(inspector.get_schema_names())
+
+    @classmethod
+    def get_table_names(cls, inspector: Inspector, schema: str | None) -> list[str]:
+        return sorted(inspector.get_table_names(schema))
+
+    @classmethod
+    def get_column_specs(
+        cls, native_types: Iterable[str | None]
+    ) -> dict[str, ColumnSpec | None]:
+        """
+        Map many native types at once, each distinct type is only classified
+        once however many columns use it.
+        """
+        return {
+            native_type: cls.get_column_spec(native_type)
+            for native_type in set(native_types)
+            if native_type
+        }
+
+    @classmethod
+    def get_columns(
+        cls,
+        inspector: Inspector,
+        table_name: str,
+        schema: str | None,
+    ) -> list[dict[str, Any]]:
+        columns = [
+            {
+                "name": column["name"],
+                "type": str(column["type"]),
+                "nullable": column.get("nullable", True),
+                "default": column.get("default"),
+            }
+            for column in inspector.get_columns(table_name, schema)
+        ]
+        column_specs = cls.get_column_specs(column["type"] for column in columns)
+        for column in columns:
+            column["column_spec"] = column_specs.get(column["type"])
+        return columns
+
+    @classmethod
+    def get_bulk_columns(
+        cls,
+        inspector: Inspector,
+        schema: str | None,
+    ) -> dict[tuple[str | None, str], list[dict[str, Any]]]:
+        """
+        Columns of every table of ``schema``, keyed by ``(schema, table)``,
+        with a ``primary_key`` flag. Relies on SQLAlchemy's multi-table
+        reflection, engines able to read their catalog in a few queries should
+        override it.
+        """
+        primary_keys = {
+            key: set(constraint.get("constrained_columns") or ())
+            for key, constraint in inspector.get_multi_pk_constraint(schema=schema).items()
+        }
+        tables = {
+            key: [
+                {
+                    "name": column["name"],
+                    "type": str(column["type"]),
+                    "nullable": column.get("nullable", True),
+                    "default": column.get("default"),
+                    "primary_key": column["name"] in primary_keys.get(key, ()),
+                }
+                for column in columns
+            ]
+            for key, columns in inspector.get_multi_columns(schema=schema).items()
+        }
+        return cls._set_column_specs(tables)
+
+    @classmethod
+    def get_bulk_tables(
+        cls,
+        inspector: Inspector,
+        schema: str | None,
+    ) -> tuple[dict[tuple[str | None, str], list[dict[str, Any]]], set[tuple[str | None, str]]]:
+        """
+        ``get_bulk_columns`` along with the keys of the relations among them
+        ``get_table_names`` lists. Multi-table reflection only reads tables,
+        engines reading views and the like in bulk too should override it.
+        """
+        tables = cls.get_bulk_columns(inspector, schema)
+        return tables, set(tables)
+
+    @classmethod
+    def _set_column_specs(
+        cls, tables: dict[tuple[str | None, str], list[dict[str, Any]]]
+    ) -> dict[tuple[str | None, str], list[dict[str, Any]]]:
+        column_specs = cls.get_column_specs(
+            column["type"] for columns in tables.values() for column in columns
+        )
+        for columns in tables.values():
+            for column in columns:
+                column["column_spec"] = column_specs.get(column["type"])
+        return tables
+
+    @classmethod
+    def execute_prepared(
+        cls,
+        connection_info: dict[str, Any],
+        cursor: Any,
+        sql: str,
+        parameters: dict[str, Any] | None = None,
+    ) -> None:
+        """
+        Execute ``sql`` through a statement prepared on the connection of
+        ``cursor``, reused by later executions of the same SQL. The prepared
+        statements are tracked in ``connection_info``, which lives as long as
+        the connection.
+        """
+        if parameters:
+            cursor.execute(sql, parameters)
+        else:
+            cursor.execute(sql)
+
+    @classmethod
+    def set_statement_timeout(cls, cursor: Any, timeout: float) -> bool:
+        """
+        Bound the statements run in the current transaction of the connection
+        of ``cursor`` to ``timeout`` seconds on the database side, returns
+        whether the engine supports it. Called once per query, before it
+        runs. Engines may apply it to each fetch of a server-side cursor, the
+        deadline checked in between batches and the watchdog bound the whole.
+        """
+        return False
+
+    @classmethod
+    def is_timeout_exception(cls, exception: Exception) -> bool:
+        """
+        Whether ``exception`` was raised by a query interrupted by the
+        statement timeout or cancelled by the deadline watchdog.
+        """
+        return False
+
+    @classmethod
+    def get_cancel_query_id(
+        cls, cursor: Any, connection_info: dict[str, Any] | None = None
+    ) -> str | None:
+        """
+        Identifier of the query about to run on the connection of ``cursor``,
+        used by ``cancel_query`` from another connection. ``None`` when the
+        engine can't cancel queries. ``connection_info`` lives as long as the
+        DB-API connection, for identifiers of the connection itself.
+        """
+        return None
+
+    @classmethod
+    def cancel_query(cls, cursor: Any, cancel_query_id: str) -> bool:
+        """
+        Cancel the query identified by ``cancel_query_id`` using ``cursor``,
+        which belongs to another connection, returns whether it was sent.
+        """
+        return False
+
     @staticmethod
     def mutate_db_for_connection_test(
         database
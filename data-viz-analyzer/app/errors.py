@@ -22,6 +22,7 @@ class DataVizErrorType(StrEnum):
     OBJECT_DOES_NOT_EXIST_ERROR = "OBJECT_DOES_NOT_EXIST_ERROR"
     SYNTAX_ERROR = "SYNTAX_ERROR"
     CONNECTION_DATABASE_TIMEOUT = "CONNECTION_DATABASE_TIMEOUT"
+    CONNECTION_LIMIT_EXCEEDED_ERROR = "CONNECTION_LIMIT_EXCEEDED_ERROR"
 
 
 class ErrorLevel(StrEnum):
@@ -0,0 +1,40 @@
+from app.errors import DataVizError, DataVizErrorType, ErrorLevel
+
+
+class DataVizErrorException(Exception):
+    """
+    Exception carrying a ``DataVizError``, so its type reaches the API.
+    """
+
+    def __init__(self, error: DataVizError) -> None:
+        super().__init__(error.message)
+        self.error = error
+
+
+class QueryTimeoutException(DataVizErrorException):
+    def __init__(self, timeout: float) -> None:
+        super().__init__(
+            DataVizError(
+                message=f"The query exceeded the {timeout:g} seconds timeout.",
+                error_type=DataVizErrorType.CONNECTION_DATABASE_TIMEOUT,
+                level=ErrorLevel.ERROR,
+                extra={"timeout": timeout},
+            )
+        )
+        self.timeout = timeout
+
+
+class ConnectionLimitExceededException(DataVizErrorException):
+    def __init__(self, max_connections: int) -> None:
+        super().__init__(
+            DataVizError(
+                message=(
+                    f"All {max_connections} connections to target databases are in use, "
+                    "try again later."
+                ),
+                error_type=DataVizErrorType.CONNECTION_LIMIT_EXCEEDED_ERROR,
+                level=ErrorLevel.ERROR,
+                extra={"max_connections": max_connections},
+            )
+        )
+        self.max_connections = max_connections
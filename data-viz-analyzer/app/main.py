@@ -1,8 +1,45 @@
-from fastapi import FastAPI
-from app.routers import database
+import asyncio
+import time
+
+from fastapi import FastAPI, Request
+from app.routers import chart, database, jobs, metrics
+from app.services.rollups import run_rollup_scheduler
+from app.settings import ROLLUP_SCHEDULER_INTERVAL
+from app.utils.metrics import HTTP_REQUEST_DURATION
 
 app = FastAPI()
+app.include_router(chart.router)
 app.include_router(database.router)
+app.include_router(jobs.router)
+app.include_router(metrics.router)
+
+
+@app.middleware("http")
+async def record_request_duration(request: Request, call_next):
+    started = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        # the route template, so paths with ids don't each get their own series
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        HTTP_REQUEST_DURATION.observe(
+            time.perf_counter() - started, request.method, route, str(status_code)
+        )
+
+
+@app.on_event("startup")
+async def start_rollup_scheduler():
+    if ROLLUP_SCHEDULER_INTERVAL > 0:
+        app.state.rollup_scheduler = asyncio.create_task(run_rollup_scheduler())
+
+
+@app.on_event("shutdown")
+async def stop_rollup_scheduler():
+    if scheduler := getattr(app.state, "rollup_scheduler", None):
+        scheduler.cancel()
 
 
 @app.get("/")
@@ -1 +1,3 @@
+from .chart import *
 from .dbs import *
+from .jobs import *
@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta
+from typing import Any, List, Optional
+from pydantic import BaseModel
+
+from app.services.chart_query import ChartQuery, Filter, Metric
+from app.utils.constants import DownsamplingMethod
+
+
+class MetricModel(BaseModel):
+    aggregate: str
+    column: str = None
+    label: str = None
+
+
+class FilterModel(BaseModel):
+    column: str
+    operator: str
+    value: Any = None
+
+
+class ChartQueryModel(BaseModel):
+    database_id: int
+    table_name: str
+    temporal_column: str
+    metrics: List[MetricModel]
+    time_grain: str = None
+    schema_name: str = None
+    groupby: List[str] = []
+    filters: List[FilterModel] = []
+    start: datetime = None
+    end: datetime = None
+    temporal_column_type: str = "TIMESTAMP"
+    fill_gaps: bool = False
+    row_limit: int = None
+    max_points: int = None
+    downsampling: DownsamplingMethod = DownsamplingMethod.LTTB
+    incremental: bool = False
+    # seconds
+    late_arrival: float = None
+    force: bool = False
+
+    def to_chart_query(self) -> ChartQuery:
+        return ChartQuery(
+            table_name=self.table_name,
+            temporal_column=self.temporal_column,
+            metrics=[
+                Metric(metric.aggregate, metric.column, metric.label)
+                for metric in self.metrics
+            ],
+            time_grain=self.time_grain,
+            schema=self.schema_name,
+            groupby=list(self.groupby),
+            filters=[
+                Filter(filter_.column, filter_.operator, filter_.value)
+                for filter_ in self.filters
+            ],
+            time_range=(self.start, self.end),
+            temporal_column_type=self.temporal_column_type,
+            fill_gaps=self.fill_gaps,
+            row_limit=self.row_limit,
+            max_points=self.max_points,
+            downsampling=self.downsampling,
+            incremental=self.incremental,
+            late_arrival=(
+                timedelta(seconds=self.late_arrival)
+                if self.late_arrival is not None
+                else None
+            ),
+        )
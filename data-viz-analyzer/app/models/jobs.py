@@ -0,0 +1,10 @@
+from typing import Dict, Any
+from pydantic import BaseModel
+
+
+class QueryJobModel(BaseModel):
+    database_id: int
+    sql: str
+    parameters: Dict[str, Any] = None
+    limit: int = None
+    timeout: float = None
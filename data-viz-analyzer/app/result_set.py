@@ -0,0 +1,480 @@
+import sys
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Iterable, Optional, Sequence, TYPE_CHECKING
+
+import numpy as np
+from sqlalchemy import types
+
+from app.utils.core import ColumnSpec, ColumnTypeSource, GenericDataType
+
+if TYPE_CHECKING:
+    from app.engine_specifics.base import BaseSpecificEngine
+
+DATETIME_DTYPE = np.dtype("datetime64[us]")
+TIMEDELTA_DTYPE = np.dtype("timedelta64[us]")
+DICTIONARY_CODE_DTYPE = np.dtype("int32")
+# Integer value of NaT in datetime64 buffers
+NAT = np.iinfo(np.int64).min
+# Objects sized to estimate the memory held by an object array
+SIZE_SAMPLE = 1000
+
+_EPOCH = datetime(1970, 1, 1)
+_EPOCH_UTC = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_EPOCH_DATE = date(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+@dataclass
+class ResultColumn:
+    """
+    One typed column of a result set.
+
+    ``values`` holds a contiguous buffer: int64/float64 for numeric columns,
+    datetime64/timedelta64 for temporal ones, bool for booleans and int32
+    dictionary codes (into ``dictionary``) for strings. Anything that can't be
+    typed is kept as an object array, as are exact decimals so they keep
+    their precision. ``nulls`` is a bool mask, ``None`` when the column has
+    no nulls. Time zone aware timestamps are stored as naive UTC, flagged by
+    ``tz_aware``, and handed back aware in UTC.
+    """
+
+    name: str
+    column_spec: Optional[ColumnSpec]
+    generic_type: Optional[GenericDataType]
+    values: np.ndarray
+    nulls: Optional[np.ndarray] = None
+    dictionary: Optional[np.ndarray] = None
+    tz_aware: bool = False
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    @property
+    def is_dttm(self) -> bool:
+        return self.generic_type == GenericDataType.TEMPORAL
+
+    @property
+    def nbytes(self) -> int:
+        size = self.values.nbytes
+        if self.values.dtype == np.dtype(object):
+            size += _estimate_objects_size(self.values)
+        if self.nulls is not None:
+            size += self.nulls.nbytes
+        if self.dictionary is not None:
+            size += self.dictionary.nbytes + _estimate_objects_size(self.dictionary)
+        return size
+
+    def decoded(self) -> np.ndarray:
+        if self.dictionary is not None:
+            return self.dictionary[self.values]
+        return self.values
+
+    def to_list(self) -> list[Any]:
+        values = self.decoded()
+        if values.dtype == DATETIME_DTYPE:
+            items = values.astype(object).tolist()
+            if self.tz_aware:
+                items = [
+                    item.replace(tzinfo=timezone.utc) if item is not None else None
+                    for item in items
+                ]
+        elif values.dtype == TIMEDELTA_DTYPE:
+            items = values.astype(object).tolist()
+        else:
+            items = values.tolist()
+        if self.nulls is not None:
+            for idx in np.flatnonzero(self.nulls).tolist():
+                items[idx] = None
+        return items
+
+    @classmethod
+    def concat(cls, columns: Sequence["ResultColumn"]) -> "ResultColumn":
+        """
+        Append columns of the same name, string dictionaries are merged and
+        the codes of the later columns remapped into the merged one.
+        """
+        first = columns[0]
+        if any(column.dictionary is not None for column in columns) and all(
+            column.dictionary is not None or not len(column) for column in columns
+        ):
+            codes: dict[Any, int] = {}
+            chunks = []
+            for column in columns:
+                if column.dictionary is None:
+                    chunks.append(column.values.astype(DICTIONARY_CODE_DTYPE))
+                    continue
+                remap = np.fromiter(
+                    (codes.setdefault(value, len(codes)) for value in column.dictionary),
+                    dtype=DICTIONARY_CODE_DTYPE,
+                    count=len(column.dictionary),
+                )
+                chunks.append(remap[column.values] if len(remap) else column.values)
+            dictionary = np.empty(len(codes), dtype=object)
+            dictionary[:] = list(codes)
+        else:
+            chunks = [column.decoded() for column in columns]
+            dictionary = None
+            dtype = chunks[0].dtype
+            for chunk in chunks[1:]:
+                try:
+                    dtype = np.result_type(dtype, chunk.dtype)
+                except TypeError:
+                    dtype = np.dtype(object)
+            chunks = [chunk.astype(dtype, copy=False) for chunk in chunks]
+
+        nulls = None
+        if any(column.nulls is not None for column in columns):
+            nulls = np.concatenate(
+                [
+                    column.nulls
+                    if column.nulls is not None
+                    else np.zeros(len(column), dtype=bool)
+                    for column in columns
+                ]
+            )
+        return ResultColumn(
+            name=first.name,
+            column_spec=first.column_spec,
+            generic_type=next(
+                (column.generic_type for column in columns if column.generic_type is not None),
+                None,
+            ),
+            values=np.concatenate(chunks),
+            nulls=nulls,
+            dictionary=dictionary,
+            tz_aware=first.tz_aware,
+        )
+
+    def take(self, indices: np.ndarray) -> "ResultColumn":
+        return ResultColumn(
+            name=self.name,
+            column_spec=self.column_spec,
+            generic_type=self.generic_type,
+            values=self.values[indices],
+            nulls=self.nulls[indices] if self.nulls is not None else None,
+            dictionary=self.dictionary,
+            tz_aware=self.tz_aware,
+        )
+
+
+class ColumnarResultSet:
+    def __init__(self, columns: list[ResultColumn]) -> None:
+        self.columns = columns
+
+    def __len__(self) -> int:
+        return len(self.columns[0]) if self.columns else 0
+
+    @property
+    def column_names(self) -> list[str]:
+        return [column.name for column in self.columns]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(column.nbytes for column in self.columns)
+
+    def column(self, name: str) -> ResultColumn:
+        for column in self.columns:
+            if column.name == name:
+                return column
+        raise KeyError(name)
+
+    def take(self, indices: np.ndarray) -> "ColumnarResultSet":
+        return ColumnarResultSet([column.take(indices) for column in self.columns])
+
+    @classmethod
+    def concat(cls, result_sets: Sequence["ColumnarResultSet"]) -> "ColumnarResultSet":
+        """
+        Append result sets with the same columns, as ``UNION ALL`` would.
+        """
+        return cls(
+            [
+                ResultColumn.concat(columns)
+                for columns in zip(*(result_set.columns for result_set in result_sets))
+            ]
+        )
+
+    def to_rows(self) -> list[tuple[Any, ...]]:
+        return list(zip(*(column.to_list() for column in self.columns)))
+
+    def to_dict(self) -> dict[str, Any]:
+        """
+        Column-oriented serialization: string columns are sent once as a
+        dictionary plus integer codes rather than one object per cell.
+        """
+        data: dict[str, Any] = {}
+        for column in self.columns:
+            if column.dictionary is not None:
+                codes = column.values.tolist()
+                if column.nulls is not None:
+                    for idx in np.flatnonzero(column.nulls).tolist():
+                        codes[idx] = None
+                data[column.name] = {
+                    "dictionary": column.dictionary.tolist(),
+                    "codes": codes,
+                }
+            else:
+                data[column.name] = column.to_list()
+        return {
+            "columns": [
+                {
+                    "name": column.name,
+                    "type": column.generic_type.name if column.generic_type is not None else None,
+                    "is_dttm": column.is_dttm,
+                }
+                for column in self.columns
+            ],
+            "data": data,
+        }
+
+    @classmethod
+    def from_batches(
+        cls,
+        description: Sequence[Any],
+        batches: Iterable[Sequence[Sequence[Any]]],
+        engine_specific: type["BaseSpecificEngine"],
+    ) -> "ColumnarResultSet":
+        builder = ColumnarResultSetBuilder(description, engine_specific)
+        for columns in batches:
+            builder.append(columns)
+        return builder.build()
+
+
+def infer_generic_type(values: Sequence[Any]) -> Optional[GenericDataType]:
+    for value in values:
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            return GenericDataType.BOOLEAN
+        if isinstance(value, (int, float, Decimal)):
+            return GenericDataType.NUMERIC
+        if isinstance(value, (datetime, date, timedelta)):
+            return GenericDataType.TEMPORAL
+        if isinstance(value, str):
+            return GenericDataType.STRING
+        return None
+    return None
+
+
+def _null_mask(values: Sequence[Any]) -> Optional[np.ndarray]:
+    mask = np.fromiter((value is None for value in values), dtype=bool, count=len(values))
+    return mask if mask.any() else None
+
+
+def _estimate_objects_size(values: np.ndarray) -> int:
+    # sizing every object costs about as much as building the column, a
+    # sample is close enough to budget caches with
+    if not len(values):
+        return 0
+    sample = values[:: max(len(values) // SIZE_SAMPLE, 1)]
+    return sum(map(sys.getsizeof, sample)) * len(values) // len(sample)
+
+
+class _ColumnBuffer:
+    def __init__(self, name: str, column_spec: Optional[ColumnSpec]) -> None:
+        self.name = name
+        self.column_spec = column_spec
+        self.generic_type = column_spec.generic_type if column_spec else None
+        self.dtype: Optional[np.dtype] = None
+        self.chunks: list[np.ndarray] = []
+        self.null_chunks: list[Optional[np.ndarray]] = []
+        self.dictionary: Optional[dict[Any, int]] = None
+        # subtracted from timestamps to get their datetime64 value, None when
+        # they aren't date or datetime objects
+        self.epoch: Any = None
+        self.tz_aware = False
+
+    def _resolve_dtype(self, values: Sequence[Any]) -> np.dtype:
+        if self.generic_type is None:
+            self.generic_type = infer_generic_type(values)
+
+        sqla_type = self.column_spec.sqla_type if self.column_spec else None
+        sample = next((value for value in values if value is not None), None)
+        if self.generic_type == GenericDataType.NUMERIC:
+            if isinstance(sqla_type, types.Integer) or (
+                sqla_type is None and isinstance(sample, int)
+            ):
+                return np.dtype("int64")
+            if isinstance(sample, Decimal):
+                # NUMERIC/DECIMAL values, float64 would round money and the like
+                return np.dtype(object)
+            return np.dtype("float64")
+        if self.generic_type == GenericDataType.TEMPORAL:
+            if isinstance(sqla_type, types.Interval) or isinstance(sample, timedelta):
+                return TIMEDELTA_DTYPE
+            if isinstance(sqla_type, types.Time) or isinstance(sample, time):
+                return np.dtype(object)
+            if isinstance(sample, datetime):
+                self.tz_aware = sample.tzinfo is not None
+                self.epoch = _EPOCH_UTC if self.tz_aware else _EPOCH
+            elif isinstance(sample, date):
+                self.epoch = _EPOCH_DATE
+            return DATETIME_DTYPE
+        if self.generic_type == GenericDataType.BOOLEAN:
+            return np.dtype(bool)
+        if self.generic_type == GenericDataType.STRING:
+            self.dictionary = {}
+            return DICTIONARY_CODE_DTYPE
+        return np.dtype(object)
+
+    def _convert(self, values: Sequence[Any], nulls: Optional[np.ndarray]) -> np.ndarray:
+        if self.dictionary is not None:
+            codes = self.dictionary
+            return np.fromiter(
+                (
+                    0 if value is None else codes.setdefault(value, len(codes))
+                    for value in values
+                ),
+                dtype=DICTIONARY_CODE_DTYPE,
+                count=len(values),
+            )
+        if self.dtype == np.dtype(object):
+            array = np.empty(len(values), dtype=object)
+            array[:] = list(values)
+            return array
+        if self.dtype == DATETIME_DTYPE:
+            # much faster than numpy converting the objects; values mixing
+            # naive and aware timestamps raise and fall back to objects
+            epoch = self.epoch
+            if epoch is None:
+                # e.g. ISO strings from drivers returning text
+                return np.array(values, dtype=DATETIME_DTYPE)
+            return np.fromiter(
+                (
+                    NAT if value is None else (value - epoch) // _MICROSECOND
+                    for value in values
+                ),
+                dtype=np.int64,
+                count=len(values),
+            ).view(DATETIME_DTYPE)
+        if self.dtype == TIMEDELTA_DTYPE:
+            return np.array(values, dtype=TIMEDELTA_DTYPE)
+        if nulls is not None:
+            values = [0 if value is None else value for value in values]
+        return np.asarray(values, dtype=self.dtype)
+
+    def _fallback_to_object(self) -> None:
+        decoded = []
+        for chunk in self.chunks:
+            if self.dictionary is not None:
+                chunk = np.array(list(self.dictionary), dtype=object)[chunk]
+            chunk = chunk.astype(object)
+            if self.tz_aware and self.dtype == DATETIME_DTYPE:
+                chunk[:] = [
+                    value.replace(tzinfo=timezone.utc) if value is not None else None
+                    for value in chunk
+                ]
+            decoded.append(chunk)
+        self.chunks = decoded
+        self.dictionary = None
+        self.dtype = np.dtype(object)
+        # the objects keep their own time zone
+        self.tz_aware = False
+
+    def _set_dtype(self, dtype: np.dtype) -> None:
+        self.dtype = dtype
+        # chunks appended before the type was known only hold nulls
+        self.chunks = [self._empty(len(chunk)) for chunk in self.chunks]
+
+    def _append_array(self, values: np.ndarray) -> None:
+        if self.dtype is None:
+            self._set_dtype(values.dtype)
+        if values.dtype != self.dtype:
+            try:
+                dtype = np.result_type(self.dtype, values.dtype)
+            except TypeError:
+                dtype = np.dtype(object)
+            self.chunks = [chunk.astype(dtype) for chunk in self.chunks]
+            self.dtype = dtype
+            values = values.astype(dtype)
+        self.chunks.append(values)
+        self.null_chunks.append(None)
+
+    def append(self, values: Sequence[Any]) -> None:
+        if (
+            isinstance(values, np.ndarray)
+            and values.dtype.kind in "biufmM"
+            and self.dictionary is None
+        ):
+            self._append_array(values)
+            return
+
+        nulls = _null_mask(values)
+        if self.dtype is None:
+            if nulls is not None and nulls.all():
+                # nothing to type yet, keep the nulls until real values arrive
+                self.chunks.append(np.empty(len(values), dtype=object))
+                self.null_chunks.append(nulls)
+                return
+            self._set_dtype(self._resolve_dtype(values))
+
+        try:
+            chunk = self._convert(values, nulls)
+        except (TypeError, ValueError, OverflowError):
+            self._fallback_to_object()
+            chunk = self._convert(values, nulls)
+        self.chunks.append(chunk)
+        self.null_chunks.append(nulls)
+
+    def _empty(self, length: int) -> np.ndarray:
+        if self.dtype == np.dtype(object):
+            return np.empty(length, dtype=object)
+        return np.zeros(length, dtype=self.dtype)
+
+    def build(self) -> ResultColumn:
+        if self.dtype is None:
+            self.dtype = np.dtype(object)
+        length = sum(len(chunk) for chunk in self.chunks)
+        values = np.concatenate(self.chunks) if self.chunks else self._empty(0)
+        nulls = None
+        if any(chunk is not None for chunk in self.null_chunks):
+            nulls = np.concatenate(
+                [
+                    chunk if chunk is not None else np.zeros(len(values_chunk), dtype=bool)
+                    for chunk, values_chunk in zip(self.null_chunks, self.chunks)
+                ]
+            )
+        dictionary = None
+        if self.dictionary is not None:
+            dictionary = np.empty(len(self.dictionary), dtype=object)
+            dictionary[:] = list(self.dictionary)
+        return ResultColumn(
+            name=self.name,
+            column_spec=self.column_spec,
+            generic_type=self.generic_type,
+            values=values.astype(self.dtype, copy=False) if length else self._empty(0),
+            nulls=nulls,
+            dictionary=dictionary,
+            tz_aware=self.tz_aware,
+        )
+
+
+class ColumnarResultSetBuilder:
+    """
+    Accumulates cursor batches, already transposed into columns, into one
+    typed buffer per column.
+    """
+
+    def __init__(
+        self,
+        description: Sequence[Any],
+        engine_specific: type["BaseSpecificEngine"],
+    ) -> None:
+        self._buffers = [
+            _ColumnBuffer(
+                row[0],
+                engine_specific.get_column_spec(
+                    engine_specific.get_datatype(row[1]),
+                    source=ColumnTypeSource.CURSOR_DESCRIPTION,
+                ),
+            )
+            for row in description
+        ]
+
+    def append(self, columns: Sequence[Sequence[Any]]) -> None:
+        for buffer, values in zip(self._buffers, columns):
+            buffer.append(values)
+
+    def build(self) -> ColumnarResultSet:
+        return ColumnarResultSet([buffer.build() for buffer in self._buffers])
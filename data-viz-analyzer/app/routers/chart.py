@@ -0,0 +1,32 @@
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.daos.dbs import DbsDAO
+from app.models.chart import ChartQueryModel
+from app.database import get_db_context
+from app.services.query import execute_chart_query
+
+router = APIRouter(prefix='/chart', tags=['Chart'])
+
+
+def http_exception():
+    return HTTPException(status_code=404, detail="Item not found")
+
+
+@router.post("/data")
+async def get_chart_data(
+    request: ChartQueryModel, db: AsyncSession = Depends(get_db_context)
+) -> dict:
+    database = await DbsDAO.find_by_id(request.database_id, db)
+    if database is None:
+        raise http_exception()
+    try:
+        # builds the statement, then runs it on a pooled connection
+        result = await asyncio.to_thread(
+            execute_chart_query, database, request.to_chart_query(), request.force
+        )
+    except ValueError as ex:
+        # unsupported aggregates, operators or downsampling methods
+        raise HTTPException(status_code=400, detail=str(ex)) from ex
+    return {"message": "OK", "data": result.to_dict()}
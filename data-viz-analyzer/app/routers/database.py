@@ -1,14 +1,28 @@
+import asyncio
+import hashlib
 import json
+from typing import Any
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import ValidationError
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
-from app.schemas.dbs import DBS
+from app.daos.dbs import DbsDAO, LISTABLE_COLUMNS
 from app.models.dbs import DBSValidateParametersModel
 from app.schemas.dbs import DBSValidateParametersSchema
-from app.commands.database.validate import ValidateDatabaseParametersCommand
-from app.database import get_db_context
+from app.commands.database.validate import (
+    BulkValidateDatabaseParametersCommand,
+    ValidateDatabaseParametersCommand,
+)
+from app.database import AsyncSessionLocal, get_db_context
+from app.services.metadata_cache import metadata_cache
+from app.settings import (
+    DATABASE_PAGE_SIZE,
+    MAX_DATABASE_PAGE_SIZE,
+    MAX_VALIDATION_CONCURRENCY,
+    VALIDATION_CONCURRENCY,
+)
 
 router = APIRouter(prefix='/database', tags=['Database'])
 
@@ -17,21 +31,82 @@ def http_exception():
     return HTTPException(status_code=404, detail="Item not found")
 
 
+def parse_fields(fields: str | None) -> list[str]:
+    if not fields:
+        return list(LISTABLE_COLUMNS)
+    columns = [field.strip() for field in fields.split(",") if field.strip()]
+    if invalid := sorted(set(columns) - set(LISTABLE_COLUMNS)):
+        raise HTTPException(
+            status_code=400, detail=f"Unknown fields: {', '.join(invalid)}"
+        )
+    return columns
+
+
+def serialize_column(column: dict[str, Any]) -> dict[str, Any]:
+    # the column spec holds a SQLAlchemy type, only its plain parts are sent
+    column_spec = column.get("column_spec")
+    return {
+        "name": column["name"],
+        "type": column["type"],
+        "nullable": column["nullable"],
+        "default": column["default"],
+        "primary_key": column.get("primary_key"),
+        "generic_type": column_spec.generic_type if column_spec else None,
+        "is_dttm": column_spec.is_dttm if column_spec else False,
+    }
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    if not (if_none_match := request.headers.get("if-none-match")):
+        return False
+    candidates = {
+        candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")
+    }
+    return etag in candidates or "*" in candidates
+
+
 @router.get("")
-async def get_database_connections(db: Session = Depends(get_db_context)):
+async def get_database_connections(
+    request: Request,
+    response: Response,
+    after: int | None = Query(None, ge=0, description="Last id of the previous page"),
+    limit: int = Query(DATABASE_PAGE_SIZE, ge=1, le=MAX_DATABASE_PAGE_SIZE),
+    fields: str | None = Query(None, description="Comma separated, e.g. id,name,uuid"),
+    name_prefix: str | None = Query(None, min_length=1),
+    db: AsyncSession = Depends(get_db_context),
+):
+    columns = parse_fields(fields)
+    version = await DbsDAO.get_listing_version(db, name_prefix)
+    etag = '"{}"'.format(
+        hashlib.sha256(
+            json.dumps(
+                [version, after, limit, columns, name_prefix], default=str
+            ).encode()
+        ).hexdigest()[:32]
+    )
+    if etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+
+    data = await DbsDAO.find_page(db, after, limit, columns, name_prefix)
+    next_after = data[-1]["id"] if len(data) == limit else None
+    if "id" not in columns:
+        for row in data:
+            del row["id"]
     return {
         "message": "OK",
-        "data": db.query(DBS).all()
+        "data": data,
+        "next_after": next_after,
     }
 
 
 @router.post("")
-async def connect_to_database(db: Session = Depends(get_db_context)) -> dict:
+async def connect_to_database(db: AsyncSession = Depends(get_db_context)) -> dict:
     return {"message": "OK"}
 
 
 @router.post("/check", status_code=status.HTTP_200_OK)
-async def check_connection(request: DBSValidateParametersModel, db: Session = Depends(get_db_context)) -> dict:
+async def check_connection(request: DBSValidateParametersModel, db: AsyncSession = Depends(get_db_context)) -> dict:
     try:
         payload = DBSValidateParametersSchema().load(json.loads(request.json()))
     except ValidationError as e:
@@ -39,6 +114,90 @@ async def check_connection(request: DBSValidateParametersModel, db: Session = De
         raise HTTPException(status_code=400, detail=errors) from e
 
     command = ValidateDatabaseParametersCommand(payload, db)
-    command.run()
+    await command.run()
 
     return {"message": "OK"}
+
+
+@router.post("/check/bulk", status_code=status.HTTP_200_OK)
+async def check_connections(
+    requests: list[DBSValidateParametersModel],
+    concurrency: int = Query(
+        VALIDATION_CONCURRENCY, ge=1, le=MAX_VALIDATION_CONCURRENCY
+    ),
+) -> StreamingResponse:
+    items = [json.loads(request.json()) for request in requests]
+
+    async def stream_results():
+        # not the session of a dependency, which may be closed by the time the
+        # response streams, the stream keeps its own open until it ends
+        async with AsyncSessionLocal() as db:
+            command = BulkValidateDatabaseParametersCommand(items, db, concurrency)
+            async for index, errors in command.run():
+                yield json.dumps(
+                    {"index": index, "errors": [error.to_dict() for error in errors]}
+                ) + "\n"
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+
+@router.get("/{pk}/schemas")
+async def get_schemas(
+    pk: int, force: bool = False, db: AsyncSession = Depends(get_db_context)
+) -> dict:
+    database = await DbsDAO.find_by_id(pk, db)
+    if database is None:
+        raise http_exception()
+    schemas = await asyncio.to_thread(metadata_cache.get_schema_names, database, force)
+    # the table lists are likely next, load them while the schemas are shown
+    metadata_cache.warm(database)
+    return {"message": "OK", "data": schemas}
+
+
+@router.get("/{pk}/schemas/{schema}/tables")
+async def get_tables(
+    pk: int, schema: str, force: bool = False, db: AsyncSession = Depends(get_db_context)
+) -> dict:
+    database = await DbsDAO.find_by_id(pk, db)
+    if database is None:
+        raise http_exception()
+    tables = await asyncio.to_thread(
+        metadata_cache.get_table_names, database, schema, force
+    )
+    return {"message": "OK", "data": tables}
+
+
+@router.get("/{pk}/schemas/{schema}/columns")
+async def get_schema_columns(
+    pk: int, schema: str, force: bool = False, db: AsyncSession = Depends(get_db_context)
+) -> dict:
+    database = await DbsDAO.find_by_id(pk, db)
+    if database is None:
+        raise http_exception()
+    tables = await asyncio.to_thread(
+        metadata_cache.get_schema_columns, database, schema, force
+    )
+    return {
+        "message": "OK",
+        "data": {
+            table_name: [serialize_column(column) for column in columns]
+            for table_name, columns in tables.items()
+        },
+    }
+
+
+@router.get("/{pk}/schemas/{schema}/tables/{table_name}/columns")
+async def get_columns(
+    pk: int,
+    schema: str,
+    table_name: str,
+    force: bool = False,
+    db: AsyncSession = Depends(get_db_context),
+) -> dict:
+    database = await DbsDAO.find_by_id(pk, db)
+    if database is None:
+        raise http_exception()
+    columns = await asyncio.to_thread(
+        metadata_cache.get_columns, database, table_name, schema, force
+    )
+    return {"message": "OK", "data": [serialize_column(column) for column in columns]}
@@ -0,0 +1,86 @@
+import asyncio
+import json
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
+from app.daos.dbs import DbsDAO
+from app.models.jobs import QueryJobModel
+from app.database import get_db_context
+from app.services.jobs import QueryJob, job_manager
+from app.settings import JOB_POLL_INTERVAL
+
+router = APIRouter(prefix='/jobs', tags=['Jobs'])
+
+
+def http_exception():
+    return HTTPException(status_code=404, detail="Item not found")
+
+
+def get_job(job_id: str) -> QueryJob:
+    if (job := job_manager.get(job_id)) is None:
+        raise http_exception()
+    return job
+
+
+@router.post("", status_code=status.HTTP_202_ACCEPTED)
+async def submit_query_job(
+    request: QueryJobModel, db: AsyncSession = Depends(get_db_context)
+) -> dict:
+    database = await DbsDAO.find_by_id(request.database_id, db)
+    if database is None:
+        raise http_exception()
+    # looking the result cache up may read its disk tier, keep it off the loop
+    job = await asyncio.to_thread(
+        job_manager.submit,
+        database,
+        request.sql,
+        request.parameters,
+        request.limit,
+        request.timeout,
+    )
+    return {"message": "OK", "data": job.to_dict()}
+
+
+@router.get("/{job_id}")
+async def get_query_job(job_id: str) -> dict:
+    return {"message": "OK", "data": get_job(job_id).to_dict()}
+
+
+@router.get("/{job_id}/events")
+async def stream_query_job(job_id: str) -> StreamingResponse:
+    job = get_job(job_id)
+
+    async def stream_statuses():
+        last_status = None
+        while True:
+            if job.status != last_status:
+                last_status = job.status
+                yield json.dumps(job.to_dict()) + "\n"
+            if job.is_finished:
+                return
+            await asyncio.sleep(JOB_POLL_INTERVAL)
+
+    return StreamingResponse(stream_statuses(), media_type="application/x-ndjson")
+
+
+@router.get("/{job_id}/result")
+async def get_query_job_result(job_id: str) -> dict:
+    job = get_job(job_id)
+    if not job.is_finished:
+        raise HTTPException(status_code=409, detail="Job is not finished")
+    result = job_manager.get_result(job)
+    if result is None:
+        # failed or cancelled
+        raise http_exception()
+    return {"message": "OK", "data": result.to_dict()}
+
+
+@router.delete("/{job_id}")
+async def cancel_query_job(job_id: str) -> dict:
+    # cancelling a running query opens a connection, keep it off the loop
+    job = await asyncio.to_thread(job_manager.cancel, job_id)
+    if job is None:
+        raise http_exception()
+    return {"message": "OK", "data": job.to_dict()}
@@ -0,0 +1,13 @@
+from fastapi import APIRouter, Response
+
+from app.utils.metrics import generate_latest
+
+router = APIRouter(tags=['Metrics'])
+
+# Starlette appends the charset to text media types
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+
+@router.get("/metrics")
+async def get_metrics() -> Response:
+    return Response(generate_latest(), media_type=CONTENT_TYPE)
@@ -5,7 +5,9 @@ import uuid
 import json
 from marshmallow import EXCLUDE, fields, pre_load, Schema, validates_schema, ValidationError
 from marshmallow.validate import Length
-from sqlalchemy import Column, Integer, Uuid, String, MetaData, Boolean, Text, URL
+from sqlalchemy import Column, Integer, Uuid, String, MetaData, Boolean, Text, URL, Engine, event
+from sqlalchemy import inspect as sqla_inspect
+from sqlalchemy.orm import Session, object_session
 from sqlalchemy.exc import NoSuchModuleError
 
 from app.utils.constants import PASSWORD_MASK
@@ -15,6 +17,8 @@ from app.engine_specifics import get_engine_specific
 from app.engine_specifics.base import BaseSpecificEngine
 from app.database import Base
 from app.schemas.base_entity import BaseEntity
+from app.services.engine_manager import engine_manager
+from app.services.metadata_cache import metadata_cache
 
 
 def extra_validator(value: str) -> str:
@@ -73,6 +77,9 @@ class DBS(Base, BaseEntity):
         conn = conn.set(password=self.password)
         return str(conn)
 
+    def get_sqla_engine(self) -> Engine:
+        return engine_manager.get_engine(self)
+
     @property
     def db_engine_specific(self) -> builtins.type[BaseSpecificEngine]:
         url = make_url_safe(self.sqlalchemy_uri_decrypted)
@@ -94,6 +101,44 @@ class DBS(Base, BaseEntity):
         orm_mode = True
 
 
+# Columns the connection, and so its pool and metadata, depends on
+CONNECTION_ATTRIBUTES = ("sqlalchemy_uri", "password", "server_cert", "extra")
+# Key of the session info holding the databases to release once committed
+_RELEASED_DATABASES = "released_databases"
+
+
+def _release_on_commit(target: DBS) -> None:
+    if target.uuid is not None and (session := object_session(target)) is not None:
+        session.info.setdefault(_RELEASED_DATABASES, set()).add(target.uuid)
+
+
+@event.listens_for(DBS, "after_update")
+def release_updated_connection(mapper, connection, target: DBS) -> None:
+    # any other column, e.g. the name, leaves the pool and metadata valid
+    state = sqla_inspect(target)
+    if any(state.attrs[name].history.has_changes() for name in CONNECTION_ATTRIBUTES):
+        _release_on_commit(target)
+
+
+@event.listens_for(DBS, "after_delete")
+def release_deleted_connection(mapper, connection, target: DBS) -> None:
+    _release_on_commit(target)
+
+
+@event.listens_for(Session, "after_commit")
+def release_connections(session: Session) -> None:
+    # only once committed, a rolled back edit keeps the database as it was
+    for database_uuid in session.info.pop(_RELEASED_DATABASES, ()):
+        metadata_cache.invalidate(database_uuid)
+        # the pool would otherwise keep connections opened with the old credentials
+        engine_manager.dispose(database_uuid)
+
+
+@event.listens_for(Session, "after_rollback")
+def forget_released_connections(session: Session) -> None:
+    session.info.pop(_RELEASED_DATABASES, None)
+
+
 class DBSValidateParametersSchema(Schema):
     class Meta:
         unknown = EXCLUDE
@@ -0,0 +1,330 @@
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Optional, TYPE_CHECKING
+
+from sqlalchemy import literal
+from sqlalchemy.engine import Dialect
+from sqlalchemy.sql.type_api import TypeEngine
+
+from app.engine_specifics.base import BaseSpecificEngine
+from app.utils.constants import DownsamplingMethod
+
+if TYPE_CHECKING:
+    from app.schemas.dbs import DBS
+
+TIMESTAMP_LABEL = "__timestamp"
+
+AGGREGATES = {
+    "COUNT": "COUNT({col})",
+    "COUNT_DISTINCT": "COUNT(DISTINCT {col})",
+    "SUM": "SUM({col})",
+    "AVG": "AVG({col})",
+    "MIN": "MIN({col})",
+    "MAX": "MAX({col})",
+}
+# Aggregates reporting 0 rather than NULL for buckets without rows
+_COUNT_AGGREGATES = {"COUNT", "COUNT_DISTINCT"}
+
+COMPARISON_OPERATORS = {
+    "==": "=",
+    "!=": "<>",
+    ">": ">",
+    ">=": ">=",
+    "<": "<",
+    "<=": "<=",
+    "LIKE": "LIKE",
+    "ILIKE": "ILIKE",
+}
+LIST_OPERATORS = {"IN": "IN", "NOT IN": "NOT IN"}
+NULL_OPERATORS = {"IS NULL": "IS NULL", "IS NOT NULL": "IS NOT NULL"}
+
+# Placeholders by DB-API paramstyle, positional styles get literals instead
+_PLACEHOLDERS = {"named": ":{}", "pyformat": "%({})s"}
+
+
+@dataclass
+class Metric:
+    aggregate: str
+    column: Optional[str] = None
+    label: Optional[str] = None
+    # SQL used instead of ``aggregate`` applied to ``column``
+    expression: Optional[str] = None
+
+    def get_label(self) -> str:
+        return self.label or f"{self.aggregate}({self.column or '*'})"
+
+
+@dataclass
+class Filter:
+    column: str
+    operator: str
+    value: Any = None
+
+
+@dataclass
+class ChartQuery:
+    """
+    A time series aggregation: ``metrics`` of ``table_name`` bucketed by
+    ``time_grain`` over ``temporal_column`` and split by ``groupby``.
+    ``time_range`` bounds are inclusive for the start and exclusive for the
+    end, ``fill_gaps`` adds the buckets without any row. Results are
+    downsampled to ``max_points`` per series with the ``downsampling`` method
+    when set. ``incremental`` queries of append-only tables are refreshed by
+    only querying the buckets past the cached ones, allowing rows to arrive
+    ``late_arrival`` late.
+    """
+
+    table_name: str
+    temporal_column: str
+    metrics: list[Metric]
+    time_grain: Optional[str] = None
+    schema: Optional[str] = None
+    groupby: list[str] = field(default_factory=list)
+    filters: list[Filter] = field(default_factory=list)
+    time_range: tuple[Optional[datetime], Optional[datetime]] = (None, None)
+    temporal_column_type: str = "TIMESTAMP"
+    fill_gaps: bool = False
+    row_limit: Optional[int] = None
+    max_points: Optional[int] = None
+    downsampling: str = DownsamplingMethod.LTTB
+    incremental: bool = False
+    late_arrival: Optional[timedelta] = None
+
+
+class ChartQueryBuilder:
+    """
+    Renders a ``ChartQuery`` as a single GROUP BY statement using the time
+    grain expressions of the engine, so the database does the bucketing
+    rather than charts pulling raw rows.
+
+    ``build_parameterized`` binds the filter values as parameters instead of
+    rendering literals, so moving the time range keeps the SQL text, and the
+    plan the database made for it, the same.
+    """
+
+    def __init__(
+        self, engine_specific: type[BaseSpecificEngine], dialect: Dialect
+    ) -> None:
+        self.engine_specific = engine_specific
+        self.dialect = dialect
+        # dialects of format paramstyles double percent signs when quoting and
+        # rendering literals, undone so the statement is the SQL as run
+        self._double_percents = dialect.paramstyle in ("format", "pyformat")
+        # collects the values bound while building a parameterized query
+        self._parameters: Optional[dict[str, Any]] = None
+
+    def _unescape(self, sql: str) -> str:
+        return sql.replace("%%", "%") if self._double_percents else sql
+
+    def quote(self, identifier: str) -> str:
+        return self._unescape(self.dialect.identifier_preparer.quote(identifier))
+
+    def get_type_sql(self, target_type: str) -> str:
+        column_spec = self.engine_specific.get_column_spec(target_type)
+        sqla_type = column_spec.sqla_type if column_spec else None
+        if isinstance(sqla_type, type):
+            sqla_type = sqla_type()
+        if isinstance(sqla_type, TypeEngine):
+            return sqla_type.compile(dialect=self.dialect)
+        return sqla_type or target_type
+
+    def render_value(self, value: Any, target_type: str = "TIMESTAMP") -> str:
+        """
+        Placeholder of ``value`` bound as a parameter when building a
+        parameterized query, datetimes cast to the type the engine maps
+        ``target_type`` to. Its literal otherwise.
+        """
+        if self._parameters is None:
+            return self.render_literal(value, target_type)
+        name = f"param_{len(self._parameters)}"
+        self._parameters[name] = value
+        # swapped for the placeholder of the paramstyle once the SQL is built
+        placeholder = f"\x00{name}\x00"
+        if isinstance(value, datetime):
+            return f"CAST({placeholder} AS {self.get_type_sql(target_type)})"
+        return placeholder
+
+    def render_literal(self, value: Any, target_type: str = "TIMESTAMP") -> str:
+        if isinstance(value, datetime):
+            if sql := self.engine_specific.convert_dttm(target_type, value):
+                return sql
+            value = value.isoformat(sep=" ")
+        return self._unescape(
+            str(
+                literal(value).compile(
+                    dialect=self.dialect, compile_kwargs={"literal_binds": True}
+                )
+            )
+        )
+
+    def get_table(self, query: ChartQuery) -> str:
+        table = self.quote(query.table_name)
+        if query.schema:
+            schema = self._unescape(self.dialect.identifier_preparer.quote_schema(query.schema))
+            return f"{schema}.{table}"
+        return table
+
+    def get_metric_expr(self, metric: Metric) -> str:
+        if metric.expression:
+            return metric.expression
+        try:
+            template = AGGREGATES[metric.aggregate.upper()]
+        except KeyError:
+            raise ValueError(f"Unsupported aggregate {metric.aggregate}") from None
+        return template.format(col=self.quote(metric.column) if metric.column else "*")
+
+    def get_filter_expr(self, query: ChartQuery, filter_: Filter) -> str:
+        column = self.quote(filter_.column)
+        operator = filter_.operator.upper()
+        target_type = (
+            query.temporal_column_type
+            if filter_.column == query.temporal_column
+            else "TIMESTAMP"
+        )
+        if operator in NULL_OPERATORS:
+            return f"{column} {NULL_OPERATORS[operator]}"
+        if operator in LIST_OPERATORS:
+            values = list(filter_.value or ())
+            if not values:
+                # nothing is in an empty list, everything is out of it
+                return "1 = 0" if operator == "IN" else "1 = 1"
+            rendered = ", ".join(self.render_value(value, target_type) for value in values)
+            return f"{column} {LIST_OPERATORS[operator]} ({rendered})"
+        if operator in COMPARISON_OPERATORS:
+            value = self.render_value(filter_.value, target_type)
+            return f"{column} {COMPARISON_OPERATORS[operator]} {value}"
+        raise ValueError(f"Unsupported filter operator {filter_.operator}")
+
+    def get_where_clauses(self, query: ChartQuery) -> list[str]:
+        temporal_column = self.quote(query.temporal_column)
+        start, end = query.time_range
+        clauses = []
+        if start is not None:
+            start_sql = self.render_value(start, query.temporal_column_type)
+            clauses.append(f"{temporal_column} >= {start_sql}")
+        if end is not None:
+            end_sql = self.render_value(end, query.temporal_column_type)
+            clauses.append(f"{temporal_column} < {end_sql}")
+        clauses.extend(self.get_filter_expr(query, filter_) for filter_ in query.filters)
+        return clauses
+
+    def build(self, query: ChartQuery) -> str:
+        if not query.metrics:
+            raise ValueError("A chart query needs at least one metric")
+
+        timestamp_expr = self.engine_specific.get_timestamp_expr(
+            self.quote(query.temporal_column), query.time_grain
+        )
+        dimensions = [self.quote(column) for column in query.groupby]
+        metrics = [
+            f"{self.get_metric_expr(metric)} AS {self.quote(metric.get_label())}"
+            for metric in query.metrics
+        ]
+        where = self.get_where_clauses(query)
+        sql = "\n".join(
+            [
+                "SELECT "
+                + ",\n       ".join(
+                    [f"{timestamp_expr} AS {TIMESTAMP_LABEL}", *dimensions, *metrics]
+                ),
+                f"FROM {self.get_table(query)}",
+                *(["WHERE " + "\n  AND ".join(where)] if where else []),
+                "GROUP BY " + ", ".join([timestamp_expr, *dimensions]),
+            ]
+        )
+        if query.fill_gaps and query.time_grain is not None:
+            if filled := self.fill_gaps(query, sql):
+                return filled
+        return f"{sql}\nORDER BY {TIMESTAMP_LABEL}"
+
+    def build_parameterized(
+        self, query: ChartQuery
+    ) -> tuple[str, Optional[dict[str, Any]]]:
+        """
+        ``build`` with the values bound as parameters in the paramstyle of the
+        dialect, along with them. Literals and no parameters for dialects
+        with positional paramstyles.
+        """
+        template = _PLACEHOLDERS.get(self.dialect.paramstyle)
+        if template is None:
+            return self.build(query), None
+
+        self._parameters = {}
+        try:
+            sql = self.build(query)
+            parameters = self._parameters
+        finally:
+            self._parameters = None
+        if not parameters:
+            return sql, None
+        if self.dialect.paramstyle == "pyformat":
+            # the driver formats the statement, literal percent signs are doubled
+            sql = sql.replace("%", "%%")
+        for name in parameters:
+            sql = sql.replace(f"\x00{name}\x00", template.format(name))
+        return sql, parameters
+
+    def fill_gaps(self, query: ChartQuery, sql: str) -> str | None:
+        """
+        Join the aggregated buckets onto every bucket of the time range, so
+        buckets without rows come back as rows of NULL (or 0 for counts)
+        instead of being missing. ``None`` if the engine can't generate series.
+        """
+        start, end = query.time_range
+        start_sql = (
+            self.engine_specific.get_timestamp_expr(
+                self.render_value(start, query.temporal_column_type), query.time_grain
+            )
+            if start is not None
+            else f"(SELECT MIN({TIMESTAMP_LABEL}) FROM __buckets)"
+        )
+        end_sql = (
+            self.render_value(end, query.temporal_column_type)
+            if end is not None
+            else f"(SELECT MAX({TIMESTAMP_LABEL}) FROM __buckets)"
+        )
+        series = self.engine_specific.get_time_series_expr(
+            start_sql, end_sql, query.time_grain
+        )
+        if series is None:
+            return None
+
+        dimensions = [self.quote(column) for column in query.groupby]
+        columns = [f"__series.{TIMESTAMP_LABEL}"]
+        columns.extend(f"__dimensions.{dimension}" for dimension in dimensions)
+        for metric in query.metrics:
+            label = self.quote(metric.get_label())
+            if metric.aggregate.upper() in _COUNT_AGGREGATES:
+                columns.append(f"COALESCE(__buckets.{label}, 0) AS {label}")
+            else:
+                columns.append(f"__buckets.{label}")
+
+        join_conditions = [f"__buckets.{TIMESTAMP_LABEL} = __series.{TIMESTAMP_LABEL}"]
+        join_conditions.extend(
+            f"__buckets.{dimension} IS NOT DISTINCT FROM __dimensions.{dimension}"
+            for dimension in dimensions
+        )
+        lines = [
+            f"WITH __buckets AS (\n{sql}\n)",
+            "SELECT " + ",\n       ".join(columns),
+            f"FROM {series} AS __series({TIMESTAMP_LABEL})",
+        ]
+        if dimensions:
+            lines.append(
+                f"CROSS JOIN (SELECT DISTINCT {', '.join(dimensions)} FROM __buckets)"
+                " AS __dimensions"
+            )
+        lines.append(f"LEFT JOIN __buckets ON {' AND '.join(join_conditions)}")
+        if end is not None:
+            # the series includes the end, which is excluded from the range
+            lines.append(f"WHERE __series.{TIMESTAMP_LABEL} < {end_sql}")
+        lines.append(f"ORDER BY __series.{TIMESTAMP_LABEL}")
+        return "\n".join(lines)
+
+
+def build_chart_query(
+    database: "DBS", query: ChartQuery
+) -> tuple[str, Optional[dict[str, Any]]]:
+    return ChartQueryBuilder(
+        database.db_engine_specific, database.get_sqla_engine().dialect
+    ).build_parameterized(query)
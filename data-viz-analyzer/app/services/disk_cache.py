@@ -0,0 +1,343 @@
+import base64
+import datetime
+import fcntl
+import json
+import mmap
+import os
+import struct
+import tempfile
+import time
+import zlib
+from contextlib import contextmanager
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Iterator, Optional
+from uuid import UUID
+
+import numpy as np
+
+from app.result_set import ColumnarResultSet, ResultColumn
+from app.utils.core import GenericDataType
+
+try:
+    import zstandard
+except ImportError:  # zlib keeps the tier usable without the extra wheel
+    zstandard = None
+
+MAGIC = b"DVRS\x00\x00\x00\x02"
+FILE_SUFFIX = ".dvrs"
+ALIGNMENT = 64
+# Share of max_bytes eviction frees the directory down to, so once full it
+# isn't scanned again on every write
+EVICTION_TARGET = 0.9
+_PREFIX = struct.Struct("<8sQ")
+
+
+def _align(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+# Values of object columns JSON can't hold, stored as ``{"$": tag, "v": ...}``
+# objects: the tag, the type (subclasses first), and how to encode and decode
+# the payload. Nothing read back from the directory is ever executed.
+_TAGGED_TYPES = (
+    ("datetime", datetime.datetime, datetime.datetime.isoformat, datetime.datetime.fromisoformat),
+    ("date", datetime.date, datetime.date.isoformat, datetime.date.fromisoformat),
+    ("time", datetime.time, datetime.time.isoformat, datetime.time.fromisoformat),
+    (
+        "timedelta",
+        datetime.timedelta,
+        lambda value: [value.days, value.seconds, value.microseconds],
+        lambda payload: datetime.timedelta(*payload),
+    ),
+    ("decimal", Decimal, str, Decimal),
+    ("uuid", UUID, str, UUID),
+    (
+        "bytes",
+        (bytes, bytearray, memoryview),
+        lambda value: base64.b64encode(value).decode(),
+        base64.b64decode,
+    ),
+)
+_DECODERS = {tag: decode for tag, _, _, decode in _TAGGED_TYPES}
+
+
+def _encode_value(value: Any) -> Any:
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [_encode_value(item) for item in value]
+    if isinstance(value, dict):
+        # JSON objects are reserved for tagged values, dicts are tagged too
+        return {
+            "$": "dict",
+            "v": [[_encode_value(key), _encode_value(item)] for key, item in value.items()],
+        }
+    if isinstance(value, np.generic):
+        return _encode_value(value.item())
+    for tag, types, encode, _ in _TAGGED_TYPES:
+        if isinstance(value, types):
+            return {"$": tag, "v": encode(value)}
+    raise TypeError(f"Can't store {type(value).__name__} values in the result cache")
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, list):
+        return [_decode_value(item) for item in value]
+    if isinstance(value, dict):
+        tag, payload = value["$"], value["v"]
+        if tag == "dict":
+            return {_decode_value(key): _decode_value(item) for key, item in payload}
+        return _DECODERS[tag](payload)
+    return value
+
+
+def _compress(data: bytes) -> tuple[str, bytes]:
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=3).compress(data)
+    return "zlib", zlib.compress(data, 6)
+
+
+def _decompress(codec: str, data: bytes) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+class DiskResultCache:
+    """
+    Result cache tier stored as one file per entry in a local directory, so it
+    survives restarts and is shared by every worker process on the host.
+
+    Fixed-width column buffers are written raw and 64-byte aligned: a hit maps
+    the file and wraps them with ``np.frombuffer`` without copying them into
+    the heap, which compressing them would give up. String dictionaries and
+    object columns are JSON, with tagged values for the types JSON lacks,
+    compressed with zstd (zlib when ``zstandard`` isn't installed). Files are
+    written to a temporary name and renamed in place.
+
+    The total size of the entries is kept in a file of the directory, updated
+    under an ``flock`` so concurrent workers don't step on each other, and the
+    directory is only scanned to evict files once it crosses ``max_bytes``,
+    down to ``EVICTION_TARGET`` of it.
+
+    The directory must belong to the user running the app and is restricted
+    to it, raises ``PermissionError`` otherwise.
+    """
+
+    def __init__(self, directory: str | Path, max_bytes: int) -> None:
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+        self._check_directory()
+        self._lock_path = self.directory / ".lock"
+        self._size_path = self.directory / ".size"
+
+    def _check_directory(self) -> None:
+        # e.g. created beforehand in /tmp by another local user
+        stat = self.directory.stat()
+        if stat.st_uid != os.getuid():
+            raise PermissionError(
+                f"Result cache directory {self.directory} isn't owned by the current user"
+            )
+        if stat.st_mode & 0o077:
+            self.directory.chmod(0o700)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}{FILE_SUFFIX}"
+
+    @staticmethod
+    def _encode_column(
+        column: ResultColumn, blocks: list[Any], offset: int
+    ) -> tuple[dict[str, Any], int]:
+        def add_block(payload: Any, codec: Optional[str] = None) -> list[Any]:
+            nonlocal offset
+            offset = _align(offset)
+            start = offset
+            blocks.append((start, payload))
+            offset += len(payload) if codec else payload.nbytes
+            return [start, offset - start, codec]
+
+        meta: dict[str, Any] = {
+            "name": column.name,
+            "generic_type": column.generic_type,
+            "tz_aware": column.tz_aware,
+        }
+        if column.values.dtype == np.dtype(object):
+            codec, payload = _compress(
+                json.dumps([_encode_value(item) for item in column.values]).encode()
+            )
+            meta["values"] = add_block(payload, codec)
+            meta["dtype"] = "object"
+        else:
+            values = np.ascontiguousarray(column.values)
+            meta["values"] = add_block(values.view(np.uint8))
+            meta["dtype"] = values.dtype.str
+        if column.nulls is not None:
+            meta["nulls"] = add_block(np.ascontiguousarray(column.nulls).view(np.uint8))
+        if column.dictionary is not None:
+            codec, payload = _compress(json.dumps(column.dictionary.tolist()).encode())
+            meta["dictionary"] = add_block(payload, codec)
+        return meta, offset
+
+    def set(self, key: str, value: Any, timeout: int) -> None:
+        if not isinstance(value, ColumnarResultSet) or timeout <= 0:
+            return
+
+        blocks: list[tuple[int, Any]] = []
+        columns = []
+        offset = 0
+        for column in value.columns:
+            meta, offset = self._encode_column(column, blocks, offset)
+            columns.append(meta)
+        if offset > self.max_bytes:
+            return
+
+        header = json.dumps(
+            {"expires_at": time.time() + timeout, "columns": columns}
+        ).encode()
+        data_start = _align(_PREFIX.size + len(header))
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(_PREFIX.pack(MAGIC, len(header)))
+                f.write(header)
+                for start, payload in blocks:
+                    f.seek(data_start + start)
+                    f.write(payload.data if isinstance(payload, np.ndarray) else payload)
+                f.truncate(data_start + offset)
+                f.flush()
+                os.fsync(f.fileno())
+            with self._locked():
+                path = self._path(key)
+                replaced = self._get_file_size(path)
+                os.replace(tmp_path, path)
+                total = self._add_size(data_start + offset - replaced)
+                if total is None or total > self.max_bytes:
+                    self._evict()
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+
+    def get(self, key: str) -> Optional[ColumnarResultSet]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):
+            return None
+
+        try:
+            magic, header_length = _PREFIX.unpack_from(mapped, 0)
+            if magic != MAGIC:
+                raise ValueError("Not a result cache file")
+            header = json.loads(mapped[_PREFIX.size:_PREFIX.size + header_length])
+        except (struct.error, ValueError):
+            self.delete(key)
+            return None
+        if header["expires_at"] <= time.time():
+            self.delete(key)
+            return None
+        # bump the mtime, eviction removes the least recently used files first
+        os.utime(path, None)
+
+        data_start = _align(_PREFIX.size + header_length)
+
+        def read_block(block: list[Any]) -> Any:
+            start, length, codec = block
+            start += data_start
+            if codec:
+                return _decompress(codec, mapped[start:start + length])
+            return np.frombuffer(mapped, dtype=np.uint8, count=length, offset=start)
+
+        columns = []
+        for meta in header["columns"]:
+            if meta["dtype"] == "object":
+                items = [_decode_value(item) for item in json.loads(read_block(meta["values"]))]
+                values = np.empty(len(items), dtype=object)
+                values[:] = items
+            else:
+                values = read_block(meta["values"]).view(np.dtype(meta["dtype"]))
+            dictionary = None
+            if "dictionary" in meta:
+                items = json.loads(read_block(meta["dictionary"]))
+                dictionary = np.empty(len(items), dtype=object)
+                dictionary[:] = items
+            generic_type = meta["generic_type"]
+            columns.append(
+                ResultColumn(
+                    name=meta["name"],
+                    column_spec=None,
+                    generic_type=(
+                        GenericDataType(generic_type) if generic_type is not None else None
+                    ),
+                    values=values,
+                    nulls=(
+                        read_block(meta["nulls"]).view(bool) if "nulls" in meta else None
+                    ),
+                    dictionary=dictionary,
+                    tz_aware=meta.get("tz_aware", False),
+                )
+            )
+        return ColumnarResultSet(columns)
+
+    def delete(self, key: str) -> None:
+        with self._locked():
+            path = self._path(key)
+            if size := self._get_file_size(path):
+                path.unlink(missing_ok=True)
+                self._add_size(-size)
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        with open(self._lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _get_file_size(path: Path) -> int:
+        try:
+            return path.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    def _add_size(self, delta: int) -> Optional[int]:
+        """
+        Add ``delta`` to the total size, called with the lock held. ``None``
+        when it isn't known yet, or was lost, until the next scan.
+        """
+        try:
+            total = int(self._size_path.read_text()) + delta
+        except (FileNotFoundError, ValueError):
+            return None
+        self._size_path.write_text(str(total))
+        return total
+
+    def evict(self) -> None:
+        with self._locked():
+            self._evict()
+
+    def _evict(self) -> None:
+        # called with the lock held, also recounts the total size from scratch
+        target = self.max_bytes * EVICTION_TARGET
+        entries = []
+        for path in self.directory.glob(f"*{FILE_SUFFIX}"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            target = total
+        for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+            if total <= target:
+                break
+            # readers holding a mapping keep their view of the data
+            path.unlink(missing_ok=True)
+            total -= size
+        self._size_path.write_text(str(total))
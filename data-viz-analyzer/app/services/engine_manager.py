@@ -0,0 +1,185 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, TYPE_CHECKING
+from uuid import UUID
+
+from sqlalchemy import create_engine, Engine
+
+from app.exceptions import ConnectionLimitExceededException
+from app.settings import ENGINE_MANAGER_MAX_CONNECTIONS, ENGINE_MANAGER_MAX_ENGINES
+from app.utils.metrics import CallbackGauge
+
+if TYPE_CHECKING:
+    from app.schemas.dbs import DBS
+
+# QueuePool defaults, used to budget engines not setting them explicitly
+DEFAULT_POOL_SIZE = 5
+DEFAULT_MAX_OVERFLOW = 10
+
+
+@dataclass
+class ManagedEngine:
+    engine: Engine
+    fingerprint: str
+    max_connections: int
+
+    @property
+    def checked_out(self) -> int:
+        checkedout = getattr(self.engine.pool, "checkedout", None)
+        return checkedout() if checkedout else 0
+
+
+class EngineManager:
+    """
+    Keeps one pooled SQLAlchemy engine per registered database, keyed by
+    ``DBS.uuid``. Engines are rebuilt when the URI, password or engine params
+    change, and idle engines are evicted in LRU order to stay within
+    ``max_engines`` and the ``max_connections`` budget shared by all pools.
+
+    The budget is a hard cap: new pools are shrunk to what's left of it and
+    ``ConnectionLimitExceededException`` is raised when nothing is, until
+    busy pools turn idle and can be evicted.
+    """
+
+    def __init__(
+        self,
+        max_engines: int = ENGINE_MANAGER_MAX_ENGINES,
+        max_connections: int = ENGINE_MANAGER_MAX_CONNECTIONS,
+    ) -> None:
+        self.max_engines = max_engines
+        self.max_connections = max_connections
+        self._engines: OrderedDict[UUID, ManagedEngine] = OrderedDict()
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def get_engine_params(database: "DBS") -> dict[str, Any]:
+        try:
+            extra = json.loads(database.extra or "{}")
+        except json.JSONDecodeError:
+            extra = {}
+        return dict(extra.get("engine_params") or {})
+
+    @classmethod
+    def get_fingerprint(cls, database: "DBS") -> str:
+        payload = json.dumps(
+            [
+                database.sqlalchemy_uri_decrypted,
+                database.server_cert,
+                cls.get_engine_params(database),
+            ],
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    @property
+    def total_connections(self) -> int:
+        return sum(managed.max_connections for managed in self._engines.values())
+
+    def get_engine(self, database: "DBS") -> Engine:
+        if database.uuid is None:
+            raise ValueError("Only registered databases have pooled engines")
+
+        fingerprint = self.get_fingerprint(database)
+        with self._lock:
+            managed = self._engines.get(database.uuid)
+            if managed is not None and managed.fingerprint == fingerprint:
+                self._engines.move_to_end(database.uuid)
+                return managed.engine
+            if managed is not None:
+                self.dispose(database.uuid)
+
+            managed = self._create_engine(database, fingerprint)
+            self._engines[database.uuid] = managed
+            return managed.engine
+
+    def connect_unpooled(self, database: "DBS") -> Any:
+        """
+        Open a DB-API connection to ``database`` outside of its pool, e.g. to
+        cancel a query while every pooled connection is busy. The caller
+        closes it.
+        """
+        engine = self.get_engine(database)
+        cargs, cparams = engine.dialect.create_connect_args(engine.url)
+        cparams.update(self.get_engine_params(database).get("connect_args") or {})
+        return engine.dialect.connect(*cargs, **cparams)
+
+    def _create_engine(self, database: "DBS", fingerprint: str) -> ManagedEngine:
+        params = self.get_engine_params(database)
+        params.setdefault("pool_pre_ping", True)
+        pool_size = int(params.get("pool_size", DEFAULT_POOL_SIZE))
+        max_overflow = int(params.get("max_overflow", DEFAULT_MAX_OVERFLOW))
+
+        self._evict(pool_size + max_overflow)
+        available = self.max_connections - self.total_connections
+        if available <= 0:
+            raise ConnectionLimitExceededException(self.max_connections)
+        if pool_size + max_overflow > available:
+            # every other pool is busy, shrink this one to what's left
+            pool_size = max(1, min(pool_size, available))
+            max_overflow = max(0, min(max_overflow, available - pool_size))
+        params["pool_size"] = pool_size
+        params["max_overflow"] = max_overflow
+
+        engine = create_engine(database.sqlalchemy_uri_decrypted, **params)
+        return ManagedEngine(
+            engine=engine,
+            fingerprint=fingerprint,
+            max_connections=pool_size + max_overflow,
+        )
+
+    def _evict(self, required_connections: int) -> None:
+        for database_uuid, managed in list(self._engines.items()):
+            if (
+                len(self._engines) < self.max_engines
+                and self.total_connections + required_connections
+                <= self.max_connections
+            ):
+                return
+            if managed.checked_out == 0:
+                self.dispose(database_uuid)
+
+    def dispose(self, database_uuid: UUID) -> None:
+        with self._lock:
+            if managed := self._engines.pop(database_uuid, None):
+                managed.engine.dispose()
+
+    def dispose_all(self) -> None:
+        with self._lock:
+            for database_uuid in list(self._engines):
+                self.dispose(database_uuid)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                str(database_uuid): {
+                    "checked_out": managed.checked_out,
+                    "max_connections": managed.max_connections,
+                }
+                for database_uuid, managed in self._engines.items()
+            }
+
+
+engine_manager = EngineManager()
+
+POOL_CHECKED_OUT = CallbackGauge(
+    "dataviz_pool_checked_out_connections",
+    "Connections of the pool of a target database currently in use.",
+    ("database",),
+    lambda: {
+        (database_uuid,): pool["checked_out"]
+        for database_uuid, pool in engine_manager.stats().items()
+    },
+)
+POOL_MAX_CONNECTIONS = CallbackGauge(
+    "dataviz_pool_max_connections",
+    "Connections the pool of a target database may open.",
+    ("database",),
+    lambda: {
+        (database_uuid,): pool["max_connections"]
+        for database_uuid, pool in engine_manager.stats().items()
+    },
+)
@@ -0,0 +1,220 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Optional, TYPE_CHECKING
+from uuid import UUID
+
+from app.exceptions import DataVizErrorException
+from app.result_set import ColumnarResultSet
+from app.services.query import QueryCanceller, execute_query
+from app.services.result_cache import get_result_cache_timeout, result_cache
+from app.settings import JOB_HISTORY_SIZE, JOB_WORKERS
+from app.utils.constants import QueryJobStatus
+
+if TYPE_CHECKING:
+    from app.schemas.dbs import DBS
+
+FINISHED_STATUSES = {
+    QueryJobStatus.SUCCESS,
+    QueryJobStatus.FAILED,
+    QueryJobStatus.CANCELLED,
+}
+
+
+@dataclass
+class QueryJob:
+    id: str
+    database_uuid: Optional[UUID]
+    sql: str
+    cache_key: str
+    limit: Optional[int] = None
+    status: QueryJobStatus = QueryJobStatus.PENDING
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    row_count: Optional[int] = None
+    # kept as long as the job is, the result cache may evict or skip it
+    result: Optional[ColumnarResultSet] = field(default=None, repr=False)
+    error: Optional[str] = None
+    error_type: Optional[str] = None
+    # seconds the query may run, the database default when None
+    timeout: Optional[float] = None
+    # cancels the query while it runs, set once it started
+    canceller: Optional[QueryCanceller] = field(default=None, repr=False)
+    cancel_requested: bool = False
+    database: Optional["DBS"] = field(default=None, repr=False)
+    future: Optional[Future] = field(default=None, repr=False)
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "database_uuid": str(self.database_uuid) if self.database_uuid else None,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "row_count": self.row_count,
+            "error": self.error,
+            "error_type": self.error_type,
+        }
+
+
+class JobManager:
+    """
+    Runs queries in the background on a bounded pool of workers, so long
+    queries don't hold a request open. Jobs are polled by id and keep their
+    result until they're forgotten, past ``history_size`` finished jobs. The
+    result is also handed to the result cache, which identical queries hit
+    afterwards. Running jobs are cancelled on the database through the engine.
+
+    Workers are threads rather than processes: drivers release the GIL while
+    waiting on the database, and a process would have to pickle every result
+    back to reach the job and the in-process result cache.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = JOB_WORKERS,
+        history_size: int = JOB_HISTORY_SIZE,
+    ) -> None:
+        self.history_size = history_size
+        self._jobs: OrderedDict[str, QueryJob] = OrderedDict()
+        self._lock = threading.RLock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="query-job"
+        )
+
+    def _add(self, job: QueryJob) -> None:
+        # called with the lock held, forgets the oldest finished jobs first
+        self._jobs[job.id] = job
+        finished = [key for key, other in self._jobs.items() if other.is_finished]
+        for key in finished[: max(len(self._jobs) - self.history_size, 0)]:
+            del self._jobs[key]
+
+    def submit(
+        self,
+        database: "DBS",
+        sql: str,
+        parameters: Optional[dict[str, Any]] = None,
+        limit: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> QueryJob:
+        key = result_cache.make_key(database.uuid, sql, parameters, limit)
+        job = QueryJob(
+            id=uuid.uuid4().hex,
+            database_uuid=database.uuid,
+            sql=sql,
+            cache_key=key,
+            limit=limit,
+            timeout=timeout,
+            database=database,
+        )
+        cached = result_cache.get(key)
+        with self._lock:
+            if cached is not None:
+                job.status = QueryJobStatus.SUCCESS
+                job.started_at = job.finished_at = time.time()
+                job.row_count = len(cached)
+                job.result = cached
+            else:
+                job.future = self._executor.submit(self._run, job, parameters)
+            self._add(job)
+        return job
+
+    def _set_canceller(self, job: QueryJob, canceller: QueryCanceller) -> None:
+        with self._lock:
+            job.canceller = canceller
+            cancel_requested = job.cancel_requested
+        if cancel_requested:
+            # cancelled in between being picked up and starting the query
+            raise RuntimeError(f"Query job {job.id} was cancelled")
+
+    def _run(self, job: QueryJob, parameters: Optional[dict[str, Any]]) -> None:
+        with self._lock:
+            if job.cancel_requested:
+                job.status = QueryJobStatus.CANCELLED
+                job.finished_at = time.time()
+                job.database = job.canceller = None
+                return
+            job.status = QueryJobStatus.RUNNING
+            job.started_at = time.time()
+        database = job.database
+        try:
+            result = execute_query(
+                database,
+                job.sql,
+                parameters,
+                job.limit,
+                on_canceller=lambda canceller: self._set_canceller(job, canceller),
+                timeout=job.timeout,
+            )
+        except Exception as ex:
+            with self._lock:
+                job.finished_at = time.time()
+                if job.cancel_requested:
+                    job.status = QueryJobStatus.CANCELLED
+                else:
+                    job.status = QueryJobStatus.FAILED
+                    job.error = str(ex)
+                    if isinstance(ex, DataVizErrorException):
+                        job.error_type = ex.error.error_type
+                job.database = job.canceller = None
+            return
+
+        result_cache.set(job.cache_key, result, get_result_cache_timeout(database))
+        with self._lock:
+            job.finished_at = time.time()
+            job.row_count = len(result)
+            # the query may have finished before the cancellation reached it
+            if job.cancel_requested:
+                job.status = QueryJobStatus.CANCELLED
+            else:
+                job.status = QueryJobStatus.SUCCESS
+                job.result = result
+            job.database = job.canceller = None
+
+    def _cancel_query(self, job: QueryJob) -> bool:
+        # a no-op once the query finished, its connection may be reused since
+        canceller = job.canceller
+        return canceller.cancel() if canceller is not None else False
+
+    def cancel(self, job_id: str) -> Optional[QueryJob]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.is_finished:
+                return job
+            job.cancel_requested = True
+            if job.future is not None and job.future.cancel():
+                job.status = QueryJobStatus.CANCELLED
+                job.finished_at = time.time()
+                job.database = job.canceller = None
+                return job
+        # running, the worker marks it cancelled once the query is interrupted
+        self._cancel_query(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[QueryJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def get_result(self, job: QueryJob) -> Optional[ColumnarResultSet]:
+        if job.status != QueryJobStatus.SUCCESS:
+            return None
+        return job.result
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            counts = {status.value: 0 for status in QueryJobStatus}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+            return counts
+
+
+job_manager = JobManager()
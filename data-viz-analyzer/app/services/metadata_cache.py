@@ -0,0 +1,309 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable, TYPE_CHECKING
+from uuid import UUID
+
+from sqlalchemy import inspect
+
+from app.services.engine_manager import EngineManager
+from app.settings import (
+    METADATA_CACHE_DEFAULT_TIMEOUT,
+    METADATA_CACHE_MAX_ENTRIES,
+    METADATA_CACHE_REFRESH_WORKERS,
+)
+
+if TYPE_CHECKING:
+    from app.schemas.dbs import DBS
+
+SCHEMA_LEVEL = "schema"
+TABLE_LEVEL = "table"
+COLUMN_LEVEL = "column"
+
+
+@dataclass
+class MetadataEntry:
+    value: Any
+    fingerprint: str
+    expires_at: float
+    # stale entries are still served, while refreshed, until then
+    stale_until: float
+
+
+def get_metadata_cache_timeout(database: "DBS", level: str) -> int:
+    """
+    Seconds the ``level`` metadata of ``database`` stays fresh, from the
+    ``<level>_cache_timeout`` key of ``metadata_cache_timeout`` in its extra,
+    0 disables caching.
+    """
+    try:
+        extra = json.loads(database.extra or "{}")
+    except json.JSONDecodeError:
+        extra = {}
+    timeouts = extra.get("metadata_cache_timeout") or {}
+    timeout = timeouts.get(f"{level}_cache_timeout")
+    return METADATA_CACHE_DEFAULT_TIMEOUT if timeout is None else int(timeout)
+
+
+class MetadataCache:
+    """
+    Caches the schemas, tables and columns of registered databases, each
+    level with its own TTL. Expired entries are served while a background
+    refresh runs (stale-while-revalidate) so only cold lookups wait on the
+    database, and concurrent lookups of a key share a single introspection.
+    Entries are dropped when the connection of their database changes.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = METADATA_CACHE_MAX_ENTRIES,
+        refresh_workers: int = METADATA_CACHE_REFRESH_WORKERS,
+    ) -> None:
+        self.max_entries = max_entries
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple[Hashable, ...], MetadataEntry] = OrderedDict()
+        self._in_flight: dict[tuple[Hashable, ...], Future] = {}
+        # bumped on invalidation, so introspections started before it are dropped
+        self._generations: dict[UUID, int] = {}
+        # databases being warmed, so repeated calls don't pile up threads
+        self._warming: set[UUID] = set()
+        self._lock = threading.RLock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=refresh_workers, thread_name_prefix="metadata-cache"
+        )
+
+    def _fetch(
+        self,
+        database: "DBS",
+        introspect: Callable[[Any, Any], Any],
+        key: tuple[Hashable, ...],
+        fingerprint: str,
+        timeout: int,
+        generation: int,
+        expand: Callable[[Any], dict[tuple[Hashable, ...], Any]] | None = None,
+    ) -> Any:
+        engine_specific = database.db_engine_specific
+        with database.get_sqla_engine().connect() as connection:
+            value = introspect(engine_specific, inspect(connection))
+        entries = {key: (value, timeout)}
+        for entry_key, entry_value in (expand(value) if expand else {}).items():
+            # each level keeps its own TTL, whichever lookup brought it in
+            entries[entry_key] = (
+                entry_value,
+                get_metadata_cache_timeout(database, entry_key[1]),
+            )
+        now = time.monotonic()
+        with self._lock:
+            if self._generations.get(key[0], 0) != generation:
+                return value
+            for entry_key, (entry_value, entry_timeout) in entries.items():
+                if entry_timeout <= 0:
+                    continue
+                self._entries[entry_key] = MetadataEntry(
+                    entry_value, fingerprint, now + entry_timeout, now + 2 * entry_timeout
+                )
+                self._entries.move_to_end(entry_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def _submit(
+        self,
+        database: "DBS",
+        introspect: Callable[[Any, Any], Any],
+        key: tuple[Hashable, ...],
+        fingerprint: str,
+        timeout: int,
+        expand: Callable[[Any], dict[tuple[Hashable, ...], Any]] | None = None,
+    ) -> Future:
+        # called with the lock held
+        if future := self._in_flight.get(key):
+            return future
+        future = self._executor.submit(
+            self._fetch,
+            database,
+            introspect,
+            key,
+            fingerprint,
+            timeout,
+            self._generations.get(key[0], 0),
+            expand,
+        )
+        self._in_flight[key] = future
+
+        def done(_: Future) -> None:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+        future.add_done_callback(done)
+        return future
+
+    def _get(
+        self,
+        database: "DBS",
+        level: str,
+        introspect: Callable[[Any, Any], Any],
+        *args: Hashable,
+        force: bool = False,
+        expand: Callable[[Any], dict[tuple[Hashable, ...], Any]] | None = None,
+    ) -> Any:
+        if database.uuid is None:
+            raise ValueError("Only registered databases have cached metadata")
+
+        key = (database.uuid, level, *args)
+        fingerprint = EngineManager.get_fingerprint(database)
+        timeout = get_metadata_cache_timeout(database, level)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.fingerprint != fingerprint:
+                # the connection was edited, nothing cached for it can be trusted
+                self._remove_database(database.uuid)
+                entry = None
+            if entry is not None and not force and now < entry.stale_until:
+                self._entries.move_to_end(key)
+                if now < entry.expires_at:
+                    self.hits += 1
+                else:
+                    self.stale_hits += 1
+                    self._submit(database, introspect, key, fingerprint, timeout, expand)
+                return entry.value
+            self.misses += 1
+            future = self._submit(database, introspect, key, fingerprint, timeout, expand)
+        return future.result()
+
+    def _remove_database(self, database_uuid: UUID) -> None:
+        self._generations[database_uuid] = self._generations.get(database_uuid, 0) + 1
+        for key in [key for key in self._entries if key[0] == database_uuid]:
+            del self._entries[key]
+
+    def get_schema_names(self, database: "DBS", force: bool = False) -> list[str]:
+        return self._get(
+            database,
+            SCHEMA_LEVEL,
+            lambda engine_specific, inspector: engine_specific.get_schema_names(
+                inspector
+            ),
+            force=force,
+        )
+
+    def get_table_names(
+        self, database: "DBS", schema: str | None, force: bool = False
+    ) -> list[str]:
+        return self._get(
+            database,
+            TABLE_LEVEL,
+            lambda engine_specific, inspector: engine_specific.get_table_names(
+                inspector, schema
+            ),
+            schema,
+            force=force,
+        )
+
+    def get_columns(
+        self,
+        database: "DBS",
+        table_name: str,
+        schema: str | None,
+        force: bool = False,
+    ) -> list[dict[str, Any]]:
+        return self._get(
+            database,
+            COLUMN_LEVEL,
+            lambda engine_specific, inspector: engine_specific.get_columns(
+                inspector, table_name, schema
+            ),
+            schema,
+            table_name,
+            force=force,
+        )
+
+    def get_schema_columns(
+        self,
+        database: "DBS",
+        schema: str | None,
+        force: bool = False,
+    ) -> dict[str, list[dict[str, Any]]]:
+        """
+        Columns of every table, view and the like of ``schema`` by name,
+        introspected in bulk. The columns of each are cached along, and so
+        are the table names, so later ``get_table_names`` and ``get_columns``
+        calls are hits.
+        """
+
+        def introspect(
+            engine_specific, inspector
+        ) -> tuple[dict[str, list[dict[str, Any]]], list[str]]:
+            # every schema when None for some engines, stick to the default one
+            tables, table_keys = engine_specific.get_bulk_tables(
+                inspector, schema or inspector.default_schema_name
+            )
+            return (
+                {table_name: columns for (_, table_name), columns in tables.items()},
+                sorted(table_name for _, table_name in table_keys),
+            )
+
+        def expand(
+            value: tuple[dict[str, list[dict[str, Any]]], list[str]]
+        ) -> dict[tuple[Hashable, ...], Any]:
+            tables, table_names = value
+            entries: dict[tuple[Hashable, ...], Any] = {
+                (database.uuid, TABLE_LEVEL, schema): table_names
+            }
+            for table_name, columns in tables.items():
+                entries[(database.uuid, COLUMN_LEVEL, schema, table_name)] = columns
+            return entries
+
+        return self._get(
+            database,
+            COLUMN_LEVEL,
+            introspect,
+            schema,
+            force=force,
+            expand=expand,
+        )[0]
+
+    def warm(self, database: "DBS") -> None:
+        """
+        Load the schemas and tables of ``database`` in the background, so the
+        first schema browser doesn't wait on the scan. A no-op while a warm of
+        the database is running.
+        """
+
+        with self._lock:
+            if database.uuid in self._warming:
+                return
+            self._warming.add(database.uuid)
+
+        def load() -> None:
+            try:
+                for schema in self.get_schema_names(database):
+                    self.get_table_names(database, schema)
+            finally:
+                with self._lock:
+                    self._warming.discard(database.uuid)
+
+        # not on the executor, waiting there on its own tasks could deadlock it
+        threading.Thread(target=load, name="metadata-cache-warm", daemon=True).start()
+
+    def invalidate(self, database_uuid: UUID) -> None:
+        with self._lock:
+            self._remove_database(database_uuid)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "in_flight": len(self._in_flight),
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+            }
+
+
+metadata_cache = MetadataCache()
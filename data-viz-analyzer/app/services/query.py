@@ -0,0 +1,383 @@
+import heapq
+import itertools
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing, nullcontext
+from dataclasses import replace
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Optional, TYPE_CHECKING
+
+import numpy as np
+
+from app.exceptions import QueryTimeoutException
+from app.result_set import ColumnarResultSet, DATETIME_DTYPE
+from app.services.chart_query import ChartQuery, TIMESTAMP_LABEL, build_chart_query
+from app.services.engine_manager import engine_manager
+from app.services.result_cache import get_result_cache_timeout, result_cache
+from app.services.rollups import rollup_manager
+from app.settings import (
+    INCREMENTAL_REFRESH_LATE_ARRIVAL,
+    QUERY_CANCEL_WORKERS,
+    QUERY_TIMEOUT,
+    QUERY_TIMEOUT_GRACE,
+)
+from app.utils.downsampling import downsample
+from app.utils.metrics import POOL_CHECKOUT_WAIT
+from app.utils.sql_parse import ParsedQuery
+
+if TYPE_CHECKING:
+    from app.schemas.dbs import DBS
+
+logger = logging.getLogger(__name__)
+
+
+def get_query_timeout(database: "DBS") -> float:
+    """
+    Seconds queries of ``database`` may run, from the ``query_timeout`` key
+    of its extra, 0 disables the deadline.
+    """
+    try:
+        extra = json.loads(database.extra or "{}")
+    except json.JSONDecodeError:
+        extra = {}
+    timeout = extra.get("query_timeout")
+    return QUERY_TIMEOUT if timeout is None else float(timeout)
+
+
+class QueryCanceller:
+    """
+    Cancels the query running on a pooled connection until ``finish`` is
+    called, before the connection goes back to the pool: past that point the
+    same backend may run the query of another request, so cancelling is a
+    no-op. The cancel is sent on a connection of its own, outside of the
+    pool, which may be exhausted, under a lock ``finish`` waits for once that
+    connection is open.
+    """
+
+    def __init__(self, database: "DBS", cancel_query_id: Optional[str]) -> None:
+        self.database = database
+        self.cancel_query_id = cancel_query_id
+        self._finished = False
+        self._lock = threading.Lock()
+
+    def cancel(self) -> bool:
+        if self._finished or self.cancel_query_id is None:
+            return False
+        engine_specific = self.database.db_engine_specific
+        try:
+            with closing(engine_manager.connect_unpooled(self.database)) as connection:
+                with closing(connection.cursor()) as cursor:
+                    with self._lock:
+                        if self._finished:
+                            return False
+                        return engine_specific.cancel_query(cursor, self.cancel_query_id)
+        except Exception:
+            logger.exception("Could not cancel query %s", self.cancel_query_id)
+            return False
+
+    def finish(self) -> None:
+        with self._lock:
+            self._finished = True
+
+
+class QueryWatchdog:
+    """
+    Cancels a query still running ``QUERY_TIMEOUT_GRACE`` seconds past its
+    timeout, for engines without a statement timeout or drivers stuck past
+    it. ``fired`` tells whether it had to.
+    """
+
+    def __init__(
+        self,
+        canceller: QueryCanceller,
+        timeout: float,
+        scheduler: Optional["QueryWatchdogScheduler"] = None,
+    ) -> None:
+        self.canceller = canceller
+        self.timeout = timeout
+        self.scheduler = scheduler or watchdog_scheduler
+        self.fired = False
+        # set and cleared by the scheduler, under its lock
+        self.scheduled = False
+
+    def __enter__(self) -> "QueryWatchdog":
+        self.scheduler.schedule(self, self.timeout + QUERY_TIMEOUT_GRACE)
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        # a cancel already sent isn't stopped by ``unschedule``, the canceller is
+        self.scheduler.unschedule(self)
+        self.canceller.finish()
+
+
+class QueryWatchdogScheduler:
+    """
+    Fires the watchdogs of running queries from a single thread, waiting on a
+    heap of their deadlines, rather than a timer thread per query. The
+    cancels are sent from ``cancel_workers`` threads, so a slow one doesn't
+    hold the deadlines after it back. Unscheduled watchdogs are left in the
+    heap until they come up, or until they make up most of it.
+    """
+
+    def __init__(self, cancel_workers: int = QUERY_CANCEL_WORKERS) -> None:
+        self._heap: list[tuple[float, int, QueryWatchdog]] = []
+        # ties on the deadline, watchdogs themselves aren't comparable
+        self._counter = itertools.count()
+        self._unscheduled = 0
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._executor = ThreadPoolExecutor(
+            max_workers=cancel_workers, thread_name_prefix="query-cancel"
+        )
+
+    def schedule(self, watchdog: QueryWatchdog, delay: float) -> None:
+        with self._condition:
+            watchdog.scheduled = True
+            entry = (time.monotonic() + delay, next(self._counter), watchdog)
+            heapq.heappush(self._heap, entry)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="query-watchdog", daemon=True
+                )
+                self._thread.start()
+            elif self._heap[0] is entry:
+                # sooner than what the thread waits for
+                self._condition.notify()
+
+    def unschedule(self, watchdog: QueryWatchdog) -> None:
+        with self._condition:
+            if not watchdog.scheduled:
+                return
+            watchdog.scheduled = False
+            self._unscheduled += 1
+            if self._unscheduled > len(self._heap) // 2:
+                self._heap = [entry for entry in self._heap if entry[2].scheduled]
+                heapq.heapify(self._heap)
+                self._unscheduled = 0
+
+    def _run(self) -> None:
+        with self._condition:
+            while True:
+                while self._heap and not self._heap[0][2].scheduled:
+                    heapq.heappop(self._heap)
+                    self._unscheduled -= 1
+                if not self._heap:
+                    self._condition.wait()
+                    continue
+                deadline, _, watchdog = self._heap[0]
+                if (delay := deadline - time.monotonic()) > 0:
+                    self._condition.wait(delay)
+                    continue
+                heapq.heappop(self._heap)
+                watchdog.scheduled = False
+                watchdog.fired = True
+                self._executor.submit(watchdog.canceller.cancel)
+
+
+watchdog_scheduler = QueryWatchdogScheduler()
+
+
+def execute_query(
+    database: "DBS",
+    sql: str,
+    parameters: Optional[dict[str, Any]] = None,
+    limit: Optional[int] = None,
+    on_canceller: Optional[Callable[["QueryCanceller"], None]] = None,
+    timeout: Optional[float] = None,
+    prepare: bool = False,
+) -> ColumnarResultSet:
+    """
+    Run ``sql`` on a pooled connection of ``database``. ``on_canceller``
+    receives the ``QueryCanceller`` of the query before it starts.
+    ``prepare`` runs selects through a statement prepared on the connection
+    when the engine supports it, for queries repeated with other parameters.
+
+    The query and the fetch of its rows are bounded by ``timeout`` seconds,
+    ``get_query_timeout`` by default: through the statement timeout of the
+    engine when it has one, a watchdog cancelling the query otherwise and a
+    deadline checked in between fetched batches. ``QueryTimeoutException``
+    is raised past it and the connection goes back to the pool.
+    """
+    engine_specific = database.db_engine_specific
+    if limit:
+        sql = engine_specific.apply_limit_to_sql(sql, limit)
+    if timeout is None:
+        timeout = get_query_timeout(database)
+
+    engine = database.get_sqla_engine()
+    started = time.perf_counter()
+    with engine.connect() as connection:
+        POOL_CHECKOUT_WAIT.observe(time.perf_counter() - started, engine_specific.engine)
+        dbapi_connection = connection.connection
+        canceller = None
+        deadline = None
+        if timeout > 0 or on_canceller is not None:
+            with closing(dbapi_connection.cursor()) as cursor:
+                cancel_query_id = engine_specific.get_cancel_query_id(
+                    cursor, dbapi_connection.info
+                )
+                if timeout > 0:
+                    engine_specific.set_statement_timeout(cursor, timeout)
+                    deadline = time.monotonic() + timeout
+            canceller = QueryCanceller(database, cancel_query_id)
+            if on_canceller is not None:
+                on_canceller(canceller)
+        is_select = ParsedQuery(sql).is_select()
+        prepared = prepare and is_select and engine_specific.supports_prepared_statements
+        cursor = (
+            # prepared statements can't be run by server-side cursors
+            engine_specific.create_stream_cursor(dbapi_connection)
+            if is_select and not prepared
+            else dbapi_connection.cursor()
+        )
+        watchdog = (
+            QueryWatchdog(canceller, timeout)
+            if timeout > 0
+            else None
+        )
+        try:
+            with watchdog or nullcontext():
+                if prepared:
+                    engine_specific.execute_prepared(
+                        dbapi_connection.info, cursor, sql, parameters
+                    )
+                elif parameters:
+                    cursor.execute(sql, parameters)
+                else:
+                    cursor.execute(sql)
+                result = engine_specific.fetch_result_set(cursor, limit, deadline)
+        except Exception as ex:
+            if deadline is not None and (
+                isinstance(ex, TimeoutError)
+                or engine_specific.is_timeout_exception(ex)
+                or engine_specific.is_timeout_exception(ex.__cause__)
+                or watchdog.fired
+            ):
+                raise QueryTimeoutException(timeout) from ex
+            raise engine_specific.get_dbapi_mapped_exception(ex) from ex
+        finally:
+            if canceller is not None:
+                canceller.finish()
+            cursor.close()
+        dbapi_connection.commit()
+    return result
+
+
+def execute_cached_query(
+    database: "DBS",
+    sql: str,
+    parameters: Optional[dict[str, Any]] = None,
+    limit: Optional[int] = None,
+    force: bool = False,
+    prepare: bool = False,
+) -> ColumnarResultSet:
+    """
+    ``execute_query`` through the result cache, identical concurrent requests
+    share a single execution. ``force`` refreshes the cached result.
+    """
+    key = result_cache.make_key(database.uuid, sql, parameters, limit)
+    if force:
+        result_cache.delete(key)
+    return result_cache.get_or_execute(
+        key,
+        lambda: execute_query(database, sql, parameters, limit, prepare=prepare),
+        get_result_cache_timeout(database),
+    )
+
+
+def refresh_chart_query_incrementally(
+    database: "DBS",
+    query: ChartQuery,
+    key: str,
+) -> Optional[ColumnarResultSet]:
+    """
+    Refresh the cached result of ``query`` by only querying the buckets from
+    its watermark, the latest timestamp cached, minus the late arrival window
+    and merging them into it. ``None`` when there's no cached result to
+    refresh. Concurrent refreshes of ``key`` share a single delta query.
+    """
+    # single-flight only, nothing is cached under the refresh key itself
+    return result_cache.get_or_execute(
+        f"{key}:incremental",
+        lambda: _refresh_chart_query_incrementally(database, query, key),
+        0,
+    )
+
+
+def _refresh_chart_query_incrementally(
+    database: "DBS",
+    query: ChartQuery,
+    key: str,
+) -> Optional[ColumnarResultSet]:
+    cached = result_cache.get(key)
+    if cached is None or TIMESTAMP_LABEL not in cached.column_names:
+        return None
+    timestamps = cached.column(TIMESTAMP_LABEL)
+    if timestamps.values.dtype != DATETIME_DTYPE:
+        return None
+    valid = ~timestamps.nulls if timestamps.nulls is not None else None
+    values = timestamps.values if valid is None else timestamps.values[valid]
+    if not len(values):
+        return None
+
+    late_arrival = query.late_arrival or timedelta(seconds=INCREMENTAL_REFRESH_LATE_ARRIVAL)
+    watermark = values.max() - np.timedelta64(late_arrival, "us")
+    # restart from the start of a cached bucket, a partial one can't be merged
+    earlier = values[values <= watermark]
+    if not len(earlier):
+        return None
+    cutoff = earlier.max()
+
+    start = cutoff.astype(datetime)
+    if timestamps.tz_aware:
+        # cached timestamps of time zone aware columns are naive UTC, bind the
+        # instant rather than a wall time read in the TimeZone of the session
+        start = start.replace(tzinfo=timezone.utc)
+    delta_query = replace(query, time_range=(start, query.time_range[1]))
+    delta_sql, delta_parameters = build_chart_query(database, delta_query)
+    delta = execute_query(database, delta_sql, delta_parameters, prepare=True)
+    if delta.column_names != cached.column_names:
+        return None
+
+    before_cutoff = timestamps.values < cutoff
+    if valid is not None:
+        before_cutoff &= valid
+    # rows without a timestamp can't be refreshed incrementally, keep them last
+    parts = [cached.take(np.flatnonzero(before_cutoff)), delta]
+    if valid is not None:
+        parts.append(cached.take(np.flatnonzero(~valid)))
+    merged = ColumnarResultSet.concat(parts)
+    result_cache.set(key, merged, get_result_cache_timeout(database))
+    return merged
+
+
+def execute_chart_query(
+    database: "DBS",
+    query: ChartQuery,
+    force: bool = False,
+) -> ColumnarResultSet:
+    query = rollup_manager.route(database, query)
+    sql, parameters = build_chart_query(database, query)
+    result = None
+    if force and query.incremental and not query.row_limit:
+        result = refresh_chart_query_incrementally(
+            database,
+            query,
+            result_cache.make_key(database.uuid, sql, parameters, query.row_limit),
+        )
+    if result is None:
+        result = execute_cached_query(
+            database, sql, parameters, query.row_limit, force=force, prepare=True
+        )
+    # after the cache, so charts of any width share the full result
+    if query.max_points:
+        result = downsample(
+            result,
+            query.max_points,
+            [metric.get_label() for metric in query.metrics],
+            query.downsampling,
+        )
+    return result
@@ -0,0 +1,292 @@
+import hashlib
+import json
+import logging
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Callable, Optional, TYPE_CHECKING
+
+from app.services.disk_cache import DiskResultCache
+from app.settings import (
+    RESULT_CACHE_DEFAULT_TIMEOUT,
+    RESULT_CACHE_DIR,
+    RESULT_CACHE_DIR_MAX_BYTES,
+    RESULT_CACHE_MAX_BYTES,
+)
+from app.utils.metrics import CallbackCounter, CallbackGauge
+from app.utils.sql_parse import ParsedQuery
+
+if TYPE_CHECKING:
+    from app.schemas.dbs import DBS
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CacheEntry:
+    value: Any
+    nbytes: int
+    expires_at: float
+
+
+def get_result_cache_timeout(database: "DBS") -> int:
+    """
+    Seconds results of ``database`` stay cached, from the
+    ``result_cache_timeout`` key of its extra, 0 disables caching.
+    """
+    try:
+        extra = json.loads(database.extra or "{}")
+    except json.JSONDecodeError:
+        extra = {}
+    timeout = extra.get("result_cache_timeout")
+    return RESULT_CACHE_DEFAULT_TIMEOUT if timeout is None else int(timeout)
+
+
+class QueryResultCache:
+    """
+    Byte-bounded LRU cache of query results. Concurrent requests for a key
+    being computed wait for that single execution (single-flight) instead of
+    running the query again. Misses fall through to ``second_tier`` when set,
+    whose failures are logged and never fail the caller.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = RESULT_CACHE_MAX_BYTES,
+        second_tier: Optional[DiskResultCache] = None,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.second_tier = second_tier
+        self.second_tier_hits = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self._bytes = 0
+        self._entries: OrderedDict[str, CacheEntry] = OrderedDict()
+        self._in_flight: dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(
+        database_uuid: Any,
+        sql: str,
+        parameters: Optional[dict[str, Any]] = None,
+        limit: Optional[int] = None,
+    ) -> str:
+        payload = json.dumps(
+            [str(database_uuid), ParsedQuery(sql).normalized, parameters, limit],
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    @staticmethod
+    def get_size(value: Any) -> int:
+        if (nbytes := getattr(value, "nbytes", None)) is not None:
+            return nbytes
+        return sys.getsizeof(value)
+
+    def _get(self, key: str) -> CacheEntry | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _remove(self, key: str) -> None:
+        if entry := self._entries.pop(key, None):
+            self._bytes -= entry.nbytes
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            if entry := self._get(key):
+                self.hits += 1
+                return entry.value
+            self.misses += 1
+        value = self._get_from_second_tier(key)
+        if value is not None:
+            self.set(key, value, RESULT_CACHE_DEFAULT_TIMEOUT, persist=False)
+        return value
+
+    def _get_from_second_tier(self, key: str) -> Any:
+        if self.second_tier is None:
+            return None
+        try:
+            value = self.second_tier.get(key)
+        except Exception:
+            logger.exception("Failed to read result %s from the second tier", key)
+            return None
+        if value is not None:
+            with self._lock:
+                self.second_tier_hits += 1
+        return value
+
+    def _load(self, key: str, execute: Callable[[], Any]) -> tuple[Any, bool]:
+        """
+        Return the value from the second tier, or execute it, along with
+        whether it still has to be persisted there.
+        """
+        value = self._get_from_second_tier(key)
+        if value is not None:
+            return value, False
+        return execute(), True
+
+    def set(self, key: str, value: Any, timeout: int, persist: bool = True) -> None:
+        nbytes = self.get_size(value)
+        if persist and self.second_tier is not None:
+            try:
+                self.second_tier.set(key, value, timeout)
+            except Exception:
+                # e.g. values it can't store, the in-memory copy is kept
+                logger.exception("Failed to write result %s to the second tier", key)
+        if timeout <= 0 or nbytes > self.max_bytes:
+            return
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = CacheEntry(value, nbytes, time.monotonic() + timeout)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._remove(key)
+        if self.second_tier is not None:
+            try:
+                self.second_tier.delete(key)
+            except Exception:
+                logger.exception("Failed to delete result %s from the second tier", key)
+
+    def _claim(self, key: str) -> tuple[Any, Future | None, bool]:
+        """
+        Return ``(value, None, False)`` on a hit, otherwise the future of the
+        execution to wait for and whether the caller has to run it.
+        """
+        with self._lock:
+            if entry := self._get(key):
+                self.hits += 1
+                return entry.value, None, False
+            if future := self._in_flight.get(key):
+                self.coalesced += 1
+                return None, future, False
+            self.misses += 1
+            future = Future()
+            self._in_flight[key] = future
+            return None, future, True
+
+    def _complete(
+        self,
+        key: str,
+        future: Future,
+        timeout: int,
+        value: Any = None,
+        exception: BaseException | None = None,
+        persist: bool = True,
+    ) -> None:
+        try:
+            if exception is None:
+                # the remaining TTL of second tier hits isn't known, keep them briefly
+                if not persist:
+                    timeout = min(timeout, RESULT_CACHE_DEFAULT_TIMEOUT)
+                self.set(key, value, timeout, persist=persist)
+        finally:
+            # waiters must never be left hanging on the key
+            with self._lock:
+                self._in_flight.pop(key, None)
+            if exception is None:
+                future.set_result(value)
+            else:
+                future.set_exception(exception)
+
+    def get_or_execute(
+        self, key: str, execute: Callable[[], Any], timeout: int
+    ) -> Any:
+        value, future, is_leader = self._claim(key)
+        if future is None:
+            return value
+        if not is_leader:
+            return future.result()
+
+        try:
+            value, persist = self._load(key, execute)
+        except BaseException as ex:
+            self._complete(key, future, timeout, exception=ex)
+            raise
+        self._complete(key, future, timeout, value=value, persist=persist)
+        return value
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "in_flight": len(self._in_flight),
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "second_tier_hits": self.second_tier_hits,
+                "evictions": self.evictions,
+            }
+
+
+def _create_second_tier() -> Optional[DiskResultCache]:
+    if not RESULT_CACHE_DIR:
+        return None
+    try:
+        return DiskResultCache(RESULT_CACHE_DIR, RESULT_CACHE_DIR_MAX_BYTES)
+    except OSError:
+        logger.exception(
+            "Result cache directory %s is unusable, caching in memory only", RESULT_CACHE_DIR
+        )
+        return None
+
+
+result_cache = QueryResultCache(second_tier=_create_second_tier())
+
+RESULT_CACHE_ENTRIES = CallbackGauge(
+    "dataviz_result_cache_entries",
+    "Results held in the in-memory result cache.",
+    (),
+    lambda: {(): result_cache.stats()["entries"]},
+)
+RESULT_CACHE_BYTES = CallbackGauge(
+    "dataviz_result_cache_bytes",
+    "Estimated bytes of the results held in the in-memory result cache.",
+    (),
+    lambda: {(): result_cache.stats()["bytes"]},
+)
+RESULT_CACHE_IN_FLIGHT = CallbackGauge(
+    "dataviz_result_cache_in_flight",
+    "Queries being executed for the result cache, other requests wait on them.",
+    (),
+    lambda: {(): result_cache.stats()["in_flight"]},
+)
+RESULT_CACHE_LOOKUPS = CallbackCounter(
+    "dataviz_result_cache_lookups_total",
+    "Result cache lookups by outcome, coalesced ones waited on a running query.",
+    ("result",),
+    lambda: {
+        (result,): result_cache.stats()[key]
+        for result, key in (
+            ("hit", "hits"),
+            ("miss", "misses"),
+            ("coalesced", "coalesced"),
+            ("second_tier_hit", "second_tier_hits"),
+        )
+    },
+)
+RESULT_CACHE_EVICTIONS = CallbackCounter(
+    "dataviz_result_cache_evictions_total",
+    "Results evicted from the in-memory result cache to stay under its size.",
+    (),
+    lambda: {(): result_cache.stats()["evictions"]},
+)
@@ -0,0 +1,532 @@
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional, TYPE_CHECKING
+from uuid import UUID
+
+from sqlalchemy import Column, Float, MetaData, String, Table, delete, inspect, insert, select
+
+from app.daos.dbs import DbsDAO
+from app.database import AsyncSessionLocal
+from app.services.chart_query import (
+    ChartQuery,
+    ChartQueryBuilder,
+    Metric,
+    TIMESTAMP_LABEL,
+)
+from app.settings import (
+    ROLLUP_DEFAULT_LATE_ARRIVAL,
+    ROLLUP_DEFAULT_REFRESH_INTERVAL,
+    ROLLUP_REFRESH_ENABLED,
+    ROLLUP_SCHEDULER_INTERVAL,
+)
+from app.utils.constants import TimeGrain
+
+if TYPE_CHECKING:
+    from app.schemas.dbs import DBS
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_TABLE_PREFIX = "dataviz_rollup"
+ROLLUP_STATE_TABLE = f"{ROLLUP_TABLE_PREFIX}_state"
+
+# Grains of a whole number of seconds, their buckets are aligned within a day
+_FIXED_GRAIN_SECONDS = {
+    TimeGrain.SECOND: 1,
+    TimeGrain.FIVE_SECONDS: 5,
+    TimeGrain.THIRTY_SECONDS: 30,
+    TimeGrain.MINUTE: 60,
+    TimeGrain.FIVE_MINUTES: 300,
+    TimeGrain.TEN_MINUTES: 600,
+    TimeGrain.FIFTEEN_MINUTES: 900,
+    TimeGrain.THIRTY_MINUTES: 1800,
+    TimeGrain.HALF_HOUR: 1800,
+    TimeGrain.HOUR: 3600,
+    TimeGrain.SIX_HOURS: 21600,
+    TimeGrain.DAY: 86400,
+}
+# Calendar grains and the coarser calendar grains made of whole buckets of them
+_CALENDAR_GRAIN_PARENTS = {
+    TimeGrain.WEEK: set(),
+    TimeGrain.WEEK_STARTING_SUNDAY: set(),
+    TimeGrain.WEEK_STARTING_MONDAY: set(),
+    TimeGrain.WEEK_ENDING_SATURDAY: set(),
+    TimeGrain.WEEK_ENDING_SUNDAY: set(),
+    TimeGrain.MONTH: {TimeGrain.QUARTER, TimeGrain.QUARTER_YEAR, TimeGrain.YEAR},
+    TimeGrain.QUARTER: {TimeGrain.QUARTER_YEAR, TimeGrain.YEAR},
+    TimeGrain.QUARTER_YEAR: {TimeGrain.QUARTER, TimeGrain.YEAR},
+    TimeGrain.YEAR: set(),
+}
+# How each aggregate is re-aggregated from the rollup, AVG is derived from the
+# SUM and COUNT of its column
+_REAGGREGATES = {"COUNT": "SUM", "SUM": "SUM", "MIN": "MIN", "MAX": "MAX"}
+
+
+def can_roll_up(rollup_grain: str, query_grain: Optional[str]) -> bool:
+    """
+    Whether every bucket of ``query_grain`` is made of whole buckets of
+    ``rollup_grain``.
+    """
+    if query_grain is None:
+        return False
+    if rollup_grain == query_grain:
+        return True
+    if rollup_seconds := _FIXED_GRAIN_SECONDS.get(rollup_grain):
+        if query_seconds := _FIXED_GRAIN_SECONDS.get(query_grain):
+            return query_seconds % rollup_seconds == 0
+        return query_grain in _CALENDAR_GRAIN_PARENTS
+    return query_grain in _CALENDAR_GRAIN_PARENTS.get(rollup_grain, ())
+
+
+def is_aligned(dttm: datetime, grain: str) -> bool:
+    """
+    Whether ``dttm`` is the start of a bucket of ``grain``, so a time range
+    starting or ending there doesn't cut rolled up buckets.
+    """
+    since_midnight = dttm - dttm.replace(hour=0, minute=0, second=0, microsecond=0)
+    if seconds := _FIXED_GRAIN_SECONDS.get(grain):
+        return since_midnight % timedelta(seconds=seconds) == timedelta(0)
+    if since_midnight:
+        return False
+    if grain in {TimeGrain.WEEK, TimeGrain.WEEK_STARTING_MONDAY}:
+        return dttm.weekday() == 0
+    if grain == TimeGrain.MONTH:
+        return dttm.day == 1
+    if grain in {TimeGrain.QUARTER, TimeGrain.QUARTER_YEAR}:
+        return dttm.day == 1 and dttm.month % 3 == 1
+    if grain == TimeGrain.YEAR:
+        return dttm.day == 1 and dttm.month == 1
+    return False
+
+
+def _to_naive_utc(dttm: datetime) -> datetime:
+    if dttm.tzinfo is None:
+        return dttm
+    return dttm.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _to_datetime(value: Any) -> Optional[datetime]:
+    # some drivers return timestamps computed by expressions as text
+    if isinstance(value, str):
+        return datetime.fromisoformat(value)
+    return value
+
+
+def get_state_table(schema: Optional[str]) -> Table:
+    """
+    Table next to the rollups recording their refreshes, so every process
+    routes to them and not only the one refreshing them. Watermarks are ISO
+    strings, which keep the time zone of aware ones.
+    """
+    return Table(
+        ROLLUP_STATE_TABLE,
+        MetaData(),
+        Column("rollup_table", String(64), primary_key=True),
+        Column("watermark", String(64)),
+        Column("refreshed_at", Float),
+        schema=schema,
+    )
+
+
+def _storage_name(aggregate: str, column: Optional[str]) -> str:
+    return f"{aggregate.lower()}__{re.sub(r'[^0-9a-z_]', '_', (column or 'all').lower())}"
+
+
+@dataclass
+class Rollup:
+    """
+    Pre-aggregated ``metrics`` of ``table_name`` by ``time_grain`` buckets
+    and ``dimensions``, declared in the ``rollups`` list of ``DBS.extra``.
+    """
+
+    database_uuid: UUID
+    table_name: str
+    temporal_column: str
+    time_grain: str
+    metrics: list[Metric]
+    schema: Optional[str] = None
+    dimensions: list[str] = field(default_factory=list)
+    temporal_column_type: str = "TIMESTAMP"
+    rollup_schema: Optional[str] = None
+    refresh_interval: int = ROLLUP_DEFAULT_REFRESH_INTERVAL
+    late_arrival: int = ROLLUP_DEFAULT_LATE_ARRIVAL
+
+    @classmethod
+    def from_dict(cls, database_uuid: UUID, payload: dict[str, Any]) -> "Rollup":
+        return cls(
+            database_uuid=database_uuid,
+            table_name=payload["table_name"],
+            temporal_column=payload["temporal_column"],
+            time_grain=TimeGrain(payload["time_grain"]),
+            metrics=[
+                Metric(aggregate=metric["aggregate"].upper(), column=metric.get("column"))
+                for metric in payload["metrics"]
+            ],
+            schema=payload.get("schema"),
+            dimensions=list(payload.get("dimensions") or ()),
+            temporal_column_type=payload.get("temporal_column_type", "TIMESTAMP"),
+            rollup_schema=payload.get("rollup_schema", payload.get("schema")),
+            refresh_interval=int(
+                payload.get("refresh_interval", ROLLUP_DEFAULT_REFRESH_INTERVAL)
+            ),
+            late_arrival=int(payload.get("late_arrival", ROLLUP_DEFAULT_LATE_ARRIVAL)),
+        )
+
+    @property
+    def key(self) -> str:
+        payload = json.dumps(
+            [
+                str(self.database_uuid),
+                self.schema,
+                self.table_name,
+                self.temporal_column,
+                self.time_grain,
+                sorted(self.dimensions),
+                sorted(self.storage_columns),
+            ]
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    @property
+    def rollup_table(self) -> str:
+        return f"{ROLLUP_TABLE_PREFIX}_{self.key[:16]}"
+
+    @property
+    def storage_columns(self) -> dict[str, Metric]:
+        """
+        Re-aggregatable metrics stored in the rollup by column name.
+        """
+        columns = {}
+        for metric in self.metrics:
+            if metric.aggregate == "AVG":
+                aggregates = ["SUM", "COUNT"]
+            elif metric.aggregate in _REAGGREGATES:
+                aggregates = [metric.aggregate]
+            else:
+                # COUNT_DISTINCT can't be combined across buckets
+                continue
+            for aggregate in aggregates:
+                name = _storage_name(aggregate, metric.column)
+                columns[name] = Metric(aggregate, metric.column, label=name)
+        return columns
+
+    def get_source_query(self) -> ChartQuery:
+        return ChartQuery(
+            table_name=self.table_name,
+            temporal_column=self.temporal_column,
+            metrics=list(self.storage_columns.values()),
+            time_grain=self.time_grain,
+            schema=self.schema,
+            groupby=list(self.dimensions),
+            temporal_column_type=self.temporal_column_type,
+        )
+
+    def rewrite_metric(self, metric: Metric) -> Optional[Metric]:
+        aggregate = metric.aggregate.upper()
+        if metric.expression:
+            return None
+        columns = self.storage_columns
+        label = metric.get_label()
+        if aggregate == "AVG":
+            sum_name = _storage_name("SUM", metric.column)
+            count_name = _storage_name("COUNT", metric.column)
+            if sum_name not in columns or count_name not in columns:
+                return None
+            return Metric(
+                aggregate,
+                label=label,
+                expression=f"SUM({sum_name}) * 1.0 / NULLIF(SUM({count_name}), 0)",
+            )
+        if aggregate not in _REAGGREGATES:
+            return None
+        name = _storage_name(aggregate, metric.column)
+        if name not in columns:
+            return None
+        return Metric(aggregate, label=label, expression=f"{_REAGGREGATES[aggregate]}({name})")
+
+    def rewrite(self, query: ChartQuery) -> Optional[ChartQuery]:
+        """
+        ``query`` answered from this rollup, ``None`` when it can't be.
+        """
+        if (
+            query.table_name != self.table_name
+            or query.schema != self.schema
+            or query.temporal_column != self.temporal_column
+            or not can_roll_up(self.time_grain, query.time_grain)
+            or not set(query.groupby) <= set(self.dimensions)
+            or any(filter_.column not in self.dimensions for filter_ in query.filters)
+            or any(
+                bound is not None and not is_aligned(bound, self.time_grain)
+                for bound in query.time_range
+            )
+        ):
+            return None
+        metrics = [self.rewrite_metric(metric) for metric in query.metrics]
+        if any(metric is None for metric in metrics):
+            return None
+        return replace(
+            query,
+            table_name=self.rollup_table,
+            schema=self.rollup_schema,
+            temporal_column=TIMESTAMP_LABEL,
+            metrics=metrics,
+        )
+
+
+@dataclass
+class RollupState:
+    watermark: Optional[datetime] = None
+    refreshed_at: Optional[float] = None
+    error: Optional[str] = None
+
+
+class RollupManager:
+    """
+    Builds and maintains the rollup tables declared by registered databases
+    and routes chart queries they can answer to them.
+
+    Refreshes are incremental: the buckets from the last one at or before
+    the watermark, the latest rolled up bucket, minus ``late_arrival`` are
+    deleted and aggregated again from the source table in one transaction,
+    which records the new state in the state table. The in-process state is
+    only updated once it committed, from the refresh or ``load_states``.
+    """
+
+    def __init__(self) -> None:
+        self._states: dict[str, RollupState] = {}
+        self._refreshing: set[str] = set()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_rollups(database: "DBS") -> list[Rollup]:
+        try:
+            extra = json.loads(database.extra or "{}")
+        except json.JSONDecodeError:
+            return []
+        rollups = []
+        for payload in extra.get("rollups") or ():
+            try:
+                rollups.append(Rollup.from_dict(database.uuid, payload))
+            except (KeyError, TypeError, ValueError):
+                logger.warning("Ignoring invalid rollup of database %s", database.uuid)
+        return rollups
+
+    def get_state(self, rollup: Rollup) -> RollupState:
+        with self._lock:
+            return self._states.setdefault(rollup.key, RollupState())
+
+    def get_fresh_watermark(self, rollup: Rollup) -> Optional[datetime]:
+        """
+        Watermark of the rollup when it's built and hasn't missed a scheduled
+        refresh, ``None`` otherwise.
+        """
+        with self._lock:
+            state = self._states.get(rollup.key)
+            if state is None:
+                return None
+            watermark, refreshed_at = state.watermark, state.refreshed_at
+        if refreshed_at is None or time.time() - refreshed_at > 2 * rollup.refresh_interval:
+            return None
+        return watermark
+
+    def is_fresh(self, rollup: Rollup) -> bool:
+        """
+        Whether the rollup is built and hasn't missed a scheduled refresh.
+        """
+        return self.get_fresh_watermark(rollup) is not None
+
+    def route(self, database: "DBS", query: ChartQuery) -> ChartQuery:
+        """
+        Rewrite ``query`` to read from the coarsest fresh rollup able to
+        answer it, or return it untouched. Only queries ending at or before
+        the watermark are routed: the bucket at the watermark was rolled up
+        while still filling and the later ones not at all.
+        """
+        end = query.time_range[1]
+        if end is None:
+            return query
+        candidates = []
+        for rollup in self.get_rollups(database):
+            watermark = self.get_fresh_watermark(rollup)
+            if watermark is None or _to_naive_utc(end) > _to_naive_utc(watermark):
+                continue
+            if rewritten := rollup.rewrite(query):
+                grain_seconds = _FIXED_GRAIN_SECONDS.get(rollup.time_grain, 86400 * 7)
+                candidates.append((grain_seconds, rewritten))
+        if not candidates:
+            return query
+        return max(candidates, key=lambda candidate: candidate[0])[1]
+
+    @staticmethod
+    def _execute(connection: Any, sql: str) -> Any:
+        # statements are rendered with literals, don't let the driver format them
+        return connection.exec_driver_sql(
+            sql, execution_options={"no_parameters": True}
+        )
+
+    def refresh(self, database: "DBS", rollup: Rollup) -> RollupState:
+        state = self.get_state(rollup)
+        with self._lock:
+            watermark = state.watermark
+        engine = database.get_sqla_engine()
+        builder = ChartQueryBuilder(database.db_engine_specific, engine.dialect)
+        source = rollup.get_source_query()
+        target = builder.get_table(
+            ChartQuery(rollup.rollup_table, TIMESTAMP_LABEL, [], schema=rollup.rollup_schema)
+        )
+        columns = ", ".join(
+            builder.quote(column)
+            for column in [TIMESTAMP_LABEL, *rollup.dimensions, *rollup.storage_columns]
+        )
+
+        with engine.begin() as connection:
+            if not inspect(connection).has_table(rollup.rollup_table, rollup.rollup_schema):
+                self._execute(connection, f"CREATE TABLE {target} AS\n{builder.build(source)}")
+            else:
+                if lock := database.db_engine_specific.get_lock_table_sql(target):
+                    # workers refreshing at once would insert the same buckets twice
+                    self._execute(connection, lock)
+                cutoff = None
+                if watermark is None:
+                    watermark = _to_datetime(
+                        self._execute(
+                            connection, f"SELECT MAX({TIMESTAMP_LABEL}) FROM {target}"
+                        ).scalar()
+                    )
+                if watermark is not None:
+                    restart = watermark - timedelta(seconds=rollup.late_arrival)
+                    cutoff = _to_datetime(
+                        self._execute(
+                            connection,
+                            f"SELECT MAX({TIMESTAMP_LABEL}) FROM {target} "
+                            f"WHERE {TIMESTAMP_LABEL} <= "
+                            f"{builder.render_literal(restart, rollup.temporal_column_type)}",
+                        ).scalar()
+                    )
+                if cutoff is None:
+                    self._execute(connection, f"DELETE FROM {target}")
+                else:
+                    self._execute(
+                        connection,
+                        f"DELETE FROM {target} WHERE {TIMESTAMP_LABEL} >= "
+                        f"{builder.render_literal(cutoff, rollup.temporal_column_type)}",
+                    )
+                    source = replace(source, time_range=(cutoff, None))
+                self._execute(
+                    connection, f"INSERT INTO {target} ({columns})\n{builder.build(source)}"
+                )
+            watermark = _to_datetime(
+                self._execute(
+                    connection, f"SELECT MAX({TIMESTAMP_LABEL}) FROM {target}"
+                ).scalar()
+            )
+            refreshed_at = time.time()
+            state_table = get_state_table(rollup.rollup_schema)
+            state_table.create(connection, checkfirst=True)
+            connection.execute(
+                delete(state_table).where(state_table.c.rollup_table == rollup.rollup_table)
+            )
+            connection.execute(
+                insert(state_table).values(
+                    rollup_table=rollup.rollup_table,
+                    watermark=watermark.isoformat() if watermark is not None else None,
+                    refreshed_at=refreshed_at,
+                )
+            )
+
+        # committed, routing may use it from now on
+        with self._lock:
+            state.watermark = watermark
+            state.refreshed_at = refreshed_at
+            state.error = None
+        return state
+
+    def load_states(self, databases: list["DBS"]) -> None:
+        """
+        Load the state of the rollups of ``databases`` recorded by the process
+        refreshing them, for processes routing queries without refreshing.
+        """
+        for database in databases:
+            rollups = self.get_rollups(database)
+            if not rollups:
+                continue
+            try:
+                with database.get_sqla_engine().connect() as connection:
+                    for rollup in rollups:
+                        state_table = get_state_table(rollup.rollup_schema)
+                        if not inspect(connection).has_table(
+                            ROLLUP_STATE_TABLE, rollup.rollup_schema
+                        ):
+                            continue
+                        row = connection.execute(
+                            select(state_table.c.watermark, state_table.c.refreshed_at).where(
+                                state_table.c.rollup_table == rollup.rollup_table
+                            )
+                        ).first()
+                        if row is None:
+                            continue
+                        state = self.get_state(rollup)
+                        with self._lock:
+                            state.watermark = _to_datetime(row.watermark)
+                            state.refreshed_at = row.refreshed_at
+            except Exception:
+                logger.exception("Failed to load the rollup states of database %s", database.uuid)
+
+    def refresh_due(self, databases: list["DBS"]) -> None:
+        """
+        Refresh every rollup of ``databases`` whose refresh interval elapsed,
+        failures are kept on the rollup state and retried on the next run.
+        """
+        now = time.time()
+        for database in databases:
+            for rollup in self.get_rollups(database):
+                state = self.get_state(rollup)
+                if (
+                    state.refreshed_at is not None
+                    and now - state.refreshed_at < rollup.refresh_interval
+                ):
+                    continue
+                with self._lock:
+                    if rollup.key in self._refreshing:
+                        continue
+                    self._refreshing.add(rollup.key)
+                try:
+                    self.refresh(database, rollup)
+                except Exception as ex:
+                    logger.exception("Failed to refresh rollup %s", rollup.rollup_table)
+                    with self._lock:
+                        state.error = str(ex)
+                finally:
+                    with self._lock:
+                        self._refreshing.discard(rollup.key)
+
+
+rollup_manager = RollupManager()
+
+
+async def run_rollup_scheduler(
+    interval: float = ROLLUP_SCHEDULER_INTERVAL,
+    refresh: bool = ROLLUP_REFRESH_ENABLED,
+) -> None:
+    """
+    Refresh due rollups of every registered database every ``interval``
+    seconds, or only load their state when ``refresh`` is off, meant to run
+    as a background task of the application.
+    """
+    while True:
+        try:
+            async with AsyncSessionLocal() as session:
+                databases = await DbsDAO.find_all(session)
+            await asyncio.to_thread(
+                rollup_manager.refresh_due if refresh else rollup_manager.load_states,
+                databases,
+            )
+        except Exception:
+            logger.exception("Rollup scheduler run failed")
+        await asyncio.sleep(interval)
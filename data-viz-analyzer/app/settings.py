@@ -5,8 +5,8 @@ from dotenv import load_dotenv
 load_dotenv()
 
 
-def get_connection_string():
-    engine = os.environ.get("DB_ENGINE")
+def get_connection_string(engine: str | None = None):
+    engine = engine or os.environ.get("DB_ENGINE")
     host = os.environ.get("DB_HOST")
     username = os.environ.get("DB_USERNAME")
     password = os.environ.get("DB_PASSWORD")
@@ -15,3 +15,73 @@ def get_connection_string():
 
 
 SQLALCHEMY_DATABASE_URL = get_connection_string()
+SQLALCHEMY_ASYNC_DATABASE_URL = get_connection_string(
+    os.environ.get("DB_ASYNC_ENGINE", "postgresql+asyncpg")
+)
+
+# Upper bound, in seconds, for the network checks run when validating
+# connection parameters
+VALIDATION_TIMEOUT = float(os.environ.get("VALIDATION_TIMEOUT", 10))
+# Delay before racing the next resolved address when probing a port
+HAPPY_EYEBALLS_DELAY = float(os.environ.get("HAPPY_EYEBALLS_DELAY", 0.25))
+# Connections validated at once by the bulk check endpoint
+VALIDATION_CONCURRENCY = int(os.environ.get("VALIDATION_CONCURRENCY", 10))
+MAX_VALIDATION_CONCURRENCY = int(os.environ.get("MAX_VALIDATION_CONCURRENCY", 50))
+# Cache of DNS and port probe results, negative results expire sooner so a
+# fixed host or firewall rule is picked up quickly
+NETWORK_CACHE_SIZE = int(os.environ.get("NETWORK_CACHE_SIZE", 1024))
+NETWORK_CACHE_POSITIVE_TTL = float(os.environ.get("NETWORK_CACHE_POSITIVE_TTL", 300))
+NETWORK_CACHE_NEGATIVE_TTL = float(os.environ.get("NETWORK_CACHE_NEGATIVE_TTL", 15))
+# Pooled engines kept for registered databases and the connections they may
+# open altogether
+ENGINE_MANAGER_MAX_ENGINES = int(os.environ.get("ENGINE_MANAGER_MAX_ENGINES", 64))
+ENGINE_MANAGER_MAX_CONNECTIONS = int(os.environ.get("ENGINE_MANAGER_MAX_CONNECTIONS", 200))
+# Page size of the database connections listing
+DATABASE_PAGE_SIZE = int(os.environ.get("DATABASE_PAGE_SIZE", 100))
+MAX_DATABASE_PAGE_SIZE = int(os.environ.get("MAX_DATABASE_PAGE_SIZE", 1000))
+# In-memory cache of query results, bounded by the size of the cached results
+RESULT_CACHE_MAX_BYTES = int(os.environ.get("RESULT_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+# Used when a database doesn't set "result_cache_timeout" in its extra
+RESULT_CACHE_DEFAULT_TIMEOUT = int(os.environ.get("RESULT_CACHE_DEFAULT_TIMEOUT", 300))
+# Directory of the on-disk result cache shared by the workers of a host,
+# left empty to keep results in memory only
+RESULT_CACHE_DIR = os.environ.get("RESULT_CACHE_DIR", "")
+RESULT_CACHE_DIR_MAX_BYTES = int(
+    os.environ.get("RESULT_CACHE_DIR_MAX_BYTES", 4 * 1024 * 1024 * 1024)
+)
+# Used when a database doesn't set "<level>_cache_timeout" in the
+# "metadata_cache_timeout" of its extra
+METADATA_CACHE_DEFAULT_TIMEOUT = int(os.environ.get("METADATA_CACHE_DEFAULT_TIMEOUT", 600))
+METADATA_CACHE_MAX_ENTRIES = int(os.environ.get("METADATA_CACHE_MAX_ENTRIES", 10000))
+# Threads introspecting databases for cache misses and background refreshes
+METADATA_CACHE_REFRESH_WORKERS = int(os.environ.get("METADATA_CACHE_REFRESH_WORKERS", 4))
+# Seconds before the latest cached timestamp re-queried by incremental chart
+# refreshes, rows arriving later than that are only picked by a full refresh
+INCREMENTAL_REFRESH_LATE_ARRIVAL = int(os.environ.get("INCREMENTAL_REFRESH_LATE_ARRIVAL", 300))
+# Seconds between two runs of the rollup scheduler, 0 disables it
+ROLLUP_SCHEDULER_INTERVAL = float(os.environ.get("ROLLUP_SCHEDULER_INTERVAL", 60))
+# Whether the scheduler of this process refreshes rollups, to enable on a single
+# process of a deployment; the others load the state the refreshes record
+ROLLUP_REFRESH_ENABLED = os.environ.get("ROLLUP_REFRESH_ENABLED", "false").lower() in (
+    "1", "true", "yes"
+)
+# Used when a rollup doesn't set "refresh_interval" or "late_arrival", in seconds
+ROLLUP_DEFAULT_REFRESH_INTERVAL = int(os.environ.get("ROLLUP_DEFAULT_REFRESH_INTERVAL", 300))
+ROLLUP_DEFAULT_LATE_ARRIVAL = int(os.environ.get("ROLLUP_DEFAULT_LATE_ARRIVAL", 3600))
+# Workers running background query jobs, and finished jobs kept for polling
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 8))
+JOB_HISTORY_SIZE = int(os.environ.get("JOB_HISTORY_SIZE", 1000))
+# Seconds between two status checks of a streamed job
+JOB_POLL_INTERVAL = float(os.environ.get("JOB_POLL_INTERVAL", 0.5))
+# Used when a database doesn't set "query_timeout" in its extra, in seconds,
+# 0 lets queries run unbounded
+QUERY_TIMEOUT = float(os.environ.get("QUERY_TIMEOUT", 300))
+# Seconds past the timeout before the watchdog cancels a query the database
+# didn't stop by itself
+QUERY_TIMEOUT_GRACE = float(os.environ.get("QUERY_TIMEOUT_GRACE", 2))
+# Threads sending the cancels of queries past their timeout, each on a
+# connection of its own
+QUERY_CANCEL_WORKERS = int(os.environ.get("QUERY_CANCEL_WORKERS", 4))
+# Statements kept prepared per connection for repeated chart queries on
+# engines supporting it, 0 disables preparing them
+PREPARED_STATEMENT_CACHE_SIZE = int(os.environ.get("PREPARED_STATEMENT_CACHE_SIZE", 100))
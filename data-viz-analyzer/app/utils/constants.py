@@ -25,4 +25,17 @@ class TimeGrain(StrEnum):
     MONTH = "P1M"
     QUARTER = "P3M"
     QUARTER_YEAR = "P0.25Y"
-    YEAR = "P1Y"
\ No newline at end of file
+    YEAR = "P1Y"
+
+
+class DownsamplingMethod(StrEnum):
+    LTTB = "lttb"
+    MIN_MAX = "minmax"
+
+
+class QueryJobStatus(StrEnum):
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCESS = "success"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
@@ -0,0 +1,183 @@
+from typing import Optional
+
+import numpy as np
+
+from app.result_set import ColumnarResultSet, DATETIME_DTYPE, ResultColumn
+from app.utils.constants import DownsamplingMethod
+from app.utils.core import GenericDataType
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Indices of the points kept by Largest-Triangle-Three-Buckets over the
+    sorted ``x``: the first and last points, and in each of ``threshold - 2``
+    equally sized buckets the point forming the largest triangle with the
+    point kept in the previous bucket and the average of the next one.
+    """
+    length = len(x)
+    if threshold >= length or threshold < 3:
+        return np.arange(length)
+
+    # bucket i spans [edges[i], edges[i + 1]), the first and last points are
+    # buckets of their own
+    edges = (np.arange(threshold - 1) * ((length - 2) / (threshold - 2))).astype(np.int64) + 1
+    edges[-1] = length - 1
+    counts = np.diff(edges)
+    next_x = np.append(np.add.reduceat(x[1:-1], edges[:-1] - 1) / counts, x[-1])[1:]
+    next_y = np.append(np.add.reduceat(y[1:-1], edges[:-1] - 1) / counts, y[-1])[1:]
+
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0] = selected = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        area = np.abs(
+            (x[selected] - next_x[bucket]) * (y[start:end] - y[selected])
+            - (x[selected] - x[start:end]) * (next_y[bucket] - y[selected])
+        )
+        selected = start + int(np.argmax(area))
+        indices[bucket + 1] = selected
+    indices[-1] = length - 1
+    return indices
+
+
+def _first_matches(matches: np.ndarray, starts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    positions = np.flatnonzero(matches)
+    buckets = np.repeat(np.arange(len(starts)), counts)[positions]
+    _, first = np.unique(buckets, return_index=True)
+    return positions[first]
+
+
+def min_max_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Indices of the lowest and highest point of each of ``threshold // 2``
+    buckets of equal width along the sorted ``x``, plus the first and last
+    points. Keeps every spike, unlike LTTB, at the cost of a noisier line.
+    """
+    length = len(x)
+    if threshold >= length or threshold < 2:
+        return np.arange(length)
+
+    buckets = threshold // 2
+    bounds = x[0] + (x[-1] - x[0]) * (np.arange(1, buckets) / buckets)
+    starts = np.unique(np.concatenate(([0], np.searchsorted(x, bounds))))
+    starts = starts[starts < length]
+    counts = np.diff(np.append(starts, length))
+    lowest = np.repeat(np.minimum.reduceat(y, starts), counts)
+    highest = np.repeat(np.maximum.reduceat(y, starts), counts)
+    return np.unique(
+        np.concatenate(
+            (
+                _first_matches(y == lowest, starts, counts),
+                _first_matches(y == highest, starts, counts),
+                [0, length - 1],
+            )
+        )
+    )
+
+
+_DOWNSAMPLERS = {
+    DownsamplingMethod.LTTB: lttb_indices,
+    DownsamplingMethod.MIN_MAX: min_max_indices,
+}
+
+
+def _find_temporal_column(result_set: ColumnarResultSet) -> Optional[ResultColumn]:
+    for column in result_set.columns:
+        if column.values.dtype == DATETIME_DTYPE:
+            return column
+    return None
+
+
+def _get_series_ids(dimensions: list[ResultColumn], length: int) -> np.ndarray:
+    """
+    Number the distinct combinations of the dimension values, each one is a
+    series of its own on the chart.
+    """
+    series_ids = np.zeros(length, dtype=np.int64)
+    for column in dimensions:
+        values = column.values
+        if values.dtype == np.dtype(object):
+            values = np.array([repr(value) for value in values.tolist()])
+        _, codes = np.unique(values, return_inverse=True)
+        codes = codes.astype(np.int64) + 1
+        if column.nulls is not None:
+            codes[column.nulls] = 0
+        series_ids = series_ids * (int(codes.max(initial=0)) + 1) + codes
+        _, series_ids = np.unique(series_ids, return_inverse=True)
+    return series_ids
+
+
+def downsample(
+    result_set: ColumnarResultSet,
+    threshold: int,
+    metric_labels: list[str],
+    method: str = DownsamplingMethod.LTTB,
+) -> ColumnarResultSet:
+    """
+    Reduce a time series result to about ``threshold`` points per series and
+    metric, ``threshold`` usually being the width of the chart in pixels.
+    The metrics are the numeric columns named by ``metric_labels``, series are
+    split by the other columns and each metric keeps its own points, the rows
+    kept are the union of those. Results without a timestamp or metric column
+    are returned as is.
+    """
+    try:
+        downsampler = _DOWNSAMPLERS[DownsamplingMethod(method)]
+    except ValueError:
+        raise ValueError(f"Unsupported downsampling method {method}") from None
+
+    length = len(result_set)
+    temporal = _find_temporal_column(result_set)
+    labels = set(metric_labels)
+    metrics = [
+        column
+        for column in result_set.columns
+        if column.name in labels and column.generic_type == GenericDataType.NUMERIC
+    ]
+    if temporal is None or not metrics or length <= threshold:
+        return result_set
+
+    # numeric group by columns, such as ids, split series like any other
+    dimensions = [
+        column
+        for column in result_set.columns
+        if column is not temporal and column.name not in labels
+    ]
+    x = temporal.values.view(np.int64).astype(np.float64)
+    keep = np.zeros(length, dtype=bool)
+    if temporal.nulls is not None:
+        # rows not plotted along the time axis aren't downsampled away
+        keep[temporal.nulls] = True
+
+    for rows in _split_series(dimensions, temporal, length):
+        for metric in metrics:
+            metric_rows = rows if metric.nulls is None else rows[~metric.nulls[rows]]
+            if not len(metric_rows):
+                continue
+            series_x = x[metric_rows]
+            if np.any(series_x[1:] < series_x[:-1]):
+                # the buckets need the time axis in order
+                order = np.argsort(series_x, kind="stable")
+                metric_rows, series_x = metric_rows[order], series_x[order]
+            # DECIMAL metrics are object columns of Decimal
+            series_y = metric.values[metric_rows].astype(np.float64, copy=False)
+            keep[metric_rows[downsampler(series_x, series_y, threshold)]] = True
+    return result_set.take(np.flatnonzero(keep))
+
+
+def _split_series(
+    dimensions: list[ResultColumn], temporal: ResultColumn, length: int
+) -> list[np.ndarray]:
+    """
+    Row indices of each series, leaving out rows without a timestamp.
+    """
+    valid = None if temporal.nulls is None else ~temporal.nulls
+    if not dimensions:
+        return [np.arange(length) if valid is None else np.flatnonzero(valid)]
+
+    series_ids = _get_series_ids(dimensions, length)
+    order = np.argsort(series_ids, kind="stable")
+    if valid is not None:
+        order = order[valid[order]]
+    boundaries = np.flatnonzero(np.diff(series_ids[order])) + 1
+    return np.split(order, boundaries)
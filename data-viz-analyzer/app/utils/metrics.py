@@ -0,0 +1,223 @@
+import bisect
+import math
+import threading
+from typing import Callable, Iterator, Sequence
+
+# Seconds, from sub-millisecond lookups to minutes long queries
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+    30.0, 60.0, 300.0,
+)
+# Seconds, for in-process work such as registry lookups
+FAST_BUCKETS = (
+    0.000001, 0.0000025, 0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025,
+    0.0005, 0.001, 0.0025, 0.01,
+)
+
+_registry: list["Metric"] = []
+_registry_lock = threading.Lock()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values))
+    return f"{{{pairs}}}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric:
+    """
+    Base of the metrics exposed on ``/metrics`` in the Prometheus text format.
+
+    Recording never takes a lock: every thread writes to a shard of its own
+    and the shards are only summed up when scraped. A scrape may see an
+    observation half recorded, e.g. counted but not summed yet, which the
+    next scrape catches up with.
+    """
+
+    type_name = "untyped"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._shards: list[dict[tuple[str, ...], list[float]]] = []
+        self._shards_lock = threading.Lock()
+        self._local = threading.local()
+        with _registry_lock:
+            _registry.append(self)
+
+    def _get_shard(self) -> dict[tuple[str, ...], list[float]]:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            # only once per thread, shards of finished threads are kept so
+            # counters never go backwards
+            with self._shards_lock:
+                self._shards.append(shard)
+            return shard
+
+    def _collect(self) -> dict[tuple[str, ...], list[float]]:
+        with self._shards_lock:
+            shards = list(self._shards)
+        totals: dict[tuple[str, ...], list[float]] = {}
+        for shard in shards:
+            # copying a dict is atomic, the owning thread may be writing to it
+            for labels, values in shard.copy().items():
+                if (total := totals.get(labels)) is None:
+                    totals[labels] = list(values)
+                else:
+                    for index, value in enumerate(values):
+                        total[index] += value
+        return totals
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def expose(self) -> str:
+        lines = [
+            f"# HELP {self.name} {_escape(self.documentation)}",
+            f"# TYPE {self.name} {self.type_name}",
+            *self.samples(),
+        ]
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    type_name = "counter"
+
+    def inc(self, amount: float = 1, *labels: str) -> None:
+        shard = self._get_shard()
+        if (values := shard.get(labels)) is None:
+            shard[labels] = [amount]
+        else:
+            values[0] += amount
+
+    def samples(self) -> Iterator[str]:
+        for labels, (value,) in sorted(self._collect().items()):
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Histogram(Metric):
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels: str) -> None:
+        shard = self._get_shard()
+        if (values := shard.get(labels)) is None:
+            # a count per bucket, the last one being +Inf, then the sum
+            values = shard[labels] = [0.0] * (len(self.buckets) + 2)
+        values[bisect.bisect_left(self.buckets, value)] += 1
+        values[-1] += value
+
+    def samples(self) -> Iterator[str]:
+        names = ("le", *self.labelnames)
+        bounds = [*(_format_value(bound) for bound in self.buckets), "+Inf"]
+        for labels, values in sorted(self._collect().items()):
+            cumulative = 0.0
+            for bound, count in zip(bounds, values[:-1]):
+                cumulative += count
+                yield (
+                    f"{self.name}_bucket{_format_labels(names, (bound, *labels))} "
+                    f"{_format_value(cumulative)}"
+                )
+            label_string = _format_labels(self.labelnames, labels)
+            yield f"{self.name}_sum{label_string} {_format_value(values[-1])}"
+            yield f"{self.name}_count{label_string} {_format_value(cumulative)}"
+
+
+class CallbackGauge(Metric):
+    """
+    Gauge read from ``callback`` on scrape, for values already tracked
+    elsewhere such as the state of connection pools.
+    """
+
+    type_name = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str],
+        callback: Callable[[], dict[tuple[str, ...], float]],
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def samples(self) -> Iterator[str]:
+        for labels, value in sorted(self.callback().items()):
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class CallbackCounter(CallbackGauge):
+    """
+    Counter read from ``callback`` on scrape, for totals already kept
+    elsewhere such as cache hits.
+    """
+
+    type_name = "counter"
+
+
+def generate_latest() -> str:
+    with _registry_lock:
+        metrics = list(_registry)
+    return "\n".join(metric.expose() for metric in metrics) + "\n"
+
+
+HTTP_REQUEST_DURATION = Histogram(
+    "dataviz_http_request_duration_seconds",
+    "Time spent handling HTTP requests until the response starts.",
+    ("method", "route", "status"),
+)
+FETCH_ROWS = Counter(
+    "dataviz_fetch_rows_total",
+    "Rows fetched from target databases.",
+    ("engine",),
+)
+FETCH_BYTES = Counter(
+    "dataviz_fetch_bytes_total",
+    "Bytes of the columnar results fetched from target databases.",
+    ("engine",),
+)
+FETCH_DURATION = Histogram(
+    "dataviz_fetch_duration_seconds",
+    "Time spent fetching and converting results from target databases.",
+    ("engine",),
+)
+VALIDATION_STEP_DURATION = Histogram(
+    "dataviz_validation_step_duration_seconds",
+    "Time taken by the network checks of connection parameters.",
+    ("step",),
+)
+ENGINE_SPECIFIC_LOOKUP_DURATION = Histogram(
+    "dataviz_engine_specific_lookup_duration_seconds",
+    "Time spent resolving the engine spec of a backend and driver.",
+    buckets=FAST_BUCKETS,
+)
+POOL_CHECKOUT_WAIT = Histogram(
+    "dataviz_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled connection to a target database.",
+    ("engine",),
+)
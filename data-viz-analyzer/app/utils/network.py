@@ -1,12 +1,82 @@
+import asyncio
 import platform
 import socket
 import subprocess
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+from app.settings import (
+    HAPPY_EYEBALLS_DELAY,
+    NETWORK_CACHE_NEGATIVE_TTL,
+    NETWORK_CACHE_POSITIVE_TTL,
+    NETWORK_CACHE_SIZE,
+)
 
 PORT_TIMEOUT = 5
 PING_TIMEOUT = 5
 
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries expire after ``positive_ttl`` seconds
+    when the cached value is truthy and after ``negative_ttl`` otherwise.
+    """
+
+    def __init__(self, maxsize: int, positive_ttl: float, negative_ttl: float):
+        self.maxsize = maxsize
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        ttl = self.positive_ttl if value else self.negative_ttl
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
 
-def is_port_open(host: str, port: int) -> bool:
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+probe_cache = TTLCache(
+    NETWORK_CACHE_SIZE, NETWORK_CACHE_POSITIVE_TTL, NETWORK_CACHE_NEGATIVE_TTL
+)
+
+
+def _probe_port(host: str, port: int) -> bool:
     for res in socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM):
         af, _, _, _, sockaddr = res
         s = socket.socket(af, socket.SOCK_STREAM)
@@ -22,20 +92,83 @@ def is_port_open(host: str, port: int) -> bool:
     return False
 
 
-def is_hostname_valid(host: str) -> bool:
+def is_port_open(host: str, port: int, force: bool = False) -> bool:
+    key = ("port", host, port, PORT_TIMEOUT)
+    if not force and (cached := probe_cache.get(key, _MISSING)) is not _MISSING:
+        return cached
+    result = _probe_port(host, port)
+    probe_cache.set(key, result)
+    return result
+
+
+def is_hostname_valid(host: str, force: bool = False) -> bool:
+    key = ("host", host)
+    if not force and (cached := probe_cache.get(key, _MISSING)) is not _MISSING:
+        return cached
     try:
         socket.getaddrinfo(host, None)
-        return True
+        result = True
     except socket.gaierror:
-        return False
+        result = False
+    probe_cache.set(key, result)
+    return result
 
 
-def is_host_up(host: str) -> bool:
+def is_host_up(host: str, force: bool = False) -> bool:
+    key = ("up", host)
+    if not force and (cached := probe_cache.get(key, _MISSING)) is not _MISSING:
+        return cached
     param = "-n" if platform.system().lower() == "windows" else "-c"
     command = ["ping", param, "1", host]
     try:
         output = subprocess.call(command, timeout=PING_TIMEOUT)
     except subprocess.TimeoutExpired:
+        output = None
+
+    result = output == 0
+    probe_cache.set(key, result)
+    return result
+
+
+async def _probe_port_async(host: str, port: int, timeout: float) -> bool:
+    # open_connection resolves the host without blocking the event loop and
+    # races the resolved addresses happy-eyeballs style (RFC 8305)
+    try:
+        async with asyncio.timeout(timeout):
+            _, writer = await asyncio.open_connection(
+                host, port, happy_eyeballs_delay=HAPPY_EYEBALLS_DELAY
+            )
+    except (OSError, TimeoutError):
         return False
 
-    return output == 0
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+    return True
+
+
+async def is_port_open_async(
+    host: str, port: int, timeout: float = PORT_TIMEOUT, force: bool = False
+) -> bool:
+    # a probe given up on after a shorter timeout says nothing of a longer one
+    key = ("port", host, port, timeout)
+    if not force and (cached := probe_cache.get(key, _MISSING)) is not _MISSING:
+        return cached
+    result = await _probe_port_async(host, port, timeout)
+    probe_cache.set(key, result)
+    return result
+
+
+async def is_hostname_valid_async(host: str, force: bool = False) -> bool:
+    key = ("host", host)
+    if not force and (cached := probe_cache.get(key, _MISSING)) is not _MISSING:
+        return cached
+    try:
+        await asyncio.get_running_loop().getaddrinfo(host, None)
+        result = True
+    except socket.gaierror:
+        result = False
+    probe_cache.set(key, result)
+    return result
@@ -0,0 +1,196 @@
+import re
+from typing import NamedTuple
+
+_TOKEN_RE = re.compile(
+    r"""
+    (?P<comment>--[^\n]*|/\*.*?\*/)
+    | (?P<string>[EeNn]?'(?:[^'\\]|''|\\.)*')
+    | (?P<dollar>\$(?P<tag>[A-Za-z_]*)\$.*?\$(?P=tag)\$)
+    | (?P<identifier>"(?:[^"]|"")*"|`[^`]*`)
+    | (?P<number>\d+(?:\.\d*)?(?:[eE][+-]?\d+)?)
+    | (?P<word>[A-Za-z_][A-Za-z0-9_$]*)
+    | (?P<whitespace>\s+)
+    | (?P<punctuation>.)
+    """,
+    re.DOTALL | re.VERBOSE,
+)
+
+# Statements that may follow a WITH clause but aren't queries
+_DML_KEYWORDS = {"INSERT", "UPDATE", "DELETE", "MERGE"}
+_STATEMENT_KEYWORDS = _DML_KEYWORDS | {"SELECT", "VALUES", "TABLE"}
+_LIMIT_KEYWORDS = {"LIMIT", "FETCH"}
+# Top-level clauses that have to come after LIMIT
+_POST_LIMIT_KEYWORDS = {"OFFSET", "FOR"}
+
+
+class Token(NamedTuple):
+    kind: str
+    value: str
+    start: int
+    end: int
+    depth: int
+
+    @property
+    def keyword(self) -> str | None:
+        return self.value.upper() if self.kind == "word" else None
+
+    @property
+    def is_significant(self) -> bool:
+        return self.kind not in {"comment", "whitespace"}
+
+
+def tokenize(sql: str) -> list[Token]:
+    tokens = []
+    depth = 0
+    for match in _TOKEN_RE.finditer(sql):
+        kind = match.lastgroup if match.lastgroup != "tag" else "dollar"
+        value = match.group()
+        if value == ")":
+            depth = max(depth - 1, 0)
+        tokens.append(Token(kind, value, match.start(), match.end(), depth))
+        if value == "(":
+            depth += 1
+    return tokens
+
+
+class ParsedQuery:
+    """
+    Lightweight, dialect-agnostic view over a SQL statement, precise enough to
+    find the statement type and its top-level ``LIMIT`` while ignoring
+    comments, string literals and subqueries.
+    """
+
+    def __init__(self, sql: str) -> None:
+        self.sql = sql
+        self.tokens = [token for token in tokenize(sql) if token.is_significant]
+
+    @property
+    def statements(self) -> list[list[Token]]:
+        statements: list[list[Token]] = [[]]
+        for token in self.tokens:
+            if token.value == ";" and token.depth == 0:
+                statements.append([])
+            else:
+                statements[-1].append(token)
+        return [statement for statement in statements if statement]
+
+    @property
+    def normalized(self) -> str:
+        """
+        The statement without comments, with whitespace collapsed and keywords
+        upper-cased, so formatting changes don't change the text.
+        """
+        return " ".join(token.keyword or token.value for token in self.tokens)
+
+    def _top_level(self) -> list[Token]:
+        return [token for token in self.tokens if token.depth == 0]
+
+    def is_select(self) -> bool:
+        statements = self.statements
+        if len(statements) != 1:
+            return False
+        keywords = [token.keyword for token in statements[0] if token.depth == 0]
+        if not keywords or keywords[0] not in {"SELECT", "WITH"}:
+            return False
+        # SELECT ... INTO creates a table and data-modifying CTEs change data,
+        # DML keywords elsewhere are e.g. FOR UPDATE or columns named so
+        return "INTO" not in keywords and not any(
+            token.keyword in _DML_KEYWORDS
+            for token in self._statement_starts(statements[0])
+        )
+
+    @staticmethod
+    def _statement_starts(statement: list[Token]) -> list[Token]:
+        """
+        First tokens of ``statement`` and, after a WITH clause, of the body of
+        each CTE and of the statement following them.
+        """
+        starts = statement[:1]
+        if not starts or starts[0].keyword != "WITH":
+            return starts
+        previous = None
+        for idx, token in enumerate(statement):
+            if token.depth:
+                continue
+            if token.value == "(" and previous is not None and (
+                previous.keyword in {"AS", "MATERIALIZED"}
+            ):
+                # body of a CTE
+                starts.extend(statement[idx + 1: idx + 2])
+            elif len(starts) > 1 and token.keyword in _STATEMENT_KEYWORDS:
+                # the statement the CTEs are for, nothing after it starts one
+                starts.append(token)
+                break
+            previous = token
+        return starts
+
+    def _find_limit(self) -> tuple[Token, Token | None] | None:
+        top_level = self._top_level()
+        for idx, token in enumerate(top_level):
+            if token.keyword not in _LIMIT_KEYWORDS:
+                continue
+            following = top_level[idx + 1: idx + 4]
+            if token.keyword == "FETCH":
+                # FETCH { FIRST | NEXT } [ n ] { ROW | ROWS } ONLY
+                following = following[1:]
+            elif len(following) == 3 and following[1].value == ",":
+                # LIMIT offset, row_count
+                following = following[2:]
+            value = following[0] if following else None
+            if value is not None and value.kind in {"number", "word"}:
+                return token, value
+            return token, None
+        return None
+
+    @property
+    def limit(self) -> int | None:
+        if not (found := self._find_limit()):
+            return None
+        _, value = found
+        if value is not None and value.kind == "number" and value.value.isdigit():
+            return int(value.value)
+        return None
+
+    def _end_of_statement(self) -> int:
+        significant = [token for token in self.tokens if token.value != ";"]
+        return significant[-1].end if significant else 0
+
+    def set_or_update_limit(self, new_limit: int) -> str:
+        """
+        Add a top-level ``LIMIT`` or lower the existing one. Non-SELECT
+        statements, and queries already limited to fewer rows, are returned
+        untouched.
+        """
+        if not self.is_select():
+            return self.sql
+
+        if found := self._find_limit():
+            keyword, value = found
+            if value is None:
+                # parameters and other expressions can't be compared
+                return self.wrap_with_limit(new_limit)
+            if value.kind == "number":
+                if not value.value.isdigit() or int(value.value) <= new_limit:
+                    return self.sql
+            elif value.keyword != "ALL" or keyword.keyword != "LIMIT":
+                return self.wrap_with_limit(new_limit)
+            return f"{self.sql[:value.start]}{new_limit}{self.sql[value.end:]}"
+
+        for token in self._top_level():
+            if token.keyword in _POST_LIMIT_KEYWORDS:
+                return f"{self.sql[:token.start]}LIMIT {new_limit}\n{self.sql[token.start:]}"
+
+        end = self._end_of_statement()
+        return f"{self.sql[:end]}\nLIMIT {new_limit}{self.sql[end:]}"
+
+    def wrap_with_limit(self, new_limit: int) -> str:
+        """
+        Wrap the query as a subquery limited to ``new_limit`` rows, for engines
+        whose dialect can't be safely rewritten in place.
+        """
+        if not self.is_select():
+            return self.sql
+        if (limit := self.limit) is not None and limit <= new_limit:
+            return self.sql
+        body = self.sql[:self._end_of_statement()]
+        return f"SELECT * FROM (\n{body}\n) AS inner_qry\nLIMIT {new_limit}"
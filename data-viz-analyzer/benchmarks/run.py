@@ -0,0 +1,392 @@
+"""
+Micro-benchmarks of the engine spec hot paths, run offline: results come
+from fake DB-API cursors and network checks hit a listener on localhost.
+
+    python -m benchmarks.run                         # run and print
+    python -m benchmarks.run --save baseline.json    # record a baseline
+    python -m benchmarks.run --compare baseline.json # flag regressions
+
+Run from the ``data-viz-analyzer`` directory. ``--quick`` skips the 1M rows
+cases, ``--filter`` only runs the cases whose name contains it. Comparing
+exits with status 1 when a case got slower than the baseline by more than
+``--threshold``.
+"""
+import argparse
+import asyncio
+import gc
+import json
+import platform
+import socket
+import statistics
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any, Callable, Optional
+
+from sqlalchemy import types
+
+from app.engine_specifics import get_engine_specific, reload_engine_specifics
+from app.engine_specifics.base import BaseSpecificEngine
+from app.engine_specifics.postgres import PostgresSpecificEngine
+
+# One native type per column type mapping of the Postgres spec, which
+# includes the default mappings, and one matching none of them
+NATIVE_TYPES = (
+    "STRING", "NVARCHAR(64)", "VARCHAR(255)", "CHAR(1)", "TEXT", "LONGTEXT",
+    "SMALLINT", "INTEGER", "BIGINT", "LONG", "DECIMAL(12, 2)", "NUMERIC(10)",
+    "FLOAT", "DOUBLE", "REAL", "SMALLSERIAL", "SERIAL", "BIGSERIAL", "MONEY",
+    "TIMESTAMP WITH TIME ZONE", "TIMESTAMP WITHOUT TIME ZONE", "DATETIME", "DATE",
+    "TIME", "INTERVAL", "BOOLEAN", "DOUBLE PRECISION", "ARRAY", "JSONB", "ENUM",
+    "GEOMETRY",
+)
+ROW_COUNTS = (10_000, 1_000_000)
+QUICK_ROW_COUNTS = (10_000,)
+MIN_TIME = 0.2
+DEFAULT_REPEAT = 5
+DEFAULT_THRESHOLD = 0.1
+
+URI_PARAMETERS = {
+    "username": "dataviz",
+    "password": "p@ss:word",
+    "host": "db.internal",
+    "port": 5432,
+    "database": "analytics",
+    "query": {"application_name": "dataviz"},
+    "encryption": True,
+}
+
+
+class FakeCursor:
+    """
+    DB-API cursor serving prebuilt rows, so fetching costs what the engine
+    spec does with them and nothing else.
+    """
+
+    description = (
+        ("id", "INTEGER", None, None, None, None, True),
+        ("amount", "NUMERIC", None, None, None, None, True),
+        ("name", "VARCHAR", None, None, None, None, True),
+        ("created_at", "TIMESTAMP", None, None, None, None, True),
+    )
+
+    def __init__(self, rows: list[tuple[Any, ...]]) -> None:
+        self.rows = rows
+        self.arraysize = 1
+        self._position = 0
+
+    def execute(self, sql: str, parameters: Any = None) -> None:
+        self._position = 0
+
+    def fetchall(self) -> list[tuple[Any, ...]]:
+        rows = self.rows[self._position:]
+        self._position = len(self.rows)
+        return rows
+
+    def fetchmany(self, size: Optional[int] = None) -> list[tuple[Any, ...]]:
+        start = self._position
+        self._position = min(start + (size or self.arraysize), len(self.rows))
+        return self.rows[start:self._position]
+
+    def close(self) -> None:
+        pass
+
+
+class BenchEngine(BaseSpecificEngine):
+    engine = "bench"
+
+
+class RowMutatingEngine(BenchEngine):
+    column_type_mutators = {
+        types.Numeric: lambda value: float(value) if value is not None else None,
+    }
+
+
+class ColumnarMutatingEngine(BenchEngine):
+    columnar_type_mutators = {
+        types.Numeric: lambda values: [
+            float(value) if value is not None else None for value in values
+        ],
+    }
+
+
+def make_rows(count: int) -> list[tuple[Any, ...]]:
+    # values are drawn from small pools, only the tuples scale with the count
+    amounts = [Decimal(f"{index}.25") for index in range(1000)]
+    names = [f"name-{index}" for index in range(1000)]
+    start = datetime(2024, 1, 1)
+    timestamps = [start + timedelta(seconds=index) for index in range(1000)]
+    return [
+        (index, amounts[index % 1000], names[index % 1000], timestamps[index % 1000])
+        for index in range(count)
+    ]
+
+
+class Listener:
+    """
+    TCP listener on localhost accepting and closing connections, the target
+    of the port probes.
+    """
+
+    def __init__(self) -> None:
+        self.socket = socket.create_server(("127.0.0.1", 0), backlog=128)
+        self.port = self.socket.getsockname()[1]
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def _serve(self) -> None:
+        while True:
+            try:
+                connection, _ = self.socket.accept()
+            except OSError:
+                return
+            connection.close()
+
+    def close(self) -> None:
+        self.socket.close()
+
+
+@dataclass
+class Case:
+    name: str
+    func: Callable[[], Any]
+    # rows handled by one call, reported as rows per second
+    rows: Optional[int] = None
+
+
+def get_cases(row_counts: tuple[int, ...], listener: Listener) -> list[Case]:
+    classifier_engine = PostgresSpecificEngine
+    uri = PostgresSpecificEngine.build_sqlalchemy_uri(URI_PARAMETERS)
+    cases = [
+        Case(
+            "get_column_types",
+            lambda: [classifier_engine.get_column_types(name) for name in NATIVE_TYPES],
+        ),
+        # memoized by the classifier, unlike get_column_types
+        Case(
+            "get_column_spec",
+            lambda: [classifier_engine.get_column_spec(name) for name in NATIVE_TYPES],
+        ),
+        Case(
+            "build_sqlalchemy_uri",
+            lambda: PostgresSpecificEngine.build_sqlalchemy_uri(URI_PARAMETERS),
+        ),
+        Case(
+            "get_parameters_from_uri",
+            lambda: PostgresSpecificEngine.get_parameters_from_uri(uri),
+        ),
+        Case("get_engine_specific", lambda: get_engine_specific("postgresql", "psycopg2")),
+        Case("get_engine_specific_alias", lambda: get_engine_specific("postgres")),
+        Case("get_engine_specific_unknown", lambda: get_engine_specific("nosuchdb")),
+        Case(
+            "get_engine_specific_cold",
+            lambda: (reload_engine_specifics(), get_engine_specific("postgresql", "psycopg2")),
+        ),
+    ]
+
+    properties = {
+        "parameters": {
+            "host": "127.0.0.1",
+            "port": listener.port,
+            "username": "dataviz",
+            "database": "analytics",
+        }
+    }
+    loop = asyncio.new_event_loop()
+    cases.extend(
+        [
+            Case(
+                "validate_parameters",
+                lambda: PostgresSpecificEngine.validate_parameters(properties),
+            ),
+            Case(
+                "validate_parameters_uncached",
+                lambda: PostgresSpecificEngine.validate_parameters(properties, force=True),
+            ),
+            Case(
+                "validate_parameters_async_uncached",
+                lambda: loop.run_until_complete(
+                    PostgresSpecificEngine.validate_parameters_async(properties, force=True)
+                ),
+            ),
+        ]
+    )
+
+    for count in row_counts:
+        rows = make_rows(count)
+        label = f"{count // 1000}k" if count < 1_000_000 else f"{count // 1_000_000}m"
+        for variant, engine in (
+            ("", BenchEngine),
+            ("_row_mutators", RowMutatingEngine),
+            ("_columnar_mutators", ColumnarMutatingEngine),
+        ):
+            cases.append(
+                Case(
+                    f"fetch_data{variant}_{label}",
+                    lambda engine=engine, rows=rows: engine.fetch_data(FakeCursor(rows)),
+                    count,
+                )
+            )
+            cases.append(
+                Case(
+                    f"fetch_result_set{variant}_{label}",
+                    lambda engine=engine, rows=rows: engine.fetch_result_set(
+                        FakeCursor(rows)
+                    ),
+                    count,
+                )
+            )
+        # end to end, serialized the way the API responds: the columnar path
+        # types every cell up front, which fetch_data leaves to the serializer
+        cases.append(
+            Case(
+                f"fetch_data_json_{label}",
+                lambda rows=rows: json.dumps(
+                    BenchEngine.fetch_data(FakeCursor(rows)), default=str
+                ),
+                count,
+            )
+        )
+        cases.append(
+            Case(
+                f"fetch_result_set_json_{label}",
+                lambda rows=rows: json.dumps(
+                    BenchEngine.fetch_result_set(FakeCursor(rows)).to_dict(), default=str
+                ),
+                count,
+            )
+        )
+    return cases
+
+
+def check_native_types() -> None:
+    mappings = PostgresSpecificEngine.get_column_type_classifier().mappings
+    for regex, _, _ in mappings:
+        if not any(regex.match(name) for name in NATIVE_TYPES):
+            print(f"warning: no native type covers {regex.pattern}", file=sys.stderr)
+
+
+def time_case(case: Case, repeat: int, min_time: float) -> dict[str, Any]:
+    def run(number: int) -> float:
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            started = time.perf_counter()
+            for _ in range(number):
+                case.func()
+            return time.perf_counter() - started
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+    # calls per timing, grown until one timing lasts at least ``min_time``
+    number = 1
+    while (elapsed := run(number)) < min_time:
+        number = max(number * 2, int(number * min_time / max(elapsed, 1e-9)))
+    timings = [elapsed / number] + [run(number) / number for _ in range(repeat - 1)]
+    result = {
+        "median": statistics.median(timings),
+        "min": min(timings),
+        "number": number,
+        "repeat": repeat,
+    }
+    if case.rows:
+        result["rows_per_sec"] = case.rows / result["median"]
+    return result
+
+
+def format_duration(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.3g} {unit}"
+    return f"{seconds / 1e-9:.3g} ns"
+
+
+def compare(
+    baseline: dict[str, Any], results: dict[str, Any], threshold: float
+) -> list[str]:
+    """
+    Print the change of each case against the baseline and return the names
+    of the cases slower than it by more than ``threshold``.
+    """
+    regressions = []
+    print(f"\n{'case':<40} {'baseline':>12} {'current':>12} {'change':>9}")
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            print(f"{name:<40} {'-':>12} {format_duration(result['median']):>12} {'new':>9}")
+            continue
+        change = result["median"] / previous["median"] - 1
+        status = ""
+        if change > threshold:
+            status = "  REGRESSION"
+            regressions.append(name)
+        elif change < -threshold:
+            status = "  improved"
+        print(
+            f"{name:<40} {format_duration(previous['median']):>12} "
+            f"{format_duration(result['median']):>12} {change:>+8.1%}{status}"
+        )
+    return regressions
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--save", help="write the results as a JSON baseline")
+    parser.add_argument("--compare", help="JSON baseline to compare the results to")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="relative slowdown flagged as a regression")
+    parser.add_argument("--filter", default="", help="only run cases containing it")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--min-time", type=float, default=MIN_TIME,
+                        help="seconds each timing lasts at least")
+    parser.add_argument("--quick", action="store_true", help="skip the 1M rows cases")
+    args = parser.parse_args(argv)
+
+    check_native_types()
+    listener = Listener()
+    try:
+        cases = [
+            case
+            for case in get_cases(QUICK_ROW_COUNTS if args.quick else ROW_COUNTS, listener)
+            if args.filter in case.name
+        ]
+        results = {}
+        for case in cases:
+            results[case.name] = result = time_case(case, args.repeat, args.min_time)
+            rate = (
+                f"  {result['rows_per_sec'] / 1e6:.2f}M rows/s"
+                if "rows_per_sec" in result
+                else ""
+            )
+            print(f"{case.name:<40} {format_duration(result['median']):>12}{rate}")
+    finally:
+        listener.close()
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(
+                {
+                    "meta": {
+                        "python": platform.python_version(),
+                        "platform": platform.platform(),
+                        "created_at": datetime.now().isoformat(timespec="seconds"),
+                    },
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        if regressions := compare(baseline, results, args.threshold):
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,50 @@
+import json
+
+import pytest
+
+from benchmarks import run
+
+
+@pytest.fixture
+def listener():
+    listener = run.Listener()
+    yield listener
+    listener.close()
+
+
+def test_every_case_runs(listener):
+    cases = run.get_cases((100,), listener)
+
+    assert len({case.name for case in cases}) == len(cases)
+    for case in cases:
+        case.func()
+
+
+def test_time_case_reports_the_rate():
+    result = run.time_case(run.Case("noop", lambda: None, rows=10), repeat=3, min_time=0.001)
+
+    assert result["repeat"] == 3 and result["number"] >= 1
+    assert result["min"] <= result["median"]
+    assert result["rows_per_sec"] == 10 / result["median"]
+
+
+def test_compare_flags_regressions(capsys):
+    baseline = {"fast": {"median": 1.0}, "slow": {"median": 1.0}}
+    results = {"fast": {"median": 0.5}, "slow": {"median": 1.5}, "new": {"median": 1.0}}
+
+    assert run.compare(baseline, results, 0.1) == ["slow"]
+    output = capsys.readouterr().out
+    assert "improved" in output and "REGRESSION" in output
+
+
+def test_saved_baselines_can_be_compared(tmp_path):
+    baseline = tmp_path / "baseline.json"
+    arguments = ["--quick", "--filter", "get_column_types", "--repeat", "1", "--min-time", "0.001"]
+
+    assert run.main([*arguments, "--save", str(baseline)]) == 0
+    saved = json.loads(baseline.read_text())
+    assert list(saved["results"]) == ["get_column_types"]
+
+    saved["results"]["get_column_types"]["median"] /= 1000
+    baseline.write_text(json.dumps(saved))
+    assert run.main([*arguments, "--compare", str(baseline)]) == 1
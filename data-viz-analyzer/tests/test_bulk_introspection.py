@@ -0,0 +1,100 @@
+import sqlite3
+
+import pytest
+from sqlalchemy import create_engine, inspect
+
+from app.engine_specifics.base import BaseSpecificEngine
+from app.engine_specifics.postgres import PostgresSpecificEngine
+from app.utils.core import GenericDataType
+
+
+class Result:
+    def __init__(self, rows) -> None:
+        self.rows = rows
+
+    def tuples(self):
+        return self.rows
+
+    def all(self):
+        return self.rows
+
+
+class Connection:
+    def __init__(self, rows, primary_keys) -> None:
+        self.rows = rows
+        self.primary_keys = primary_keys
+        self.executed = []
+
+    def execute(self, statement, params):
+        self.executed.append((str(statement), params))
+        if "contype" in str(statement):
+            return Result(self.primary_keys)
+        return Result(self.rows)
+
+
+def inspector_for(connection):
+    class Inspector:
+        bind = connection
+
+    return Inspector()
+
+
+def test_postgres_reads_a_schema_in_two_queries():
+    connection = Connection(
+        [
+            ("public", "orders", "r", "id", "integer", False, "nextval('orders_id_seq')"),
+            ("public", "orders", "r", "created", "timestamp with time zone", True, None),
+            ("public", "orders", "r", "note", "character varying(20)", True, None),
+        ],
+        [("public", "orders", "id")],
+    )
+
+    tables = PostgresSpecificEngine.get_bulk_columns(inspector_for(connection), "public")
+
+    assert len(connection.executed) == 2
+    assert all(params == {"schema": "public"} for _, params in connection.executed)
+    assert all("n.nspname = :schema" in statement for statement, _ in connection.executed)
+    identifier, created, note = tables[("public", "orders")]
+    assert (identifier["primary_key"], created["primary_key"]) == (True, False)
+    assert identifier["default"] == "nextval('orders_id_seq')"
+    assert created["column_spec"].is_dttm
+    assert note["column_spec"].generic_type == GenericDataType.STRING
+
+
+def test_postgres_leaves_out_system_schemas_by_default():
+    connection = Connection([], [])
+
+    assert PostgresSpecificEngine.get_bulk_columns(inspector_for(connection), None) == {}
+    for statement, params in connection.executed:
+        assert params == {}
+        assert "NOT IN ('pg_catalog', 'information_schema')" in statement
+
+
+@pytest.fixture
+def inspector(tmp_path):
+    path = tmp_path / "examples.db"
+    with sqlite3.connect(path) as connection:
+        connection.executescript(
+            """
+            CREATE TABLE orders (id INTEGER PRIMARY KEY, day DATE, amount FLOAT NOT NULL);
+            CREATE TABLE customers (name TEXT DEFAULT 'anonymous');
+            """
+        )
+    engine = create_engine(f"sqlite:///{path}")
+    yield inspect(engine)
+    engine.dispose()
+
+
+def test_base_reflects_every_table_at_once(inspector):
+    tables, table_keys = BaseSpecificEngine.get_bulk_tables(inspector, None)
+
+    assert table_keys == set(tables) == {(None, "orders"), (None, "customers")}
+    identifier, day, amount = tables[(None, "orders")]
+    assert [column["primary_key"] for column in (identifier, day, amount)] == [
+        True,
+        False,
+        False,
+    ]
+    assert (day["nullable"], amount["nullable"]) == (True, False)
+    assert day["column_spec"].is_dttm
+    assert tables[(None, "customers")][0]["default"] == "'anonymous'"
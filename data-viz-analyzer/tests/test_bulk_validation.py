@@ -0,0 +1,128 @@
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.commands.database import validate
+from app.commands.database.validate import BulkValidateDatabaseParametersCommand
+from app.errors import DataVizError, DataVizErrorType, ErrorLevel
+from app.main import app
+from app.routers import database as database_router
+
+
+def make_item(name: str, **kwargs) -> dict:
+    return {
+        "engine": "postgresql",
+        "driver": "psycopg2",
+        "parameters": {"host": name},
+        "extra": {},
+        **kwargs,
+    }
+
+
+class FakeSession:
+    def __init__(self) -> None:
+        self.open = False
+
+    async def __aenter__(self) -> "FakeSession":
+        self.open = True
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.open = False
+
+
+def test_bulk_check_streams_results_on_its_own_session(monkeypatch):
+    session = FakeSession()
+    monkeypatch.setattr(database_router, "AsyncSessionLocal", lambda: session)
+    in_flight, peaks, sessions = 0, [], []
+
+    async def find_by_ids(ids, db):
+        sessions.append((db, db.open))
+        return []
+
+    async def check(self, item, model=None):
+        nonlocal in_flight
+        in_flight += 1
+        peaks.append(in_flight)
+        sessions.append((self._db_context, self._db_context.open))
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        if item["parameters"]["host"] == "bad":
+            return [
+                DataVizError(
+                    message="Unreachable.",
+                    error_type=DataVizErrorType.CONNECTION_HOST_DOWN_ERROR,
+                    level=ErrorLevel.ERROR,
+                )
+            ]
+        return []
+
+    monkeypatch.setattr(validate.DbsDAO, "find_by_ids", find_by_ids)
+    monkeypatch.setattr(BulkValidateDatabaseParametersCommand, "_check", check)
+    items = [make_item("good"), make_item("bad"), make_item("gone", id=7)] + [
+        make_item("good") for _ in range(5)
+    ]
+
+    response = TestClient(app).post("/database/check/bulk?concurrency=2", json=items)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(line["index"] for line in lines) == list(range(len(items)))
+    errors = {line["index"]: line["errors"] for line in lines}
+    assert errors[1][0]["error_type"] == "CONNECTION_HOST_DOWN_ERROR"
+    assert errors[2][0]["error_type"] == "OBJECT_DOES_NOT_EXIST_ERROR"
+    assert all(not errors[index] for index in (0, 3, 4, 5, 6, 7))
+    assert max(peaks) == 2
+    # the session was open throughout the stream and closed after it
+    assert sessions and all(db is session and is_open for db, is_open in sessions)
+    assert not session.open
+
+
+async def collect(command) -> list:
+    return [result async for result in command.run()]
+
+
+def test_bulk_command_yields_in_completion_order(monkeypatch):
+    delays = {"slow": 0.05, "fast": 0}
+
+    async def check(self, item, model=None):
+        await asyncio.sleep(delays[item["parameters"]["host"]])
+        return []
+
+    monkeypatch.setattr(BulkValidateDatabaseParametersCommand, "_check", check)
+    command = BulkValidateDatabaseParametersCommand(
+        [make_item("slow"), make_item("fast")], concurrency=2
+    )
+
+    assert asyncio.run(collect(command)) == [(1, []), (0, [])]
+
+
+def test_bulk_command_reports_invalid_payloads(monkeypatch):
+    async def find_by_ids(ids, db):
+        assert ids == [7]
+        return []
+
+    monkeypatch.setattr(validate.DbsDAO, "find_by_ids", find_by_ids)
+    invalid = make_item("x")
+    del invalid["engine"]
+    command = BulkValidateDatabaseParametersCommand([invalid, make_item("gone", id=7)])
+
+    results = dict(asyncio.run(collect(command)))
+
+    assert [error.error_type for error in results[0]] == [
+        DataVizErrorType.CONNECTION_MISSING_PARAMETERS_ERROR
+    ]
+    assert results[0][0].extra["messages"] == {"engine": ["Missing data for required field."]}
+    assert [error.error_type for error in results[1]] == [
+        DataVizErrorType.OBJECT_DOES_NOT_EXIST_ERROR
+    ]
+
+
+def test_bulk_command_needs_a_positive_concurrency():
+    command = BulkValidateDatabaseParametersCommand([make_item("x")], concurrency=0)
+
+    with pytest.raises(ValueError):
+        asyncio.run(collect(command))
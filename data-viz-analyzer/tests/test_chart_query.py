@@ -0,0 +1,153 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy.dialects.postgresql.psycopg2 import PGDialect_psycopg2
+from sqlalchemy.dialects.sqlite.pysqlite import SQLiteDialect_pysqlite
+
+from app.engine_specifics.postgres import PostgresSpecificEngine
+from app.services.chart_query import ChartQuery, ChartQueryBuilder, Filter, Metric
+from app.utils.constants import TimeGrain
+
+START, END = datetime(2024, 1, 1), datetime(2024, 2, 1)
+
+
+@pytest.fixture
+def builder() -> ChartQueryBuilder:
+    return ChartQueryBuilder(PostgresSpecificEngine, PGDialect_psycopg2())
+
+
+def make_query(**kwargs) -> ChartQuery:
+    return ChartQuery(
+        **{
+            "table_name": "orders",
+            "temporal_column": "created_at",
+            "metrics": [Metric("SUM", "amount")],
+            "time_grain": TimeGrain.DAY,
+            **kwargs,
+        }
+    )
+
+
+def test_build_aggregates_by_time_grain(builder):
+    query = make_query(
+        schema="sales",
+        groupby=["country"],
+        metrics=[Metric("SUM", "amount"), Metric("COUNT", label="orders")],
+        time_range=(START, END),
+    )
+
+    assert builder.build(query) == "\n".join(
+        [
+            "SELECT DATE_TRUNC('day', created_at) AS __timestamp,",
+            "       country,",
+            '       SUM(amount) AS "SUM(amount)",',
+            "       COUNT(*) AS orders",
+            "FROM sales.orders",
+            "WHERE created_at >= TO_TIMESTAMP('2024-01-01 00:00:00.000000', "
+            "'YYYY-MM-DD HH24:MI:SS.US')",
+            "  AND created_at < TO_TIMESTAMP('2024-02-01 00:00:00.000000', "
+            "'YYYY-MM-DD HH24:MI:SS.US')",
+            "GROUP BY DATE_TRUNC('day', created_at), country",
+            "ORDER BY __timestamp",
+        ]
+    )
+
+
+def test_build_parameterized_binds_values(builder):
+    query = make_query(
+        filters=[Filter("country", "IN", ["FR", "DE"]), Filter("status", "==", "paid")],
+        time_range=(START, END),
+    )
+    sql, parameters = builder.build_parameterized(query)
+
+    assert "\x00" not in sql
+    assert "created_at >= CAST(%(param_0)s AS TIMESTAMP WITHOUT TIME ZONE)" in sql
+    assert "created_at < CAST(%(param_1)s AS TIMESTAMP WITHOUT TIME ZONE)" in sql
+    assert "country IN (%(param_2)s, %(param_3)s)" in sql
+    assert "status = %(param_4)s" in sql
+    assert parameters == {
+        "param_0": START,
+        "param_1": END,
+        "param_2": "FR",
+        "param_3": "DE",
+        "param_4": "paid",
+    }
+    # the same SQL for another time range, so the prepared plan is reused
+    assert builder.build_parameterized(make_query(
+        filters=query.filters, time_range=(datetime(2023, 1, 1), datetime(2023, 6, 1))
+    ))[0] == sql
+
+
+def test_percent_signs_are_escaped_once(builder):
+    query = make_query(
+        metrics=[Metric("SUM", "amount", label="share %")],
+        filters=[Filter("note", "LIKE", "%gift%")],
+        time_range=(START, None),
+    )
+    sql, parameters = builder.build_parameterized(query)
+
+    # the driver formats the statement and turns %% back into %
+    assert 'AS "share %%"' in sql
+    assert "note LIKE %(param_1)s" in sql
+    assert parameters["param_1"] == "%gift%"
+    # literals are run without parameters, nothing is formatted
+    literal_sql = builder.build(query)
+    assert 'AS "share %"' in literal_sql
+    assert "note LIKE '%gift%'" in literal_sql
+
+
+def test_positional_paramstyles_render_literals():
+    builder = ChartQueryBuilder(PostgresSpecificEngine, SQLiteDialect_pysqlite())
+    sql, parameters = builder.build_parameterized(
+        make_query(filters=[Filter("status", "==", "paid")])
+    )
+
+    assert parameters is None
+    assert "status = 'paid'" in sql
+
+
+def test_fill_gaps_joins_every_bucket(builder):
+    query = make_query(
+        metrics=[Metric("COUNT", label="orders"), Metric("SUM", "amount")],
+        groupby=["country"],
+        time_range=(START, END),
+        fill_gaps=True,
+    )
+    sql, parameters = builder.build_parameterized(query)
+
+    assert sql.startswith("WITH __buckets AS (\nSELECT DATE_TRUNC('day', created_at)")
+    assert (
+        "FROM GENERATE_SERIES(DATE_TRUNC('day', CAST(%(param_2)s AS TIMESTAMP WITHOUT "
+        "TIME ZONE)), CAST(%(param_3)s AS TIMESTAMP WITHOUT TIME ZONE), INTERVAL '1 day')"
+    ) in sql
+    assert "COALESCE(__buckets.orders, 0) AS orders" in sql
+    assert '__buckets."SUM(amount)"' in sql
+    assert "CROSS JOIN (SELECT DISTINCT country FROM __buckets) AS __dimensions" in sql
+    assert "WHERE __series.__timestamp < CAST(%(param_3)s AS TIMESTAMP WITHOUT TIME ZONE)" in sql
+    assert parameters == {"param_0": START, "param_1": END, "param_2": START, "param_3": END}
+
+
+@pytest.mark.parametrize(
+    "filter_, expected",
+    [
+        (Filter("country", "IN", []), "1 = 0"),
+        (Filter("country", "NOT IN", []), "1 = 1"),
+        (Filter("country", "is null"), "country IS NULL"),
+    ],
+)
+def test_filters_without_values(builder, filter_, expected):
+    assert expected in builder.build(make_query(filters=[filter_]))
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        make_query(metrics=[]),
+        make_query(metrics=[Metric("MEDIAN", "amount")]),
+        make_query(filters=[Filter("country", "BETWEEN", "A")]),
+        make_query(time_grain="P2W"),
+    ],
+)
+def test_invalid_queries_raise(builder, query):
+    with pytest.raises(ValueError):
+        builder.build(query)
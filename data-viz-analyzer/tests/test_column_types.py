@@ -0,0 +1,109 @@
+import re
+
+import pytest
+from sqlalchemy import types
+
+from app.engine_specifics.base import BaseSpecificEngine, ColumnTypeClassifier
+from app.engine_specifics.postgres import PostgresSpecificEngine
+from app.utils.core import GenericDataType
+
+NATIVE_TYPES = [
+    "INTEGER", "int", "BIGINT", "smallint", "NUMERIC(10, 2)", "decimal", "DOUBLE PRECISION",
+    "float", "REAL", "VARCHAR(255)", "character varying", "TEXT", "CHAR(3)", "BOOLEAN",
+    "DATE", "TIMESTAMP", "timestamp with time zone", "timestamptz", "TIME", "INTERVAL",
+    "jsonb", "json", "ARRAY", "uuid", "bytea", "unknown type", "",
+]
+
+
+def sequential_match(mappings, column_type):
+    for regex, sqla_type, generic_type in mappings:
+        if match := regex.match(column_type):
+            return (sqla_type(match) if callable(sqla_type) else sqla_type), generic_type
+    return None
+
+
+@pytest.mark.parametrize("engine_specific", [BaseSpecificEngine, PostgresSpecificEngine])
+def test_compiled_classifier_keeps_first_match_semantics(engine_specific):
+    classifier = engine_specific.get_column_type_classifier()
+    assert classifier._pattern is not None
+
+    for native_type in NATIVE_TYPES:
+        expected = sequential_match(classifier.mappings, native_type)
+        actual = classifier.match(native_type)
+        if expected is None:
+            assert actual is None, native_type
+        else:
+            assert type(actual[0]) is type(expected[0]), native_type
+            assert actual[1] == expected[1], native_type
+
+
+def test_flags_stay_scoped_to_their_pattern():
+    classifier = ColumnTypeClassifier(
+        (
+            (re.compile(r"^int$"), types.Integer(), GenericDataType.NUMERIC),
+            (re.compile(r"^text$", re.IGNORECASE), types.String(), GenericDataType.STRING),
+        )
+    )
+
+    assert classifier.match("TEXT")[1] == GenericDataType.STRING
+    assert classifier.match("INT") is None
+
+
+def test_unmergeable_patterns_fall_back_to_a_scan():
+    classifier = ColumnTypeClassifier(
+        ((re.compile(r"^(a)\1$"), types.String(), GenericDataType.STRING),)
+    )
+
+    assert classifier._pattern is None
+    assert classifier.match("aa")[1] == GenericDataType.STRING
+    assert classifier.match("ab") is None
+
+
+def test_callable_types_receive_the_match():
+    classifier = ColumnTypeClassifier(
+        (
+            (
+                re.compile(r"^varchar\((\d+)\)$"),
+                lambda match: types.String(int(match.group(1))),
+                GenericDataType.STRING,
+            ),
+        )
+    )
+
+    assert classifier.match("varchar(42)")[0].length == 42
+
+
+def test_column_specs_are_memoized_in_a_bounded_lru():
+    classifier = ColumnTypeClassifier(
+        ((re.compile(r"^int"), types.Integer(), GenericDataType.NUMERIC),), max_size=2
+    )
+    calls = []
+
+    def resolve(native_type):
+        calls.append(native_type)
+        return classifier.match(native_type)
+
+    first = classifier.get_column_spec("int", resolve)
+    assert classifier.get_column_spec("int", resolve) is first
+    classifier.get_column_spec("int4", resolve)
+    classifier.get_column_spec("int", resolve)
+    classifier.get_column_spec("int8", resolve)
+
+    assert list(classifier._specs) == ["int", "int8"]
+    assert calls == ["int", "int4", "int8"]
+    assert classifier.get_column_spec("nope", resolve) is None
+    assert first.is_dttm is False
+
+
+def test_classifier_follows_the_mappings_of_the_engine():
+    class CustomEngine(BaseSpecificEngine):
+        column_type_mappings = (
+            (re.compile(r"^INTEGER$"), types.String(), GenericDataType.STRING),
+        )
+
+    # engine mappings come before the defaults
+    assert CustomEngine.get_column_spec("INTEGER").generic_type == GenericDataType.STRING
+    assert BaseSpecificEngine.get_column_spec("INTEGER").generic_type == GenericDataType.NUMERIC
+
+    CustomEngine.column_type_mappings = ()
+    assert CustomEngine.get_column_spec("INTEGER").generic_type == GenericDataType.NUMERIC
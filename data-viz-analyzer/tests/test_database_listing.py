@@ -0,0 +1,106 @@
+import asyncio
+from datetime import time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.database import get_db_context
+from app.main import app
+from app.schemas.dbs import DBS
+
+
+@pytest.fixture
+def client(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'dbs.db'}")
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def setup():
+        async with engine.begin() as connection:
+            await connection.run_sync(DBS.__table__.create)
+        async with sessions() as session:
+            session.add_all(
+                DBS(
+                    name=name,
+                    sqlalchemy_uri=f"postgresql://dataviz@localhost/{name}",
+                    password="secret",
+                    created_at=time(),
+                    updated_at=time(),
+                )
+                for name in ("sales_eu", "sales_us", "sales%", "marketing", "finance")
+            )
+            await session.commit()
+
+    async def get_db():
+        async with sessions() as session:
+            yield session
+
+    asyncio.run(setup())
+    app.dependency_overrides[get_db_context] = get_db
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+    asyncio.run(engine.dispose())
+
+
+def test_pages_follow_the_id_keyset(client):
+    first = client.get("/database?limit=2&fields=name").json()
+    second = client.get(f"/database?limit=2&fields=name&after={first['next_after']}").json()
+    last = client.get(f"/database?limit=2&fields=name&after={second['next_after']}").json()
+
+    assert first["data"] == [{"name": "sales_eu"}, {"name": "sales_us"}]
+    assert second["data"] == [{"name": "sales%"}, {"name": "marketing"}]
+    assert last["data"] == [{"name": "finance"}]
+    assert (first["next_after"], second["next_after"], last["next_after"]) == (2, 4, None)
+
+
+def test_listing_never_returns_secrets(client):
+    rows = client.get("/database").json()["data"]
+
+    assert "password" not in rows[0]
+    assert {"id", "uuid", "name", "sqlalchemy_uri"} <= set(rows[0])
+
+
+def test_unknown_fields_are_rejected(client):
+    response = client.get("/database?fields=name,password")
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Unknown fields: password"
+
+
+def test_name_prefix_is_matched_literally(client):
+    names = lambda prefix: [
+        row["name"]
+        for row in client.get("/database", params={"name_prefix": prefix}).json()["data"]
+    ]
+
+    assert names("sales") == ["sales_eu", "sales_us", "sales%"]
+    assert names("sales%") == ["sales%"]
+    assert names("sales_") == ["sales_eu", "sales_us"]
+
+
+def test_unchanged_listing_is_not_modified(client):
+    etag = client.get("/database?limit=2").headers["ETag"]
+
+    assert client.get("/database?limit=2", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get(
+        "/database?limit=2", headers={"If-None-Match": f'"other", W/{etag}'}
+    ).status_code == 304
+    assert client.get("/database?limit=2", headers={"If-None-Match": "*"}).status_code == 304
+    assert client.get("/database?limit=3").headers["ETag"] != etag
+
+
+def test_changes_invalidate_the_etag(client):
+    etag = client.get("/database").headers["ETag"]
+
+    async def delete():
+        async for session in app.dependency_overrides[get_db_context]():
+            database = await session.get(DBS, 5)
+            await session.delete(database)
+            await session.commit()
+
+    asyncio.run(delete())
+    response = client.get("/database", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert len(response.json()["data"]) == 4
@@ -0,0 +1,76 @@
+from datetime import time
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.schemas import dbs as dbs_module
+from app.schemas.dbs import DBS
+
+
+@pytest.fixture
+def released(monkeypatch) -> list:
+    released = []
+    monkeypatch.setattr(
+        dbs_module.engine_manager, "dispose", lambda uuid: released.append(("engine", uuid))
+    )
+    monkeypatch.setattr(
+        dbs_module.metadata_cache, "invalidate", lambda uuid: released.append(("metadata", uuid))
+    )
+    return released
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    DBS.__table__.create(engine)
+    with Session(engine) as session:
+        yield session
+
+
+@pytest.fixture
+def database(session) -> DBS:
+    database = DBS(
+        name="examples",
+        sqlalchemy_uri="postgresql://dataviz@localhost/examples",
+        created_at=time(),
+        updated_at=time(),
+    )
+    session.add(database)
+    session.commit()
+    return database
+
+
+def test_connection_changes_release_the_database_once_committed(session, database, released):
+    database.password = "secret"
+    session.flush()
+    assert released == []
+
+    session.commit()
+
+    assert released == [("metadata", database.uuid), ("engine", database.uuid)]
+
+
+def test_other_changes_keep_the_pool(session, database, released):
+    database.name = "renamed"
+    database.impersonate_user = True
+    session.commit()
+
+    assert released == []
+
+
+def test_rolled_back_changes_keep_the_pool(session, database, released):
+    database.sqlalchemy_uri = "postgresql://dataviz@elsewhere/examples"
+    session.flush()
+    session.rollback()
+    session.commit()
+
+    assert released == []
+
+
+def test_deletes_release_the_database(session, database, released):
+    database_uuid = database.uuid
+    session.delete(database)
+    session.commit()
+
+    assert released == [("metadata", database_uuid), ("engine", database_uuid)]
@@ -0,0 +1,152 @@
+import os
+import time
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from pathlib import Path
+from uuid import UUID
+
+import pytest
+
+from app.engine_specifics.base import BaseSpecificEngine
+from app.engine_specifics.postgres import PostgresSpecificEngine
+from app.result_set import ColumnarResultSet
+from app.services import disk_cache
+from app.services.disk_cache import DiskResultCache
+
+
+def build(description, *columns, engine_specific=BaseSpecificEngine) -> ColumnarResultSet:
+    description = [(name, type_code, None, None, None, None, True) for name, type_code in description]
+    return ColumnarResultSet.from_batches(description, [list(columns)], engine_specific)
+
+
+def make_result(rows: int = 3) -> ColumnarResultSet:
+    return build(
+        [("id", "INTEGER"), ("name", "VARCHAR"), ("price", "NUMERIC")],
+        list(range(rows)),
+        [f"name {index % 2}" for index in range(rows)],
+        [Decimal(index) for index in range(rows)],
+    )
+
+
+def test_round_trip_keeps_values_and_types(tmp_path):
+    cache = DiskResultCache(tmp_path, 1 << 20)
+    result = build(
+        [("id", "INTEGER"), ("name", "VARCHAR"), ("day", "DATE"), ("created_at", 1184)],
+        [1, None, 3],
+        ["a", "b", None],
+        [date(2024, 1, 1), None, date(2024, 1, 3)],
+        [datetime(2024, 1, 1, tzinfo=timezone.utc), None, None],
+        engine_specific=PostgresSpecificEngine,
+    )
+    cache.set("key", result, 60)
+
+    cached = cache.get("key")
+
+    assert cached.column_names == result.column_names
+    assert cached.to_rows() == result.to_rows()
+    assert [column.generic_type for column in cached.columns] == [
+        column.generic_type for column in result.columns
+    ]
+    assert cached.column("created_at").tz_aware
+
+
+def test_object_values_are_tagged(tmp_path):
+    cache = DiskResultCache(tmp_path, 1 << 20)
+    values = [
+        Decimal("1.10"),
+        UUID(int=1),
+        b"\x00\x01",
+        {"a": [1, date(2024, 1, 1)]},
+        datetime(2024, 1, 1, 12, tzinfo=timezone.utc),
+    ]
+    result = build([("value", None)], values)
+    cache.set("key", result, 60)
+
+    assert cache.get("key").column("value").to_list() == values
+
+
+def test_fixed_width_columns_are_mapped_not_copied(tmp_path):
+    cache = DiskResultCache(tmp_path, 1 << 20)
+    cache.set("key", make_result(), 60)
+
+    values = cache.get("key").column("id").values
+
+    assert not values.flags.writeable
+    assert values.ctypes.data % disk_cache.ALIGNMENT == 0
+
+
+def test_expired_and_corrupt_entries_are_dropped(tmp_path):
+    cache = DiskResultCache(tmp_path, 1 << 20)
+    cache.set("expired", make_result(), 60)
+    cache.set("corrupt", make_result(), 60)
+    with open(cache._path("corrupt"), "r+b") as f:
+        f.write(b"GARBAGE!")
+    now = time.time()
+
+    assert cache.get("corrupt") is None
+    assert not cache._path("corrupt").exists()
+    cache._path("expired").touch()
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(disk_cache.time, "time", lambda: now + 61)
+        assert cache.get("expired") is None
+    assert not cache._path("expired").exists()
+    assert int(cache._size_path.read_text()) == 0
+
+
+def test_evicts_least_recently_used_files_once_full(tmp_path):
+    cache = DiskResultCache(tmp_path, 1 << 20)
+    cache.set("probe", make_result(), 60)
+    size = cache._path("probe").stat().st_size
+    cache.delete("probe")
+    cache.max_bytes = 3 * size
+    for index, key in enumerate(("a", "b", "c")):
+        cache.set(key, make_result(), 60)
+        os.utime(cache._path(key), (index, index))
+    cache.get("a")
+
+    cache.set("d", make_result(), 60)
+
+    # down to 90% of the limit, not just under it
+    assert sorted(path.stem for path in tmp_path.glob("*.dvrs")) == ["a", "d"]
+    assert int(cache._size_path.read_text()) == 2 * size
+
+
+def test_writes_under_the_limit_do_not_scan_the_directory(monkeypatch, tmp_path):
+    cache = DiskResultCache(tmp_path, 1 << 20)
+    cache.set("first", make_result(), 60)
+    scans = []
+    glob = Path.glob
+
+    def counting_glob(self, pattern):
+        scans.append(pattern)
+        return glob(self, pattern)
+
+    monkeypatch.setattr(Path, "glob", counting_glob)
+    for index in range(10):
+        cache.set(f"key {index}", make_result(), 60)
+    cache.set("first", make_result(10), 60)
+
+    assert scans == []
+    assert int(cache._size_path.read_text()) == sum(
+        path.stat().st_size for path in tmp_path.glob("*.dvrs")
+    )
+
+
+def test_lost_size_is_recounted(tmp_path):
+    cache = DiskResultCache(tmp_path, 1 << 20)
+    cache.set("a", make_result(), 60)
+    cache._size_path.write_text("garbage")
+
+    cache.set("b", make_result(), 60)
+
+    assert int(cache._size_path.read_text()) == sum(
+        path.stat().st_size for path in tmp_path.glob("*.dvrs")
+    )
+
+
+def test_refuses_directories_of_other_users(monkeypatch, tmp_path):
+    uid = os.getuid()
+    monkeypatch.setattr(disk_cache.os, "getuid", lambda: uid + 1)
+
+    with pytest.raises(PermissionError):
+        DiskResultCache(tmp_path, 1 << 20)
@@ -0,0 +1,115 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app.engine_specifics.base import BaseSpecificEngine
+from app.result_set import ColumnarResultSet
+from app.utils.downsampling import downsample, lttb_indices, min_max_indices
+
+START = datetime(2024, 1, 1)
+
+
+def reference_lttb(x, y, threshold):
+    every = (len(x) - 2) / (threshold - 2)
+    selected, indices = 0, [0]
+    for bucket in range(threshold - 2):
+        start, end = int(bucket * every) + 1, int((bucket + 1) * every) + 1
+        next_end = min(int((bucket + 2) * every) + 1, len(x))
+        next_x, next_y = np.mean(x[end:next_end]), np.mean(y[end:next_end])
+        areas = [
+            abs(
+                (x[selected] - next_x) * (y[index] - y[selected])
+                - (x[selected] - x[index]) * (next_y - y[selected])
+            )
+            for index in range(start, end)
+        ]
+        selected = start + int(np.argmax(areas))
+        indices.append(selected)
+    return indices + [len(x) - 1]
+
+
+@pytest.mark.parametrize("length, threshold", [(100, 10), (1000, 37), (57, 56)])
+def test_lttb_matches_the_reference(length, threshold):
+    rng = np.random.default_rng(length)
+    x = np.sort(rng.uniform(0, 1000, length))
+    y = rng.normal(size=length).cumsum()
+
+    indices = lttb_indices(x, y, threshold)
+
+    assert indices.tolist() == reference_lttb(x, y, threshold)
+
+
+def test_small_series_are_kept():
+    x = y = np.arange(10, dtype=np.float64)
+
+    assert lttb_indices(x, y, 10).tolist() == list(range(10))
+    assert lttb_indices(x, y, 2).tolist() == list(range(10))
+    assert min_max_indices(x, y, 20).tolist() == list(range(10))
+
+
+def test_min_max_keeps_every_spike():
+    x = np.arange(1000, dtype=np.float64)
+    y = np.zeros(1000)
+    y[[123, 777]] = 50
+    y[500] = -50
+
+    indices = min_max_indices(x, y, 20)
+
+    assert {0, 123, 500, 777, 999} <= set(indices.tolist())
+    assert len(indices) <= 20 + 2
+    assert np.all(np.diff(indices) > 0)
+
+
+def build(timestamps, values, hosts=None) -> ColumnarResultSet:
+    description = [("ts", "TIMESTAMP"), ("value", "FLOAT")]
+    columns = [timestamps, values]
+    if hosts is not None:
+        description.append(("host", "VARCHAR"))
+        columns.append(hosts)
+    return ColumnarResultSet.from_batches(
+        [(name, type_code, None, None, None, None, True) for name, type_code in description],
+        [columns],
+        BaseSpecificEngine,
+    )
+
+
+def test_each_series_is_downsampled_on_its_own():
+    count = 400
+    result = build(
+        [START + timedelta(minutes=index // 2) for index in range(count)],
+        [float(index % 11) for index in range(count)],
+        ["a" if index % 2 else "b" for index in range(count)],
+    )
+
+    downsampled = downsample(result, 10, ["value"])
+    hosts = downsampled.column("host").to_list()
+
+    assert hosts.count("a") == hosts.count("b") == 10
+    # the rows keep their order
+    timestamps = downsampled.column("ts").to_list()
+    assert timestamps == sorted(timestamps)
+
+
+def test_rows_without_timestamp_or_metric_are_not_plotted():
+    count = 100
+    timestamps = [START + timedelta(minutes=index) for index in range(count)]
+    values = [float(index) for index in range(count)]
+    timestamps[50] = None
+    values[10] = None
+
+    downsampled = downsample(build(timestamps, values), 10, ["value"])
+    kept = downsampled.column("value").to_list()
+
+    # rows without a timestamp are kept as is, rows without a value skipped
+    assert 50.0 in kept and None not in kept
+    assert len(kept) == 11
+
+
+def test_results_that_cant_be_downsampled_are_returned_as_is():
+    result = build([START + timedelta(minutes=index) for index in range(100)], [1.0] * 100)
+
+    assert downsample(result, 200, ["value"]) is result
+    assert downsample(result, 10, ["other"]) is result
+    with pytest.raises(ValueError):
+        downsample(result, 10, ["value"], method="average")
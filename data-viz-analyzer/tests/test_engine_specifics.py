@@ -0,0 +1,53 @@
+import pytest
+
+import app.engine_specifics as engine_specifics
+from app.engine_specifics import (
+    get_engine_specific,
+    get_engine_specifics,
+    reload_engine_specifics,
+)
+from app.engine_specifics.base import BaseSpecificEngine
+from app.engine_specifics.postgres import PostgresSpecificEngine
+
+
+@pytest.fixture(autouse=True)
+def registry():
+    reload_engine_specifics()
+    yield
+    reload_engine_specifics()
+
+
+def test_registry_is_loaded_once():
+    assert get_engine_specifics() is get_engine_specifics()
+    assert PostgresSpecificEngine in get_engine_specifics()
+
+
+def test_lookup_by_backend_alias_and_driver():
+    assert get_engine_specific("postgresql", "psycopg2") is PostgresSpecificEngine
+    assert get_engine_specific("postgres") is PostgresSpecificEngine
+    assert engine_specifics._lookup_index[("postgresql", "psycopg2")] is PostgresSpecificEngine
+
+
+def test_unknown_backends_fall_back_without_being_indexed():
+    for index in range(100):
+        assert get_engine_specific(f"unknown{index}", "driver") is BaseSpecificEngine
+
+    assert not any(key[0].startswith("unknown") for key in engine_specifics._lookup_index)
+
+
+def test_lookup_index_is_bounded(monkeypatch):
+    monkeypatch.setattr(engine_specifics, "_LOOKUP_INDEX_MAX_SIZE", 10)
+
+    for index in range(100):
+        get_engine_specific("postgresql", f"driver{index}")
+
+    assert len(engine_specifics._lookup_index) == 10
+    assert get_engine_specific("postgresql", "driver99") is PostgresSpecificEngine
+
+
+def test_reload_clears_the_lookup_index():
+    get_engine_specific("postgresql", "psycopg2")
+
+    reload_engine_specifics()
+
+    assert engine_specifics._lookup_index == {}
@@ -0,0 +1,152 @@
+import numpy as np
+from sqlalchemy import types
+
+from app.engine_specifics.base import BaseSpecificEngine, LimitMethod
+from app.engine_specifics.postgres import PostgresSpecificEngine
+
+
+class FakeCursor:
+    def __init__(self, description, rows) -> None:
+        self.description = [
+            (name, type_code, None, None, None, None, True) for name, type_code in description
+        ]
+        self.rows = list(rows)
+        self.arraysize = 1
+        self.fetches = []
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def fetchmany(self, size):
+        self.fetches.append(size)
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+
+class MutatingEngine(BaseSpecificEngine):
+    engine = "mutating"
+    column_type_mutators = {
+        types.String: lambda value: value.upper() if value is not None else None,
+        types.Integer: lambda value: -value,
+    }
+    columnar_type_mutators = {
+        types.Integer: lambda column: np.asarray(column) * 10,
+    }
+
+
+def test_columnar_mutators_take_precedence():
+    mutators = MutatingEngine.get_column_mutators(
+        [("id", "INTEGER"), ("name", "VARCHAR"), ("day", "DATE")]
+    )
+
+    assert [(idx, columnar) for idx, _, columnar in mutators] == [(0, True), (1, False)]
+
+
+def test_fetch_data_mutates_whole_columns():
+    cursor = FakeCursor(
+        [("id", "INTEGER"), ("name", "VARCHAR")], [(1, "a"), (2, None), (3, "c")]
+    )
+
+    assert MutatingEngine.fetch_data(cursor) == [(10, "A"), (20, None), (30, "C")]
+
+
+def test_mutate_rows_only_rebuilds_the_target_columns():
+    rows = [(index, f"name {index}", 1.5, None, True, "x") for index in range(3)]
+    mutators = [(1, lambda column: [value.upper() for value in column], True)]
+
+    mutated = BaseSpecificEngine.mutate_rows(rows, mutators)
+
+    assert mutated == [
+        (index, f"NAME {index}", 1.5, None, True, "x") for index in range(3)
+    ]
+    assert all(type(row) is tuple for row in mutated)
+
+
+def test_mutate_rows_transposes_mostly_mutated_rows():
+    rows = [(1, "a"), (2, "b")]
+    mutators = [
+        (0, lambda column: np.asarray(column) + 1, True),
+        (1, str.upper, False),
+    ]
+
+    assert BaseSpecificEngine.mutate_rows(rows, mutators) == [(2, "A"), (3, "B")]
+
+
+def test_fetch_data_columns_never_builds_rows():
+    cursor = FakeCursor([("id", "INTEGER"), ("name", "VARCHAR")], [(1, "a"), (2, "b")])
+
+    ids, names = MutatingEngine.fetch_data_columns(cursor)
+
+    assert list(ids) == [10, 20]
+    assert names == ["A", "B"]
+
+
+def test_fetch_many_limit_method_fetches_the_limit():
+    class FetchManyEngine(BaseSpecificEngine):
+        limit_method = LimitMethod.FETCH_MANY
+
+    cursor = FakeCursor([("id", "INTEGER")], [(index,) for index in range(10)])
+
+    assert FetchManyEngine.fetch_data(cursor, 3) == [(0,), (1,), (2,)]
+
+
+class StreamingCursor(FakeCursor):
+    """A server-side cursor: the description is only known once fetched."""
+
+    def __init__(self, description, rows) -> None:
+        super().__init__(description, rows)
+        self.name = "dataviz_stream_test"
+        self._description = self.description
+        self.description = None
+
+    def fetchmany(self, size):
+        self.description = self._description
+        return super().fetchmany(size)
+
+
+class StreamingEngine(MutatingEngine):
+    stream_batch_size = 2
+    columnar_type_mutators = {}
+
+
+def test_iter_data_streams_mutated_batches():
+    cursor = StreamingCursor(
+        [("id", "INTEGER"), ("name", "VARCHAR")], [(index, "a") for index in range(5)]
+    )
+
+    batches = list(StreamingEngine.iter_data(cursor))
+
+    assert batches == [[(0, "A"), (-1, "A")], [(-2, "A"), (-3, "A")], [(-4, "A")]]
+    assert cursor.fetches == [2, 2, 2, 2]
+
+
+def test_fetch_batches_stops_at_the_limit():
+    cursor = FakeCursor([("id", "INTEGER")], [(index,) for index in range(10)])
+
+    batches = list(StreamingEngine.fetch_batches(cursor, limit=3))
+
+    assert batches == [[(0,), (1,)], [(2,)]]
+    assert cursor.fetches == [2, 1]
+
+
+def test_postgres_streams_through_named_cursors():
+    class Connection:
+        def cursor(self, name=None):
+            cursor = FakeCursor([], [])
+            cursor.name = name
+            return cursor
+
+    cursor = PostgresSpecificEngine.create_stream_cursor(Connection())
+
+    assert cursor.name.startswith(PostgresSpecificEngine.stream_cursor_prefix)
+    assert cursor.itersize == PostgresSpecificEngine.get_stream_batch_size()
+
+
+def test_postgres_skips_fetching_statements_without_rows():
+    cursor = FakeCursor([], [])
+    cursor.description = None
+    cursor.name = None
+
+    assert list(PostgresSpecificEngine.fetch_batches(cursor)) == []
+    assert cursor.fetches == []
@@ -0,0 +1,164 @@
+import threading
+import uuid
+
+import pytest
+
+from app.engine_specifics.base import BaseSpecificEngine
+from app.result_set import ColumnarResultSet
+from app.schemas.dbs import DBS
+from app.services import jobs
+from app.services.jobs import JobManager
+from app.services.result_cache import QueryResultCache
+from app.utils.constants import QueryJobStatus
+
+DESCRIPTION = [("id", "INTEGER", None, None, None, None, True)]
+
+
+def make_result(count: int = 3) -> ColumnarResultSet:
+    return ColumnarResultSet.from_batches(
+        DESCRIPTION, [[list(range(count))]], BaseSpecificEngine
+    )
+
+
+class FakeCanceller:
+    def __init__(self, cancelled: threading.Event) -> None:
+        self.cancelled = cancelled
+
+    def cancel(self) -> bool:
+        self.cancelled.set()
+        return True
+
+
+@pytest.fixture
+def database() -> DBS:
+    return DBS(name="examples", sqlalchemy_uri="postgresql://localhost/examples", uuid=uuid.uuid4())
+
+
+@pytest.fixture
+def result_cache(monkeypatch) -> QueryResultCache:
+    cache = QueryResultCache(max_bytes=1024 * 1024)
+    monkeypatch.setattr(jobs, "result_cache", cache)
+    return cache
+
+
+def wait(job: jobs.QueryJob) -> None:
+    if job.future is not None:
+        job.future.result(timeout=5)
+
+
+def test_submit_runs_the_query_and_keeps_its_result(monkeypatch, database, result_cache):
+    calls = []
+
+    def execute_query(database, sql, parameters, limit, **kwargs):
+        calls.append((sql, parameters, limit))
+        return make_result()
+
+    monkeypatch.setattr(jobs, "execute_query", execute_query)
+    manager = JobManager(max_workers=1)
+    job = manager.submit(database, "SELECT id FROM t WHERE id > %(id)s", {"id": 0}, 10)
+    wait(job)
+
+    assert calls == [("SELECT id FROM t WHERE id > %(id)s", {"id": 0}, 10)]
+    assert manager.get(job.id) is job
+    assert job.status == QueryJobStatus.SUCCESS
+    assert job.to_dict()["row_count"] == 3
+    assert manager.get_result(job).column("id").to_list() == [0, 1, 2]
+    assert result_cache.get(job.cache_key) is manager.get_result(job)
+
+
+def test_result_outlives_the_result_cache(monkeypatch, database):
+    # results bigger than the cache, or with caching disabled, aren't cached
+    monkeypatch.setattr(jobs, "result_cache", QueryResultCache(max_bytes=0))
+    monkeypatch.setattr(jobs, "execute_query", lambda *args, **kwargs: make_result())
+    manager = JobManager(max_workers=1)
+    job = manager.submit(database, "SELECT id FROM t")
+    wait(job)
+
+    assert jobs.result_cache.get(job.cache_key) is None
+    assert manager.get_result(job).column("id").to_list() == [0, 1, 2]
+
+
+def test_cached_results_finish_jobs_immediately(monkeypatch, database, result_cache):
+    def execute_query(*args, **kwargs):
+        raise AssertionError("the cached result should be used")
+
+    monkeypatch.setattr(jobs, "execute_query", execute_query)
+    cached = make_result()
+    result_cache.set(result_cache.make_key(database.uuid, "SELECT id FROM t"), cached, 60)
+    manager = JobManager(max_workers=1)
+    job = manager.submit(database, "SELECT id FROM t")
+
+    assert job.future is None
+    assert job.status == QueryJobStatus.SUCCESS
+    assert manager.get_result(job) is cached
+
+
+def test_failed_jobs_report_the_error(monkeypatch, database, result_cache):
+    def execute_query(*args, **kwargs):
+        raise ValueError("relation t does not exist")
+
+    monkeypatch.setattr(jobs, "execute_query", execute_query)
+    manager = JobManager(max_workers=1)
+    job = manager.submit(database, "SELECT id FROM t")
+    wait(job)
+
+    assert job.status == QueryJobStatus.FAILED
+    assert job.error == "relation t does not exist"
+    assert manager.get_result(job) is None
+
+
+def test_cancel_running_job(monkeypatch, database, result_cache):
+    started, cancelled = threading.Event(), threading.Event()
+
+    def execute_query(database, sql, parameters, limit, on_canceller, timeout):
+        on_canceller(FakeCanceller(cancelled))
+        started.set()
+        assert cancelled.wait(5)
+        raise RuntimeError("canceling statement due to user request")
+
+    monkeypatch.setattr(jobs, "execute_query", execute_query)
+    manager = JobManager(max_workers=1)
+    job = manager.submit(database, "SELECT pg_sleep(60)")
+    assert started.wait(5)
+    manager.cancel(job.id)
+    wait(job)
+
+    assert job.status == QueryJobStatus.CANCELLED
+    assert job.error is None
+    assert job.canceller is None
+    assert manager.get_result(job) is None
+
+
+def test_cancel_pending_job(monkeypatch, database, result_cache):
+    release = threading.Event()
+    calls = []
+
+    def execute_query(database, sql, *args, **kwargs):
+        calls.append(sql)
+        assert release.wait(5)
+        return make_result()
+
+    monkeypatch.setattr(jobs, "execute_query", execute_query)
+    manager = JobManager(max_workers=1)
+    running = manager.submit(database, "SELECT 1")
+    pending = manager.submit(database, "SELECT 2")
+    manager.cancel(pending.id)
+    release.set()
+    wait(running)
+
+    assert pending.status == QueryJobStatus.CANCELLED
+    assert running.status == QueryJobStatus.SUCCESS
+    assert calls == ["SELECT 1"]
+
+
+def test_history_forgets_the_oldest_finished_jobs(monkeypatch, database, result_cache):
+    monkeypatch.setattr(jobs, "execute_query", lambda *args, **kwargs: make_result())
+    manager = JobManager(max_workers=1, history_size=2)
+    submitted = []
+    for index in range(3):
+        submitted.append(job := manager.submit(database, f"SELECT {index}"))
+        wait(job)
+
+    assert manager.get(submitted[0].id) is None
+    assert [manager.get(job.id) for job in submitted[1:]] == submitted[1:]
+    assert manager.stats()[QueryJobStatus.SUCCESS] == 2
@@ -0,0 +1,169 @@
+import json
+import sqlite3
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.database import get_db_context
+from app.engine_specifics.postgres import PostgresSpecificEngine
+from app.main import app
+from app.routers import database as database_router
+from app.schemas.dbs import DBS
+from app.services.metadata_cache import COLUMN_LEVEL, TABLE_LEVEL, MetadataCache
+
+
+def make_database(path, **timeouts) -> DBS:
+    return DBS(
+        name="examples",
+        sqlalchemy_uri=f"sqlite:///{path}",
+        uuid=uuid.uuid4(),
+        extra=json.dumps({"metadata_cache_timeout": timeouts}),
+    )
+
+
+@pytest.fixture
+def database(tmp_path) -> DBS:
+    path = tmp_path / "examples.db"
+    with sqlite3.connect(path) as connection:
+        connection.executescript(
+            """
+            CREATE TABLE orders (id INTEGER PRIMARY KEY, amount FLOAT);
+            CREATE TABLE customers (id INTEGER PRIMARY KEY, name TEXT);
+            CREATE VIEW big_orders AS SELECT * FROM orders WHERE amount > 100;
+            """
+        )
+    return make_database(path)
+
+
+def test_schema_columns_seed_tables_and_columns(database):
+    cache = MetadataCache()
+
+    tables = cache.get_schema_columns(database, None)
+
+    assert sorted(tables) == ["customers", "orders"]
+    assert cache.get_table_names(database, None) == ["customers", "orders"]
+    assert [column["name"] for column in cache.get_columns(database, "orders", None)] == [
+        "id",
+        "amount",
+    ]
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["hits"] == 2
+
+
+def test_seeded_entries_keep_the_ttl_of_their_level(tmp_path, database):
+    database.extra = json.dumps(
+        {"metadata_cache_timeout": {"table_cache_timeout": 10, "column_cache_timeout": 1000}}
+    )
+    cache = MetadataCache()
+
+    cache.get_schema_columns(database, None)
+
+    tables = cache._entries[(database.uuid, TABLE_LEVEL, None)]
+    columns = cache._entries[(database.uuid, COLUMN_LEVEL, None, "orders")]
+    assert columns.expires_at - tables.expires_at == pytest.approx(990, abs=1)
+
+
+def test_levels_without_ttl_are_not_seeded(database):
+    database.extra = json.dumps({"metadata_cache_timeout": {"table_cache_timeout": 0}})
+    cache = MetadataCache()
+
+    cache.get_schema_columns(database, None)
+
+    assert (database.uuid, TABLE_LEVEL, None) not in cache._entries
+    assert (database.uuid, COLUMN_LEVEL, None, "orders") in cache._entries
+
+
+def test_postgres_bulk_tables_leave_out_views():
+    rows = [
+        ("public", "orders", "r", "id", "integer", False, None),
+        ("public", "events", "p", "id", "integer", False, None),
+        ("public", "big_orders", "v", "id", "integer", True, None),
+        ("public", "daily", "m", "day", "date", True, None),
+        ("public", "remote", "f", None, None, None, None),
+    ]
+
+    class Result:
+        def __init__(self, rows):
+            self.rows = rows
+
+        def tuples(self):
+            return self.rows
+
+        def all(self):
+            return self.rows
+
+    class Connection:
+        def execute(self, statement, params):
+            if "contype" in str(statement):
+                return Result([("public", "orders", "id")])
+            return Result(rows)
+
+    class Inspector:
+        bind = Connection()
+
+    tables, table_keys = PostgresSpecificEngine.get_bulk_tables(Inspector(), "public")
+
+    assert set(tables) == {
+        ("public", name) for name in ("orders", "events", "big_orders", "daily", "remote")
+    }
+    assert table_keys == {("public", "orders"), ("public", "events")}
+    assert tables[("public", "orders")][0]["primary_key"]
+    assert tables[("public", "remote")] == []
+
+
+def test_fingerprint_change_drops_entries(tmp_path, database):
+    cache = MetadataCache()
+    cache.get_table_names(database, None)
+
+    other = tmp_path / "other.db"
+    sqlite3.connect(other).execute("CREATE TABLE payments (id INTEGER)").connection.close()
+    database.sqlalchemy_uri = f"sqlite:///{other}"
+
+    assert cache.get_table_names(database, None) == ["payments"]
+    assert cache.stats()["misses"] == 2
+
+
+@pytest.fixture
+def client(monkeypatch, database):
+    cache = MetadataCache()
+    monkeypatch.setattr(database_router, "metadata_cache", cache)
+
+    async def find_by_id(pk, db):
+        return database if pk == 1 else None
+
+    async def get_db():
+        yield None
+
+    monkeypatch.setattr(database_router.DbsDAO, "find_by_id", find_by_id)
+    app.dependency_overrides[get_db_context] = get_db
+    yield TestClient(app), cache
+    app.dependency_overrides.clear()
+
+
+def test_metadata_endpoints_go_through_the_cache(client):
+    client, cache = client
+
+    response = client.get("/database/1/schemas/main/columns")
+    assert response.status_code == 200
+    assert response.json()["data"]["orders"][0] == {
+        "name": "id",
+        "type": "INTEGER",
+        "nullable": True,
+        "default": None,
+        "primary_key": True,
+        "generic_type": 0,
+        "is_dttm": False,
+    }
+    misses = cache.stats()["misses"]
+
+    assert client.get("/database/1/schemas/main/tables").json()["data"] == [
+        "customers",
+        "orders",
+    ]
+    response = client.get("/database/1/schemas/main/tables/orders/columns")
+    assert [column["name"] for column in response.json()["data"]] == ["id", "amount"]
+    assert cache.stats()["misses"] == misses
+
+    assert client.get("/database/1/schemas").json()["data"] == ["main"]
+    assert client.get("/database/2/schemas").status_code == 404
@@ -0,0 +1,82 @@
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.utils import metrics
+from app.utils.metrics import CallbackGauge, Counter, Histogram
+
+
+@pytest.fixture
+def register():
+    registered = []
+
+    def register(metric):
+        registered.append(metric)
+        return metric
+
+    yield register
+    for metric in registered:
+        metrics._registry.remove(metric)
+
+
+def test_counter_sums_the_shards_of_every_thread(register):
+    counter = register(Counter("test_rows_total", 'Rows "read".', ("engine",)))
+
+    def work():
+        for _ in range(1000):
+            counter.inc(1, "postgresql")
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    counter.inc(0.5, "sqlite")
+
+    assert counter.expose().splitlines() == [
+        '# HELP test_rows_total Rows \\"read\\".',
+        "# TYPE test_rows_total counter",
+        'test_rows_total{engine="postgresql"} 4000',
+        'test_rows_total{engine="sqlite"} 0.5',
+    ]
+
+
+def test_histogram_buckets_are_cumulative(register):
+    histogram = register(Histogram("test_duration_seconds", "Duration.", buckets=(1, 0.1)))
+    for value in (0.05, 0.1, 0.5, 3):
+        histogram.observe(value)
+
+    assert histogram.expose().splitlines()[2:] == [
+        'test_duration_seconds_bucket{le="0.1"} 2',
+        'test_duration_seconds_bucket{le="1"} 3',
+        'test_duration_seconds_bucket{le="+Inf"} 4',
+        "test_duration_seconds_sum 3.65",
+        "test_duration_seconds_count 4",
+    ]
+
+
+def test_callback_gauges_are_read_on_scrape(register):
+    sizes = {("a",): 1}
+    register(CallbackGauge("test_pool_size", "Pool size.", ("pool",), lambda: dict(sizes)))
+    sizes[("b",)] = 2
+
+    body = metrics.generate_latest()
+
+    assert 'test_pool_size{pool="a"} 1\ntest_pool_size{pool="b"} 2\n' in body
+
+
+def test_requests_are_timed_by_route():
+    client = TestClient(app)
+    client.get("/nowhere")
+    client.get("/metrics")
+
+    response = client.get("/metrics")
+
+    assert response.headers["content-type"] == "text/plain; version=0.0.4; charset=utf-8"
+    assert (
+        'dataviz_http_request_duration_seconds_count{method="GET",route="/metrics",status="200"}'
+        in response.text
+    )
+    assert 'route="unmatched",status="404"' in response.text
@@ -0,0 +1,89 @@
+import asyncio
+import socket
+import time
+
+import pytest
+
+from app.utils import network
+from app.utils.network import TTLCache
+
+
+@pytest.fixture(autouse=True)
+def clear_probe_cache():
+    network.probe_cache.clear()
+    yield
+    network.probe_cache.clear()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [time.monotonic()]
+    monkeypatch.setattr(network.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_ttl_depends_on_the_value(clock):
+    cache = TTLCache(maxsize=10, positive_ttl=60, negative_ttl=5)
+    cache.set("up", True)
+    cache.set("down", False)
+
+    clock[0] += 10
+
+    assert cache.get("up") is True
+    assert cache.get("down", "missing") == "missing"
+    clock[0] += 60
+    assert cache.get("up") is None
+
+
+def test_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, positive_ttl=60, negative_ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_hostname_checks_are_cached(monkeypatch):
+    calls = []
+
+    def getaddrinfo(host, port):
+        calls.append(host)
+        raise socket.gaierror
+
+    monkeypatch.setattr(network.socket, "getaddrinfo", getaddrinfo)
+
+    assert not network.is_hostname_valid("nowhere.invalid")
+    assert not network.is_hostname_valid("nowhere.invalid")
+    assert not network.is_hostname_valid("nowhere.invalid", force=True)
+    assert calls == ["nowhere.invalid", "nowhere.invalid"]
+
+
+def test_port_probes_are_cached_per_timeout(monkeypatch):
+    calls = []
+
+    async def probe(host, port, timeout):
+        calls.append(timeout)
+        return True
+
+    monkeypatch.setattr(network, "_probe_port_async", probe)
+
+    async def run():
+        return [
+            await network.is_port_open_async("db", 5432, 1),
+            await network.is_port_open_async("db", 5432, 1),
+            await network.is_port_open_async("db", 5432, 5),
+        ]
+
+    assert asyncio.run(run()) == [True, True, True]
+    assert calls == [1, 5]
+
+
+def test_async_port_probe_connects():
+    with socket.create_server(("127.0.0.1", 0)) as server:
+        port = server.getsockname()[1]
+        assert asyncio.run(network.is_port_open_async("127.0.0.1", port, 1))
+    assert not asyncio.run(network.is_port_open_async("127.0.0.1", port, 1, force=True))
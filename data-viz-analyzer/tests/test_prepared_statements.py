@@ -0,0 +1,96 @@
+import pytest
+
+from app.engine_specifics import postgres
+from app.engine_specifics.base import BaseSpecificEngine
+from app.engine_specifics.postgres import PostgresSpecificEngine
+
+
+class RecordingCursor:
+    def __init__(self, fail_on: str | None = None) -> None:
+        self.executed = []
+        self.fail_on = fail_on
+
+    def execute(self, sql, parameters=None):
+        if self.fail_on and sql.startswith(self.fail_on):
+            raise RuntimeError("statement failed")
+        self.executed.append((sql, parameters))
+
+
+SQL = "SELECT * FROM t WHERE ts >= %(start)s AND ts < %(end)s AND name LIKE 'a%%' AND ts > %(start)s"
+
+
+def name_of(sql: str) -> str:
+    return sql.split()[1]
+
+
+def test_statements_are_prepared_once_per_connection():
+    info, cursor = {}, RecordingCursor()
+
+    PostgresSpecificEngine.execute_prepared(info, cursor, SQL, {"start": 1, "end": 2})
+    PostgresSpecificEngine.execute_prepared(info, cursor, SQL, {"start": 3, "end": 4})
+
+    (prepare, _), first, second = cursor.executed
+    assert prepare == (
+        f"PREPARE {name_of(prepare)} AS SELECT * FROM t WHERE ts >= $1 AND ts < $2 "
+        "AND name LIKE 'a%' AND ts > $1"
+    )
+    assert first == (f"EXECUTE {name_of(prepare)} (%(start)s, %(end)s)", {"start": 1, "end": 2})
+    assert second[1] == {"start": 3, "end": 4}
+
+
+def test_statements_without_parameters_keep_their_percent_signs():
+    info, cursor = {}, RecordingCursor()
+
+    PostgresSpecificEngine.execute_prepared(info, cursor, "SELECT '100%%'", None)
+
+    prepare, execute = (sql for sql, _ in cursor.executed)
+    assert prepare.endswith(" AS SELECT '100%%'")
+    assert execute == f"EXECUTE {name_of(prepare)}"
+
+
+def test_least_recently_used_statements_are_deallocated(monkeypatch):
+    monkeypatch.setattr(postgres, "PREPARED_STATEMENT_CACHE_SIZE", 2)
+    info, cursor = {}, RecordingCursor()
+
+    for sql in ("SELECT 1", "SELECT 2", "SELECT 1", "SELECT 3"):
+        PostgresSpecificEngine.execute_prepared(info, cursor, sql)
+
+    statements = [sql for sql, _ in cursor.executed if not sql.startswith("EXECUTE")]
+    assert [sql.split(" AS ")[-1] for sql in statements[:3]] == [
+        "SELECT 1",
+        "SELECT 2",
+        "SELECT 3",
+    ]
+    # SELECT 1 was used again after SELECT 2
+    assert statements[3:] == [f"DEALLOCATE {name_of(statements[1])}"]
+    assert len(info[postgres._PREPARED_STATEMENTS_KEY]) == 2
+
+
+def test_failures_start_over_with_a_clean_connection():
+    info = {}
+    with pytest.raises(RuntimeError):
+        PostgresSpecificEngine.execute_prepared(info, RecordingCursor("EXECUTE"), "SELECT 1")
+    assert info[postgres._PREPARED_STATEMENTS_KEY] is None
+
+    cursor = RecordingCursor()
+    PostgresSpecificEngine.execute_prepared(info, cursor, "SELECT 1")
+
+    assert [sql.split()[0] for sql, _ in cursor.executed] == ["DEALLOCATE", "PREPARE", "EXECUTE"]
+
+
+def test_preparing_can_be_disabled(monkeypatch):
+    monkeypatch.setattr(postgres, "PREPARED_STATEMENT_CACHE_SIZE", 0)
+    info, cursor = {}, RecordingCursor()
+
+    PostgresSpecificEngine.execute_prepared(info, cursor, SQL, {"start": 1, "end": 2})
+
+    assert cursor.executed == [(SQL, {"start": 1, "end": 2})]
+    assert info == {}
+
+
+def test_base_engine_executes_directly():
+    cursor = RecordingCursor()
+
+    BaseSpecificEngine.execute_prepared({}, cursor, "SELECT 1")
+
+    assert cursor.executed == [("SELECT 1", None)]
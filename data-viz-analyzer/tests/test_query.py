@@ -0,0 +1,258 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.database import get_db_context
+from app.engine_specifics.base import BaseSpecificEngine
+from app.main import app
+from app.result_set import ColumnarResultSet
+from app.routers import chart
+from app.schemas.dbs import DBS
+from app.services import query as query_service
+from app.services.chart_query import ChartQuery, Metric, TIMESTAMP_LABEL, build_chart_query
+from app.services.query import execute_chart_query
+from app.services.result_cache import QueryResultCache
+from app.utils.constants import TimeGrain
+
+DESCRIPTION = [
+    (TIMESTAMP_LABEL, "TIMESTAMP", None, None, None, None, True),
+    ("shard_id", "INTEGER", None, None, None, None, True),
+    ("SUM(amount)", "FLOAT", None, None, None, None, True),
+]
+MIDNIGHT = datetime(2024, 1, 1)
+
+
+def make_result(timestamps, values, shards=None) -> ColumnarResultSet:
+    shards = shards or [1] * len(values)
+    return ColumnarResultSet.from_batches(
+        DESCRIPTION, [[timestamps, shards, values]], BaseSpecificEngine
+    )
+
+
+def hours(*offsets, tz=None):
+    return [
+        None if offset is None else (MIDNIGHT + timedelta(hours=offset)).replace(tzinfo=tz)
+        for offset in offsets
+    ]
+
+
+@pytest.fixture
+def database() -> DBS:
+    return DBS(
+        name="examples",
+        sqlalchemy_uri="postgresql://dataviz@localhost/examples",
+        uuid=uuid.uuid4(),
+    )
+
+
+@pytest.fixture
+def result_cache(monkeypatch) -> QueryResultCache:
+    cache = QueryResultCache(max_bytes=1024 * 1024)
+    monkeypatch.setattr(query_service, "result_cache", cache)
+    return cache
+
+
+@pytest.fixture
+def executed(monkeypatch) -> list:
+    """
+    Statements run by the query service, answered by ``executed.result``.
+    """
+
+    class Executed(list):
+        result = None
+
+    executed = Executed()
+
+    def execute_query(database, sql, parameters=None, limit=None, **kwargs):
+        executed.append((sql, parameters))
+        return executed.result
+
+    monkeypatch.setattr(query_service, "execute_query", execute_query)
+    return executed
+
+
+def make_query(**kwargs) -> ChartQuery:
+    return ChartQuery(
+        **{
+            "table_name": "orders",
+            "temporal_column": "created_at",
+            "metrics": [Metric("SUM", "amount")],
+            "time_grain": TimeGrain.HOUR,
+            "groupby": ["shard_id"],
+            "time_range": (MIDNIGHT, None),
+            **kwargs,
+        }
+    )
+
+
+def seed(database, result_cache, query, result) -> str:
+    sql, parameters = build_chart_query(database, query)
+    key = result_cache.make_key(database.uuid, sql, parameters, query.row_limit)
+    result_cache.set(key, result, 60)
+    return key
+
+
+def test_chart_queries_are_cached(database, result_cache, executed):
+    executed.result = make_result(hours(0, 1), [1.0, 2.0])
+    query = make_query()
+
+    first = execute_chart_query(database, query)
+    second = execute_chart_query(database, query)
+
+    assert second is first
+    ((sql, parameters),) = executed
+    assert "DATE_TRUNC('hour', created_at) AS __timestamp" in sql
+    assert parameters == {"param_0": MIDNIGHT}
+
+
+def test_incremental_refresh_only_queries_the_late_buckets(database, result_cache, executed):
+    query = make_query(incremental=True, late_arrival=timedelta(hours=1))
+    cached = make_result(hours(0, 1, 2, 3, 4, 5, None), [1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0])
+    key = seed(database, result_cache, query, cached)
+    executed.result = make_result(hours(4, 5, 6), [50.0, 60.0, 70.0])
+
+    merged = execute_chart_query(database, query, force=True)
+
+    # from the bucket an hour before the latest one cached
+    ((_, parameters),) = executed
+    assert parameters == {"param_0": MIDNIGHT + timedelta(hours=4)}
+    assert merged.column(TIMESTAMP_LABEL).to_list() == hours(0, 1, 2, 3, 4, 5, 6, None)
+    assert merged.column("SUM(amount)").to_list() == [1.0, 2.0, 3.0, 4.0, 50.0, 60.0, 70.0, 7.0]
+    assert result_cache.get(key) is merged
+
+
+def test_incremental_refresh_binds_aware_watermarks(database, result_cache, executed):
+    query = make_query(incremental=True, late_arrival=timedelta(hours=1))
+    seed(database, result_cache, query, make_result(hours(0, 1, 2, tz=timezone.utc), [1.0] * 3))
+    executed.result = make_result(hours(1, 2, tz=timezone.utc), [2.0, 3.0])
+
+    merged = execute_chart_query(database, query, force=True)
+
+    ((_, parameters),) = executed
+    assert parameters["param_0"] == datetime(2024, 1, 1, 1, tzinfo=timezone.utc)
+    assert merged.column(TIMESTAMP_LABEL).to_list() == hours(0, 1, 2, tz=timezone.utc)
+
+
+def test_incremental_refresh_runs_the_full_query_without_a_cached_result(
+    database, result_cache, executed
+):
+    executed.result = make_result(hours(0, 1), [1.0, 2.0])
+    query = make_query(incremental=True)
+
+    execute_chart_query(database, query, force=True)
+
+    ((_, parameters),) = executed
+    assert parameters == {"param_0": MIDNIGHT}
+
+
+def test_only_forced_unlimited_queries_are_refreshed_incrementally(
+    database, result_cache, executed
+):
+    cached = make_result(hours(0, 1, 2), [1.0, 2.0, 3.0])
+    executed.result = make_result(hours(0, 1, 2, 3), [1.0, 2.0, 3.0, 4.0])
+    query = make_query(incremental=True)
+    limited = make_query(incremental=True, row_limit=10)
+    seed(database, result_cache, query, cached)
+    seed(database, result_cache, limited, cached)
+
+    assert execute_chart_query(database, query) is cached
+    assert execute_chart_query(database, limited, force=True) is executed.result
+
+    ((_, parameters),) = executed
+    assert parameters == {"param_0": MIDNIGHT}
+
+
+def test_incremental_refresh_falls_back_when_the_columns_changed(
+    database, result_cache, executed
+):
+    query = make_query(incremental=True, late_arrival=timedelta(hours=1))
+    seed(database, result_cache, query, make_result(hours(0, 1, 2), [1.0, 2.0, 3.0]))
+    executed.result = ColumnarResultSet.from_batches(
+        DESCRIPTION[:1], [[hours(1, 2)]], BaseSpecificEngine
+    )
+
+    result = execute_chart_query(database, query, force=True)
+
+    # the delta query, then the full one
+    assert [parameters for _, parameters in executed] == [
+        {"param_0": MIDNIGHT + timedelta(hours=1)},
+        {"param_0": MIDNIGHT},
+    ]
+    assert result is executed.result
+
+
+def test_chart_results_are_downsampled_per_metric(database, result_cache, executed):
+    count = 1000
+    executed.result = make_result(
+        [MIDNIGHT + timedelta(minutes=index // 2) for index in range(count)],
+        [float(index % 7) for index in range(count)],
+        shards=[index % 2 for index in range(count)],
+    )
+
+    result = execute_chart_query(database, make_query(max_points=20))
+
+    # the shard id splits the series rather than being downsampled as a metric
+    assert 20 < len(result) <= 2 * 20
+    assert set(result.column("shard_id").to_list()) == {0, 1}
+
+
+@pytest.fixture
+def client(monkeypatch, database):
+    async def get_db():
+        yield None
+
+    async def find_by_id(database_id, db):
+        return database if database_id == 1 else None
+
+    monkeypatch.setattr(chart.DbsDAO, "find_by_id", find_by_id)
+    app.dependency_overrides[get_db_context] = get_db
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def test_chart_data_endpoint(monkeypatch, client):
+    calls = []
+
+    def execute_chart_query(database, query, force):
+        calls.append((query, force))
+        return make_result(hours(0), [1.0])
+
+    monkeypatch.setattr(chart, "execute_chart_query", execute_chart_query)
+    response = client.post(
+        "/chart/data",
+        json={
+            "database_id": 1,
+            "table_name": "orders",
+            "temporal_column": "created_at",
+            "metrics": [{"aggregate": "SUM", "column": "amount"}],
+            "time_grain": "PT1H",
+            "start": "2024-01-01T00:00:00",
+            "max_points": 100,
+            "late_arrival": 60,
+            "force": True,
+        },
+    )
+
+    assert response.status_code == 200
+    assert response.json()["data"]["data"]["SUM(amount)"] == [1.0]
+    ((query, force),) = calls
+    assert force
+    assert query.time_range == (MIDNIGHT, None)
+    assert query.metrics == [Metric("SUM", "amount")]
+    assert query.max_points == 100
+    assert query.late_arrival == timedelta(seconds=60)
+
+
+def test_chart_data_endpoint_errors(client):
+    payload = {
+        "table_name": "orders",
+        "temporal_column": "created_at",
+        "metrics": [{"aggregate": "MEDIAN", "column": "amount"}],
+    }
+
+    assert client.post("/chart/data", json={**payload, "database_id": 2}).status_code == 404
+    response = client.post("/chart/data", json={**payload, "database_id": 1})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Unsupported aggregate MEDIAN"
@@ -0,0 +1,160 @@
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from app.engine_specifics import base
+from app.engine_specifics.base import BaseSpecificEngine
+from app.exceptions import QueryTimeoutException
+from app.schemas.dbs import DBS
+from app.services import query as query_service
+from app.services.query import (
+    QueryCanceller,
+    QueryWatchdog,
+    QueryWatchdogScheduler,
+    execute_query,
+)
+
+
+class RecordingEngineSpecific(BaseSpecificEngine):
+    engine = "sqlite"
+    stream_batch_size = 2
+    statement_timeouts: list = []
+    cancels: list = []
+
+    @classmethod
+    def set_statement_timeout(cls, cursor, timeout):
+        cls.statement_timeouts.append(timeout)
+        return True
+
+    @classmethod
+    def get_cancel_query_id(cls, cursor, connection_info=None):
+        return "42"
+
+    @classmethod
+    def cancel_query(cls, cursor, cancel_query_id):
+        cursor.execute("SELECT 1")
+        cls.cancels.append(cancel_query_id)
+        return True
+
+
+@pytest.fixture
+def database(monkeypatch, tmp_path) -> DBS:
+    RecordingEngineSpecific.statement_timeouts = []
+    RecordingEngineSpecific.cancels = []
+    monkeypatch.setattr(
+        DBS, "db_engine_specific", property(lambda self: RecordingEngineSpecific)
+    )
+    path = tmp_path / "examples.db"
+    with sqlite3.connect(path) as connection:
+        connection.execute("CREATE TABLE numbers (n INTEGER)")
+        connection.executemany("INSERT INTO numbers VALUES (?)", [(n,) for n in range(7)])
+    return DBS(
+        name="examples",
+        sqlalchemy_uri=f"sqlite:///{path}",
+        uuid=uuid.uuid4(),
+        extra=json.dumps(
+            {"engine_params": {"pool_size": 1, "max_overflow": 0, "pool_timeout": 0.2}}
+        ),
+    )
+
+
+def test_statement_timeout_is_set_once_per_query(database):
+    result = execute_query(database, "SELECT n FROM numbers", timeout=30)
+
+    assert len(result) == 7
+    assert RecordingEngineSpecific.statement_timeouts == [30]
+
+
+def test_deadline_is_checked_in_between_batches(monkeypatch, database):
+    now = time.monotonic()
+    ticks = iter(range(100))
+    # the deadline is set at ``now``, every batch then takes 10 seconds
+    monkeypatch.setattr(
+        query_service,
+        "time",
+        SimpleNamespace(monotonic=lambda: now, perf_counter=time.perf_counter),
+    )
+    monkeypatch.setattr(
+        base,
+        "time",
+        SimpleNamespace(
+            monotonic=lambda: now + 10 * next(ticks), perf_counter=time.perf_counter
+        ),
+    )
+
+    with pytest.raises(QueryTimeoutException):
+        execute_query(database, "SELECT n FROM numbers", timeout=15)
+
+
+def test_canceller_does_not_need_a_pooled_connection(database):
+    canceller = QueryCanceller(database, "42")
+
+    with database.get_sqla_engine().connect():
+        # the only pooled connection is checked out
+        started = time.perf_counter()
+        assert canceller.cancel()
+        assert time.perf_counter() - started < 0.2
+
+    canceller.finish()
+    assert not canceller.cancel()
+    assert RecordingEngineSpecific.cancels == ["42"]
+
+
+class FakeCanceller:
+    def __init__(self, name: str, cancelled: list, done: threading.Event) -> None:
+        self.name = name
+        self.cancelled = cancelled
+        self.done = done
+
+    def cancel(self) -> bool:
+        self.cancelled.append(self.name)
+        self.done.set()
+        return True
+
+    def finish(self) -> None:
+        pass
+
+
+def test_scheduler_fires_due_watchdogs_from_one_thread():
+    scheduler = QueryWatchdogScheduler(cancel_workers=1)
+    cancelled, done = [], threading.Event()
+    threads = threading.active_count()
+    watchdogs = {
+        name: QueryWatchdog(FakeCanceller(name, cancelled, done), 0, scheduler)
+        for name in ("late", "early", "never")
+    }
+
+    scheduler.schedule(watchdogs["late"], 0.1)
+    scheduler.schedule(watchdogs["never"], 0.05)
+    scheduler.schedule(watchdogs["early"], 0.02)
+    scheduler.unschedule(watchdogs["never"])
+    while len(cancelled) < 2:
+        assert done.wait(2)
+        done.clear()
+
+    assert cancelled == ["early", "late"]
+    assert watchdogs["early"].fired and watchdogs["late"].fired
+    assert not watchdogs["never"].fired
+    # the scheduler thread and the cancel worker
+    assert threading.active_count() == threads + 2
+
+
+def test_unscheduled_watchdogs_are_compacted():
+    scheduler = QueryWatchdogScheduler(cancel_workers=1)
+    cancelled, done = [], threading.Event()
+    watchdogs = [
+        QueryWatchdog(FakeCanceller(str(index), cancelled, done), 0, scheduler)
+        for index in range(10)
+    ]
+    for watchdog in watchdogs:
+        scheduler.schedule(watchdog, 60)
+    for watchdog in watchdogs[:6]:
+        scheduler.unschedule(watchdog)
+
+    assert len(scheduler._heap) == 4
+    assert all(entry[2].scheduled for entry in scheduler._heap)
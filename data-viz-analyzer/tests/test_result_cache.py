@@ -0,0 +1,146 @@
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import result_cache as result_cache_module
+from app.services.result_cache import QueryResultCache
+
+
+class Value:
+    def __init__(self, nbytes: int) -> None:
+        self.nbytes = nbytes
+
+
+def test_make_key_ignores_formatting_and_keeps_parameters():
+    key = QueryResultCache.make_key("db", "SELECT a FROM t", {"x": 1}, 10)
+
+    assert QueryResultCache.make_key("db", "select a\n  from t ", {"x": 1}, 10) == key
+    assert QueryResultCache.make_key("db", "SELECT a FROM t", {"x": 2}, 10) != key
+    assert QueryResultCache.make_key("db", "SELECT a FROM t", {"x": 1}, 20) != key
+    assert QueryResultCache.make_key("other", "SELECT a FROM t", {"x": 1}, 10) != key
+
+
+def test_evicts_least_recently_used_by_bytes():
+    cache = QueryResultCache(max_bytes=100)
+    cache.set("a", Value(40), 60)
+    cache.set("b", Value(40), 60)
+    cache.get("a")
+
+    cache.set("c", Value(40), 60)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats()["bytes"] == 80
+    assert cache.stats()["evictions"] == 1
+
+
+def test_skips_values_larger_than_the_cache():
+    cache = QueryResultCache(max_bytes=100)
+    cache.set("a", Value(101), 60)
+
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_entries_expire(monkeypatch):
+    now = time.monotonic()
+    monkeypatch.setattr(result_cache_module.time, "monotonic", lambda: now)
+    cache = QueryResultCache()
+    cache.set("a", Value(1), 10)
+
+    now += 11
+
+    assert cache.get("a") is None
+    assert cache.stats()["bytes"] == 0
+
+
+def test_concurrent_misses_run_the_query_once():
+    cache = QueryResultCache()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def execute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return Value(1)
+
+    results = []
+    leader = threading.Thread(
+        target=lambda: results.append(cache.get_or_execute("a", execute, 60))
+    )
+    leader.start()
+    started.wait(5)
+    followers = [
+        threading.Thread(target=lambda: results.append(cache.get_or_execute("a", execute, 60)))
+        for _ in range(3)
+    ]
+    for follower in followers:
+        follower.start()
+    while cache.stats()["coalesced"] < 3:
+        time.sleep(0.001)
+    release.set()
+    for thread in (leader, *followers):
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert len(results) == 4 and all(result is results[0] for result in results)
+    assert cache.stats()["in_flight"] == 0
+    assert cache.get_or_execute("a", execute, 60) is results[0]
+
+
+def test_failures_are_not_cached():
+    cache = QueryResultCache()
+
+    def execute():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_execute("a", execute, 60)
+    assert cache.stats()["in_flight"] == 0
+    assert cache.get_or_execute("a", lambda: Value(1), 60).nbytes == 1
+
+
+def test_second_tier_hits_and_failures():
+    class SecondTier:
+        def __init__(self):
+            self.values = {"a": Value(1)}
+
+        def get(self, key):
+            if key == "broken":
+                raise OSError("disk")
+            return self.values.get(key)
+
+        def set(self, key, value, timeout):
+            self.values[key] = value
+
+        def delete(self, key):
+            self.values.pop(key, None)
+
+    second_tier = SecondTier()
+    cache = QueryResultCache(second_tier=second_tier)
+
+    assert cache.get_or_execute("a", lambda: pytest.fail("executed"), 60).nbytes == 1
+    assert cache.get_or_execute("broken", lambda: Value(2), 60).nbytes == 2
+    assert "broken" in second_tier.values
+    assert cache.stats()["second_tier_hits"] == 1
+
+
+def test_stats_are_exposed_on_metrics(monkeypatch):
+    cache = QueryResultCache()
+    monkeypatch.setattr(result_cache_module, "result_cache", cache)
+    cache.set("a", Value(7), 60)
+    cache.get("a")
+    cache.get("b")
+
+    body = TestClient(app).get("/metrics").text
+
+    assert "# TYPE dataviz_result_cache_lookups_total counter" in body
+    assert 'dataviz_result_cache_lookups_total{result="hit"} 1' in body
+    assert 'dataviz_result_cache_lookups_total{result="miss"} 1' in body
+    assert "# TYPE dataviz_result_cache_bytes gauge" in body
+    assert "dataviz_result_cache_bytes 7" in body
+    assert "dataviz_result_cache_entries 1" in body
@@ -0,0 +1,115 @@
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+
+import numpy as np
+
+from app.engine_specifics.base import BaseSpecificEngine
+from app.engine_specifics.postgres import PostgresSpecificEngine
+from app.result_set import DATETIME_DTYPE, ColumnarResultSet
+from app.utils.core import GenericDataType
+
+
+def build(description, *columns, engine_specific=BaseSpecificEngine) -> ColumnarResultSet:
+    description = [(name, type_code, None, None, None, None, True) for name, type_code in description]
+    return ColumnarResultSet.from_batches(description, [list(columns)], engine_specific)
+
+
+def test_columns_are_typed_from_the_description():
+    result = build(
+        [("id", "INTEGER"), ("price", "NUMERIC"), ("name", "VARCHAR"), ("day", "DATE")],
+        [1, 2, None],
+        [Decimal("1.10"), None, Decimal("3.30")],
+        ["a", "b", "a"],
+        [date(2024, 1, 1), date(2024, 1, 2), None],
+    )
+    ids, prices, names, days = result.columns
+
+    assert ids.values.dtype == np.int64
+    assert ids.nulls.tolist() == [False, False, True]
+    assert ids.to_list() == [1, 2, None]
+    # exact decimals aren't rounded to float64
+    assert prices.values.dtype == object
+    assert prices.to_list() == [Decimal("1.10"), None, Decimal("3.30")]
+    assert names.dictionary.tolist() == ["a", "b"]
+    assert names.values.tolist() == [0, 1, 0]
+    assert days.values.dtype == DATETIME_DTYPE
+    assert days.to_list() == [datetime(2024, 1, 1), datetime(2024, 1, 2), None]
+    assert [column.generic_type for column in result.columns] == [
+        GenericDataType.NUMERIC,
+        GenericDataType.NUMERIC,
+        GenericDataType.STRING,
+        GenericDataType.TEMPORAL,
+    ]
+
+
+def test_postgres_oids_are_mapped_to_types():
+    # psycopg2 describes columns with the OID of their type
+    result = build(
+        [("id", 20), ("created_at", 1184), ("payload", 114)],
+        [1, 2],
+        [datetime(2024, 1, 1, tzinfo=timezone.utc), None],
+        [{"a": 1}, None],
+        engine_specific=PostgresSpecificEngine,
+    )
+    ids, created_at, payload = result.columns
+
+    assert PostgresSpecificEngine.get_datatype(1043) == "VARCHAR"
+    assert PostgresSpecificEngine.get_datatype(99999) is None
+    assert ids.column_spec is not None and ids.values.dtype == np.int64
+    assert created_at.column_spec.sqla_type.timezone
+    assert payload.column_spec is None
+
+
+def test_time_zone_aware_timestamps_keep_their_instant():
+    paris = timezone(timedelta(hours=1))
+    result = build(
+        [("created_at", "TIMESTAMP")],
+        [datetime(2024, 1, 1, 13, tzinfo=paris), None, datetime(2024, 1, 1, 12, tzinfo=timezone.utc)],
+    )
+    (column,) = result.columns
+
+    assert column.tz_aware
+    assert column.values[0] == np.datetime64("2024-01-01T12:00:00")
+    assert column.to_list() == [
+        datetime(2024, 1, 1, 12, tzinfo=timezone.utc),
+        None,
+        datetime(2024, 1, 1, 12, tzinfo=timezone.utc),
+    ]
+    assert column.take(np.array([2])).to_list()[0].tzinfo == timezone.utc
+
+
+def test_mixed_naive_and_aware_timestamps_fall_back_to_objects():
+    values = [datetime(2024, 1, 1), datetime(2024, 1, 1, tzinfo=timezone.utc)]
+    (column,) = build([("created_at", "TIMESTAMP")], values).columns
+
+    assert column.values.dtype == object
+    assert column.to_list() == values
+
+
+def test_nbytes_counts_object_contents():
+    text = "x" * 1000
+    (column,) = build([("payload", None)], [text.encode(), text.encode()]).columns
+
+    assert column.values.dtype == object
+    assert column.nbytes > 2000
+    (names,) = build([("name", "VARCHAR")], [text + str(index) for index in range(10)]).columns
+    assert names.nbytes > 10 * 1000
+
+
+def test_take_and_concat():
+    first = build([("id", "INTEGER"), ("name", "VARCHAR")], [1, 2], ["a", "b"])
+    second = build([("id", "INTEGER"), ("name", "VARCHAR")], [3, None], ["c", "a"])
+    merged = ColumnarResultSet.concat([first, second])
+
+    assert merged.to_rows() == [(1, "a"), (2, "b"), (3, "c"), (None, "a")]
+    assert merged.column("name").dictionary.tolist() == ["a", "b", "c"]
+    assert merged.take(np.array([3, 0])).to_rows() == [(None, "a"), (1, "a")]
+
+
+def test_to_dict_sends_string_dictionaries():
+    result = build([("name", "VARCHAR")], ["a", None, "a"])
+
+    assert result.to_dict() == {
+        "columns": [{"name": "name", "type": "STRING", "is_dttm": False}],
+        "data": {"name": {"dictionary": ["a"], "codes": [0, None, 0]}},
+    }
@@ -0,0 +1,147 @@
+import json
+import time
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+
+from app.schemas.dbs import DBS
+from app.services.chart_query import ChartQuery, Filter, Metric, TIMESTAMP_LABEL
+from app.services.rollups import Rollup, RollupManager, can_roll_up, is_aligned
+from app.utils.constants import TimeGrain
+
+ROLLUP = {
+    "table_name": "orders",
+    "temporal_column": "created_at",
+    "time_grain": TimeGrain.HOUR,
+    "dimensions": ["country"],
+    "metrics": [
+        {"aggregate": "SUM", "column": "amount"},
+        {"aggregate": "AVG", "column": "amount"},
+        {"aggregate": "COUNT_DISTINCT", "column": "customer_id"},
+    ],
+}
+WATERMARK = datetime(2024, 1, 10, 12)
+
+
+@pytest.fixture
+def database() -> DBS:
+    return DBS(
+        name="examples",
+        sqlalchemy_uri="postgresql://localhost/examples",
+        uuid=uuid.uuid4(),
+        extra=json.dumps({"rollups": [ROLLUP]}),
+    )
+
+
+@pytest.fixture
+def manager(database) -> RollupManager:
+    manager = RollupManager()
+    (rollup,) = manager.get_rollups(database)
+    state = manager.get_state(rollup)
+    state.watermark = WATERMARK
+    state.refreshed_at = time.time()
+    return manager
+
+
+def make_query(**kwargs) -> ChartQuery:
+    return ChartQuery(
+        **{
+            "table_name": "orders",
+            "temporal_column": "created_at",
+            "metrics": [Metric("SUM", "amount")],
+            "time_grain": TimeGrain.DAY,
+            "time_range": (datetime(2024, 1, 1), datetime(2024, 1, 10)),
+            **kwargs,
+        }
+    )
+
+
+@pytest.mark.parametrize(
+    "rollup_grain, query_grain, expected",
+    [
+        (TimeGrain.HOUR, TimeGrain.HOUR, True),
+        (TimeGrain.HOUR, TimeGrain.DAY, True),
+        (TimeGrain.HOUR, TimeGrain.MONTH, True),
+        (TimeGrain.FIFTEEN_MINUTES, TimeGrain.HOUR, True),
+        (TimeGrain.HOUR, TimeGrain.FIFTEEN_MINUTES, False),
+        (TimeGrain.MONTH, TimeGrain.QUARTER, True),
+        (TimeGrain.WEEK, TimeGrain.MONTH, False),
+        (TimeGrain.HOUR, None, False),
+    ],
+)
+def test_can_roll_up(rollup_grain, query_grain, expected):
+    assert can_roll_up(rollup_grain, query_grain) is expected
+
+
+@pytest.mark.parametrize(
+    "dttm, grain, expected",
+    [
+        (datetime(2024, 1, 10, 12), TimeGrain.HOUR, True),
+        (datetime(2024, 1, 10, 12, 30), TimeGrain.HOUR, False),
+        (datetime(2024, 1, 8), TimeGrain.WEEK, True),
+        (datetime(2024, 1, 10), TimeGrain.WEEK, False),
+        (datetime(2024, 4, 1), TimeGrain.QUARTER, True),
+        (datetime(2024, 5, 1), TimeGrain.QUARTER, False),
+    ],
+)
+def test_is_aligned(dttm, grain, expected):
+    assert is_aligned(dttm, grain) is expected
+
+
+def test_rewrite_reaggregates_stored_metrics():
+    rollup = Rollup.from_dict(uuid.uuid4(), ROLLUP)
+    query = make_query(
+        metrics=[Metric("SUM", "amount"), Metric("AVG", "amount", label="average")],
+        groupby=["country"],
+        filters=[Filter("country", "==", "FR")],
+    )
+    rewritten = rollup.rewrite(query)
+
+    assert rewritten.table_name == rollup.rollup_table
+    assert rewritten.temporal_column == TIMESTAMP_LABEL
+    assert [metric.get_label() for metric in rewritten.metrics] == ["SUM(amount)", "average"]
+    assert [metric.expression for metric in rewritten.metrics] == [
+        "SUM(sum__amount)",
+        "SUM(sum__amount) * 1.0 / NULLIF(SUM(count__amount), 0)",
+    ]
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"metrics": [Metric("COUNT_DISTINCT", "customer_id")]},
+        {"groupby": ["city"]},
+        {"filters": [Filter("status", "==", "paid")]},
+        {"time_grain": TimeGrain.MINUTE},
+        {"time_range": (datetime(2024, 1, 1, 0, 30), datetime(2024, 1, 10))},
+    ],
+)
+def test_rewrite_rejects_queries_the_rollup_cant_answer(kwargs):
+    rollup = Rollup.from_dict(uuid.uuid4(), ROLLUP)
+    assert rollup.rewrite(make_query(**kwargs)) is None
+
+
+def test_route_queries_ending_at_the_watermark(database, manager):
+    routed = manager.route(database, make_query(time_range=(None, WATERMARK)))
+    assert routed.table_name.startswith("dataviz_rollup_")
+
+
+@pytest.mark.parametrize(
+    "end",
+    [
+        None,
+        datetime(2024, 1, 10, 13),
+        datetime(2024, 1, 10, 13, tzinfo=timezone.utc),
+    ],
+)
+def test_route_skips_queries_past_the_watermark(database, manager, end):
+    query = make_query(time_range=(None, end))
+    assert manager.route(database, query) is query
+
+
+def test_route_skips_stale_rollups(database, manager):
+    (rollup,) = manager.get_rollups(database)
+    manager.get_state(rollup).refreshed_at = time.time() - 3 * rollup.refresh_interval
+    query = make_query()
+    assert manager.route(database, query) is query
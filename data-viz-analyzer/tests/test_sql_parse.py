@@ -0,0 +1,99 @@
+import pytest
+
+from app.engine_specifics.base import BaseSpecificEngine, LimitMethod
+from app.utils.sql_parse import ParsedQuery
+
+
+@pytest.mark.parametrize(
+    "sql, is_select",
+    [
+        ("SELECT 1", True),
+        ("  -- comment\nselect * from t;", True),
+        ("WITH a AS (SELECT 1) SELECT * FROM a", True),
+        ("WITH a AS (DELETE FROM t RETURNING *) SELECT * FROM a", False),
+        ("SELECT * INTO copy FROM t", False),
+        ("SELECT * FROM t FOR UPDATE", True),
+        ("SELECT 1; DROP TABLE t", False),
+        ("INSERT INTO t SELECT 1", False),
+        ("EXPLAIN SELECT 1", False),
+    ],
+)
+def test_is_select(sql, is_select):
+    assert ParsedQuery(sql).is_select() is is_select
+
+
+@pytest.mark.parametrize(
+    "sql, limit",
+    [
+        ("SELECT * FROM t LIMIT 10", 10),
+        ("SELECT * FROM t LIMIT 5, 20", 20),
+        ("SELECT * FROM t FETCH FIRST 7 ROWS ONLY", 7),
+        ("SELECT * FROM (SELECT * FROM t LIMIT 3) s", None),
+        ("SELECT 'LIMIT 3' FROM t -- LIMIT 4", None),
+        ("SELECT * FROM t LIMIT :n", None),
+    ],
+)
+def test_limit_is_read_at_the_top_level(sql, limit):
+    assert ParsedQuery(sql).limit == limit
+
+
+@pytest.mark.parametrize(
+    "sql, expected",
+    [
+        ("SELECT * FROM t", "SELECT * FROM t\nLIMIT 100"),
+        ("SELECT * FROM t;  ", "SELECT * FROM t\nLIMIT 100;  "),
+        ("SELECT * FROM t -- trailing", "SELECT * FROM t\nLIMIT 100 -- trailing"),
+        ("SELECT * FROM t LIMIT 1000", "SELECT * FROM t LIMIT 100"),
+        ("SELECT * FROM t LIMIT 10", "SELECT * FROM t LIMIT 10"),
+        ("SELECT * FROM t limit ALL", "SELECT * FROM t limit 100"),
+        ("SELECT * FROM t LIMIT 5, 1000", "SELECT * FROM t LIMIT 5, 100"),
+        ("SELECT * FROM t OFFSET 5", "SELECT * FROM t LIMIT 100\nOFFSET 5"),
+        (
+            "SELECT * FROM (SELECT * FROM t LIMIT 1000) s",
+            "SELECT * FROM (SELECT * FROM t LIMIT 1000) s\nLIMIT 100",
+        ),
+        ("UPDATE t SET a = 1", "UPDATE t SET a = 1"),
+    ],
+)
+def test_set_or_update_limit(sql, expected):
+    assert ParsedQuery(sql).set_or_update_limit(100) == expected
+
+
+def test_limits_that_cant_be_compared_are_wrapped():
+    assert ParsedQuery("SELECT * FROM t LIMIT :n").set_or_update_limit(100) == (
+        "SELECT * FROM (\nSELECT * FROM t LIMIT :n\n) AS inner_qry\nLIMIT 100"
+    )
+
+
+def test_wrap_with_limit():
+    assert ParsedQuery("SELECT * FROM t;").wrap_with_limit(100) == (
+        "SELECT * FROM (\nSELECT * FROM t\n) AS inner_qry\nLIMIT 100"
+    )
+    assert ParsedQuery("SELECT * FROM t LIMIT 10").wrap_with_limit(100) == (
+        "SELECT * FROM t LIMIT 10"
+    )
+    assert ParsedQuery("DELETE FROM t").wrap_with_limit(100) == "DELETE FROM t"
+
+
+def test_normalized_ignores_formatting():
+    assert ParsedQuery("select *\n  from t -- note\n").normalized == (
+        ParsedQuery("SELECT * FROM t").normalized
+    )
+    assert ParsedQuery("SELECT 'a  b'").normalized != ParsedQuery("SELECT 'a b'").normalized
+
+
+@pytest.mark.parametrize(
+    "limit_method, expected",
+    [
+        (LimitMethod.FORCE_LIMIT, "SELECT * FROM t\nLIMIT 5"),
+        (LimitMethod.WRAP_SQL, "SELECT * FROM (\nSELECT * FROM t\n) AS inner_qry\nLIMIT 5"),
+        (LimitMethod.FETCH_MANY, "SELECT * FROM t"),
+    ],
+)
+def test_apply_limit_to_sql_follows_the_limit_method(limit_method, expected):
+    class Engine(BaseSpecificEngine):
+        pass
+
+    Engine.limit_method = limit_method
+
+    assert Engine.apply_limit_to_sql("SELECT * FROM t", 5) == expected
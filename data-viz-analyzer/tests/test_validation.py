@@ -0,0 +1,100 @@
+import asyncio
+import socket
+import time
+
+import pytest
+
+from app.commands.database.validate import ValidateDatabaseParametersCommand
+from app.engine_specifics import base
+from app.engine_specifics.postgres import PostgresSpecificEngine
+from app.errors import DataVizErrorType
+from app.utils.network import probe_cache
+
+
+@pytest.fixture(autouse=True)
+def clear_probe_cache():
+    probe_cache.clear()
+    yield
+    probe_cache.clear()
+
+
+@pytest.fixture
+def listening_port():
+    with socket.create_server(("127.0.0.1", 0)) as server:
+        yield server.getsockname()[1]
+
+
+@pytest.fixture
+def closed_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def make_properties(port, host="127.0.0.1") -> dict:
+    return {
+        "engine": "postgresql",
+        "driver": "psycopg2",
+        "parameters": {
+            "host": host,
+            "port": port,
+            "username": "dataviz",
+            "database": "examples",
+        },
+    }
+
+
+def validate(properties, **kwargs):
+    return asyncio.run(
+        PostgresSpecificEngine.validate_parameters_async(properties, **kwargs)
+    )
+
+
+def error_types(errors) -> list[str]:
+    return [error.error_type for error in errors]
+
+
+def test_reachable_database_has_no_errors(listening_port):
+    assert validate(make_properties(listening_port)) == []
+
+
+def test_closed_port_is_reported(closed_port):
+    assert error_types(validate(make_properties(closed_port))) == [
+        DataVizErrorType.CONNECTION_PORT_CLOSED_ERROR
+    ]
+
+
+def test_missing_and_invalid_parameters_are_reported():
+    properties = make_properties("not a port")
+    del properties["parameters"]["username"]
+
+    assert error_types(validate(properties)) == [
+        DataVizErrorType.CONNECTION_MISSING_PARAMETERS_ERROR,
+        DataVizErrorType.CONNECTION_INVALID_PORT_ERROR,
+        DataVizErrorType.CONNECTION_INVALID_PORT_ERROR,
+    ]
+
+
+def test_checks_share_a_single_deadline(monkeypatch, listening_port):
+    async def slow_hostname_check(host, force=False):
+        await asyncio.sleep(10)
+        return True
+
+    monkeypatch.setattr(base, "is_hostname_valid_async", slow_hostname_check)
+    started = time.perf_counter()
+
+    errors = validate(make_properties(listening_port), timeout=0.1)
+
+    assert time.perf_counter() - started < 1
+    assert error_types(errors) == [DataVizErrorType.CONNECTION_INVALID_HOSTNAME_ERROR]
+
+
+def test_command_raises_the_errors(closed_port):
+    command = ValidateDatabaseParametersCommand(make_properties(closed_port))
+
+    with pytest.raises(ValueError) as excinfo:
+        asyncio.run(command.run())
+
+    assert error_types(excinfo.value.args[0]) == [
+        DataVizErrorType.CONNECTION_PORT_CLOSED_ERROR
+    ]